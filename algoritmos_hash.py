@@ -0,0 +1,43 @@
+"""
+Registro de algoritmos de hash
+Compartido por la cadena de bloques y por la generación de datos, que solo
+necesita hashear archivos sin depender del módulo blockchain
+"""
+
+import hashlib
+from typing import Callable, Dict
+
+# Los hash se manejan como 64 caracteres hex (resumen de 32 bytes)
+TAMANO_HASH = 64
+
+def _blake2b_256(datos: bytes = b''):
+    """BLAKE2b con resumen de 32 bytes (64 caracteres hex, igual que SHA-256)"""
+    return hashlib.blake2b(datos, digest_size=32)
+
+# Nombre -> constructor de hashlib; el nombre se guarda con cada bloque y con
+# cada hash de evaluación, así una cadena puede mezclar algoritmos
+ALGORITMOS_HASH: Dict[str, Callable] = {
+    'sha256': hashlib.sha256,
+    'blake2b': _blake2b_256,
+}
+
+ALGORITMO_HASH_POR_DEFECTO = 'sha256'
+
+def registrar_algoritmo_hash(nombre: str, constructor: Callable):
+    """
+    Agrega un algoritmo al registro
+    El constructor recibe bytes, debe soportar copy() (minería con midstate)
+    y producir 64 caracteres hex; debe registrarse a nivel de módulo para que
+    los workers de minería y auditoría también lo conozcan
+    """
+    if len(constructor(b'').hexdigest()) != TAMANO_HASH:
+        raise ValueError(f'El algoritmo {nombre} no produce un hash de {TAMANO_HASH} caracteres')
+    ALGORITMOS_HASH[nombre] = constructor
+
+def nuevo_hash(algoritmo: str, datos: bytes = b''):
+    """Objeto hash del algoritmo indicado, alimentado con los datos"""
+    try:
+        constructor = ALGORITMOS_HASH[algoritmo]
+    except KeyError:
+        raise ValueError(f'Algoritmo de hash desconocido: {algoritmo}') from None
+    return constructor(datos)
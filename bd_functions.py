@@ -5,17 +5,22 @@ con datos aleatorios realistas basados en la Resolución 000217 de 2014
 
 import mysql.connector
 from mysql.connector import Error
+import json
 import random
-from datetime import datetime, timedelta
-from faker import Faker
-import hashlib
+from datetime import date, datetime, timedelta
+from faker import Faker, VERSION as VERSION_FAKER
+from itertools import repeat
 import os
+import tempfile
 from dotenv import load_dotenv
+import numpy as np
+from algoritmos_hash import ALGORITMO_HASH_POR_DEFECTO, nuevo_hash
 
 load_dotenv()
 
 # Inicializar Faker con locale español
-fake = Faker('es_CO')
+LOCALE_FAKER = 'es_CO'
+fake = Faker(LOCALE_FAKER)
 
 # =============================================
 # CONFIGURACIÓN DE CONEXIÓN A BASE DE DATOS
@@ -31,6 +36,12 @@ DB_CONFIG = {
 ANIO_INICIO = 2018
 ANIO_FIN = 2025
 
+# Rango de los números de reconocimiento; la población paralela da a cada
+# partición un tramo propio (asignar_tramo_reconocimiento) para que no choquen
+# Son 8 dígitos y no 4: la columna es UNIQUE y con 1000-9999 ninguna población
+# podía pasar de 9000 evaluaciones (las cargas masivas generan cientos de miles)
+RANGO_NUMERO_RECONOCIMIENTO = (10000000, 99999999)
+
 # =============================================
 # DATOS BASE PARA GENERACIÓN
 # =============================================
@@ -120,6 +131,25 @@ RESTRICCIONES_CODIGOS = [
     ('20', 'Solo conducir de día')
 ]
 
+# Respuestas de ejemplo del cuestionario TEPSICON (normalmente serían 63 preguntas)
+PREGUNTAS_TEPSICON = [
+    ('10.1', 1, 'Con frecuencia se me olvida mi nombre', 'NO', 'NO'),
+    ('10.3', 8, 'Con frecuencia veo cosas que nadie mas ve', 'NO', 'NO'),
+    ('10.4', 10, 'En los últimos meses he pensado en dejar de vivir', 'NO', 'NO'),
+    ('11.1', 28, 'Combino licores para embriagarme más rápido', 'NO', 'NO'),
+    ('11.2', 31, 'Puedo pasar más de un mes sin consumir alcohol', 'NO', 'SI'),
+]
+
+# Sistemas de medicina general sin hallazgos (el cardiovascular se sortea aparte)
+SISTEMAS_SIN_HALLAZGOS = [
+    ('Respiratorio', 'Disneas', 'No presenta'),
+    ('Nervioso', 'Alteraciones del equilibrio', 'No presenta'),
+    ('Locomotor', 'Motilidad', 'No presenta'),
+]
+RESULTADOS_CARDIOVASCULAR = ['Sí presenta', 'No presenta']
+
+AGUDEZAS_VISUALES = ['20/20', '20/25', '20/30', '20/40']
+
 FILES_NAME = [
     '1.pdf',
     '2.pdf',
@@ -127,6 +157,132 @@ FILES_NAME = [
 ]
 
 
+# =============================================
+# POOLS DE VALORES FAKER
+# =============================================
+
+# Valores que se muestrean de cada campo de Faker al arrancar
+TAMANO_POOL_FAKER = 20000
+
+# Caché en disco de los pools ('' para muestrearlos en cada ejecución)
+RUTA_CACHE_POOLS = os.getenv('FAKER_CACHE_POOLS', 'faker_pools.json')
+
+# Campos de Faker con pool propio
+CAMPOS_POOL_FAKER = {
+    'nombres_masculinos': lambda: fake.first_name_male(),
+    'nombres_femeninos': lambda: fake.first_name_female(),
+    'apellidos': lambda: fake.last_name(),
+    'direcciones': lambda: fake.street_address(),
+    'nombres_completos': lambda: fake.name(),
+}
+
+
+class PoolsFaker:
+    """
+    Muestras acotadas de los campos lentos de Faker (es_CO)
+    Cada campo se muestrea una vez (o se lee de la caché en disco) y las filas
+    eligen valores por índice aleatorio, con la frecuencia que tenían en Faker
+    """
+
+    def __init__(self, tamano=TAMANO_POOL_FAKER, ruta_cache=RUTA_CACHE_POOLS):
+        if tamano < 1:
+            raise ValueError(f"Los pools de Faker necesitan al menos un valor (tamano={tamano})")
+        self.tamano = tamano
+        self.ruta_cache = ruta_cache
+        self.pools = self._cargar_cache() or self._muestrear()
+        self._hoy = date.today()
+
+    def _cargar_cache(self):
+        """
+        Pools guardados si existen y corresponden a este tamaño, locale y versión
+        de Faker (otra versión puede generar otros valores)
+        """
+        if not self.ruta_cache or not os.path.exists(self.ruta_cache):
+            return None
+        try:
+            with open(self.ruta_cache, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (cache.get('locale') != LOCALE_FAKER or cache.get('version_faker') != VERSION_FAKER
+                or cache.get('tamano') != self.tamano
+                or set(cache.get('pools', {})) != set(CAMPOS_POOL_FAKER)):
+            return None
+        # Un pool vacío o truncado haría fallar _elegir: se muestrea de nuevo
+        if any(not isinstance(pool, list) or len(pool) != self.tamano
+               for pool in cache['pools'].values()):
+            return None
+        return cache['pools']
+
+    def _muestrear(self):
+        """Muestrea cada campo de Faker y guarda la caché si hay ruta"""
+        print(f"   Muestreando {self.tamano} valores por campo de Faker...")
+        pools = {campo: [generar() for _ in range(self.tamano)]
+                 for campo, generar in CAMPOS_POOL_FAKER.items()}
+
+        if self.ruta_cache:
+            self._guardar_cache(pools)
+
+        return pools
+
+    def _guardar_cache(self, pools):
+        """
+        Escribe la caché en un temporal único del mismo directorio y lo reemplaza
+        de forma atómica (varios procesos pueden muestrear a la vez)
+        """
+        directorio = os.path.dirname(os.path.abspath(self.ruta_cache))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directorio,
+                                         suffix='.tmp', delete=False) as f:
+            temporal = f.name
+            try:
+                json.dump({'locale': LOCALE_FAKER, 'version_faker': VERSION_FAKER,
+                           'tamano': self.tamano, 'pools': pools}, f, ensure_ascii=False)
+            except BaseException:
+                f.close()
+                os.unlink(temporal)
+                raise
+        os.replace(temporal, self.ruta_cache)
+
+    def _elegir(self, campo):
+        pool = self.pools[campo]
+        return pool[int(random.random() * len(pool))]
+
+    def nombre(self, sexo):
+        """Nombre de pila según el sexo ('M' o 'F')"""
+        return self._elegir('nombres_masculinos' if sexo == 'M' else 'nombres_femeninos')
+
+    def apellidos(self):
+        """Dos apellidos"""
+        return f"{self._elegir('apellidos')} {self._elegir('apellidos')}"
+
+    def direccion(self):
+        return self._elegir('direcciones')
+
+    def nombre_completo(self):
+        return self._elegir('nombres_completos')
+
+    def fecha_nacimiento(self, edad):
+        """Fecha de nacimiento de alguien que hoy tiene exactamente esa edad"""
+        try:
+            cumpleanios = self._hoy.replace(year=self._hoy.year - edad)
+        except ValueError:
+            # 29 de febrero en un año no bisiesto
+            cumpleanios = self._hoy.replace(year=self._hoy.year - edad, day=28)
+        return cumpleanios - timedelta(days=random.randint(0, 364))
+
+
+_pools_faker = None
+
+
+def obtener_pools_faker():
+    """Pools compartidos del proceso (se crean al primer uso)"""
+    global _pools_faker
+    if _pools_faker is None:
+        _pools_faker = PoolsFaker()
+    return _pools_faker
+
+
 # =============================================
 # FUNCIONES DE CONEXIÓN
 # =============================================
@@ -150,6 +306,241 @@ def cerrar_conexion(connection):
         print("Conexión cerrada")
 
 
+# =============================================
+# INSERCIÓN MASIVA
+# =============================================
+
+# Filas por sentencia INSERT multi-fila (cada tabla se vacía al llegar a este tamaño)
+TAMANO_LOTE_INSERCION = 1000
+
+# Columnas insertadas en cada tabla, en el orden de los valores que reciben
+COLUMNAS_TABLAS = {
+    'centros_reconocimiento': (
+        'nit', 'nombre_centro', 'direccion', 'ciudad', 'departamento', 'telefono',
+        'habilitacion_ministerio', 'registro_salud', 'acreditacion', 'created_by'),
+    'usuarios': (
+        'numero_identificacion', 'tipo_identificacion', 'nombres', 'apellidos',
+        'fecha_nacimiento', 'edad', 'sexo', 'estado_civil', 'grupo_sanguineo',
+        'nivel_educativo', 'ocupacion', 'eps', 'regimen_afiliacion', 'telefono',
+        'direccion', 'ciudad_residencia', 'created_by'),
+    'contactos_emergencia': (
+        'id_usuario', 'nombre_contacto', 'telefono', 'parentesco', 'created_by'),
+    'profesionales': (
+        'registro_medico', 'nombres', 'apellidos', 'especialidad', 'numero_identificacion',
+        'created_by'),
+    'evaluaciones': (
+        'numero_reconocimiento', 'id_usuario', 'id_centro', 'fecha_evaluacion',
+        'fecha_certificacion', 'fecha_impresion', 'numero_factura', 'tramite',
+        'categoria', 'grupo_categoria', 'concepto_final', 'numero_certificado_runt',
+        'numero_resultado', 'fecha_vencimiento', 'vigencia_meses',
+        'ruta_pdf', 'nombre_archivo_pdf', 'hash_archivo', 'tamanio_archivo_kb',
+        'fecha_carga_pdf', 'created_by'),
+    'eval_fonoaudiologia': (
+        'id_evaluacion', 'id_profesional', 'fecha_inicio', 'fecha_fin',
+        'freq_250_od', 'freq_500_od', 'freq_1000_od', 'freq_2000_od',
+        'freq_3000_od', 'freq_4000_od', 'freq_6000_od', 'freq_8000_od', 'pta_od',
+        'freq_250_oi', 'freq_500_oi', 'freq_1000_oi', 'freq_2000_oi',
+        'freq_3000_oi', 'freq_4000_oi', 'freq_6000_oi', 'freq_8000_oi', 'pta_oi',
+        'audifono', 'implante_coclear', 'categoria', 'concepto',
+        'impresion_diagnostica', 'observaciones', 'created_by'),
+    'eval_psicologia': (
+        'id_evaluacion', 'id_profesional', 'fecha_inicio', 'fecha_fin',
+        'atencion_tiempo', 'atencion_errores', 'reaccion_multiple_tiempo',
+        'reaccion_multiple_errores', 'anticipacion_velocidad', 'coord_bimanual_tiempo',
+        'coord_bimanual_errores', 'reaccion_frenado', 'inteligencia_practica',
+        'personalidad_puntaje', 'sustancias_puntaje', 'coeficiente_intelectual',
+        'items_acertados_tepsicon', 'categoria', 'concepto',
+        'impresion_diagnostica', 'observaciones', 'created_by'),
+    'tepsicon_respuestas': (
+        'id_psico', 'bloque', 'numero_pregunta', 'pregunta', 'respuesta',
+        'criterio_esperado', 'created_by'),
+    'eval_optometria': (
+        'id_evaluacion', 'id_profesional', 'fecha_inicio', 'fecha_fin',
+        'av_lejana_binocular', 'av_lejana_oi', 'av_lejana_od',
+        'av_cercana_binocular', 'av_cercana_oi', 'av_cercana_od',
+        'campimetria_vertical', 'campimetria_horizontal',
+        'discriminacion_colores', 'sensibilidad_contraste', 'vision_mesopica',
+        'recuperacion_encandilamiento', 'encandilamiento_segundos',
+        'phorias_lejanas', 'phorias_cercanas', 'diplopia', 'vision_profundidad_pct',
+        'categoria', 'concepto', 'impresion_diagnostica', 'observaciones', 'created_by'),
+    'eval_medicina_general': (
+        'id_evaluacion', 'id_profesional', 'fecha_inicio', 'fecha_fin',
+        'talla_cm', 'peso_kg', 'frecuencia_respiratoria', 'frecuencia_cardiaca',
+        'tension_arterial', 'imc', 'categoria', 'concepto',
+        'impresion_diagnostica', 'observaciones', 'created_by'),
+    'sistemas_evaluados': (
+        'id_medico', 'sistema', 'hallazgo', 'resultado', 'created_by'),
+    'restricciones': (
+        'id_evaluacion', 'codigo_restriccion', 'descripcion_restriccion', 'created_by'),
+    'concepto_final': (
+        'id_evaluacion', 'id_certificador', 'tramite', 'categoria', 'concepto_general',
+        'observaciones_generales', 'limitaciones_fisicas_progresivas',
+        'fecha_certificacion', 'fecha_vencimiento', 'created_by'),
+}
+
+# Clave primaria (auto-incremental) de cada tabla
+CLAVES_PRIMARIAS = {
+    'centros_reconocimiento': 'id_centro',
+    'usuarios': 'id_usuario',
+    'contactos_emergencia': 'id_contacto',
+    'profesionales': 'id_profesional',
+    'evaluaciones': 'id_evaluacion',
+    'eval_fonoaudiologia': 'id_fono',
+    'eval_psicologia': 'id_psico',
+    'tepsicon_respuestas': 'id_respuesta',
+    'eval_optometria': 'id_opto',
+    'eval_medicina_general': 'id_medico',
+    'sistemas_evaluados': 'id_sistema',
+    'restricciones': 'id_restriccion',
+    'concepto_final': 'id_concepto',
+}
+
+# Clave única de las tablas donde INSERT IGNORE puede descartar filas
+CLAVES_UNICAS = {
+    'centros_reconocimiento': 'nit',
+    'usuarios': 'numero_identificacion',
+    'profesionales': 'registro_medico',
+    'evaluaciones': 'numero_reconocimiento',
+}
+
+
+class FilaPendiente:
+    """
+    Fila encolada en el insertador masivo
+    Su id se conoce al vaciar la tabla; puede usarse como valor de una fila hija
+    (p. ej. id_psico en tepsicon_respuestas) y se reemplaza por el id real al insertarla.
+    id queda en None si la fila fue descartada por INSERT IGNORE
+    """
+    __slots__ = ('tabla', 'id')
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.id = None
+
+
+class InsertadorMasivo:
+    """
+    Acumula filas por tabla y las inserta con sentencias INSERT IGNORE multi-fila
+
+    Los ids de cada lote salen del rango contiguo de auto-incremento que reserva
+    MySQL para la sentencia (lastrowid es el primero). Si el lote descartó filas
+    por clave duplicada, los ids se resuelven consultando la clave única
+    (en tablas sin clave única un lote parcial lanza RuntimeError).
+    Antes de vaciar una tabla se vacían las tablas padre de sus filas pendientes;
+    las filas hijas de un padre descartado no se insertan
+    """
+
+    def __init__(self, cursor, tamano_lote=TAMANO_LOTE_INSERCION):
+        self.cursor = cursor
+        self.tamano_lote = max(1, tamano_lote)
+        self.pendientes = {}
+        self.dependencias = {}
+        self.insertadas = 0
+        self.descartadas = 0
+        self._incremento = None
+
+    def agregar(self, tabla, valores):
+        """Encola una fila de la tabla; retorna su FilaPendiente"""
+        fila = FilaPendiente(tabla)
+        referencias = [i for i, valor in enumerate(valores) if type(valor) is FilaPendiente]
+        if referencias:
+            padres = self.dependencias.setdefault(tabla, set())
+            for i in referencias:
+                padres.add(valores[i].tabla)
+
+        filas = self.pendientes.setdefault(tabla, [])
+        filas.append((valores, referencias, fila))
+        if len(filas) >= self.tamano_lote:
+            self._vaciar_tabla(tabla)
+        return fila
+
+    def vaciar(self):
+        """Inserta todas las filas pendientes (sin commit)"""
+        for tabla in list(self.pendientes):
+            self._vaciar_tabla(tabla)
+
+    def _vaciar_tabla(self, tabla):
+        for padre in self.dependencias.get(tabla, ()):
+            if padre != tabla:
+                self._vaciar_tabla(padre)
+
+        pendientes = self.pendientes.get(tabla)
+        if not pendientes:
+            return
+        self.pendientes[tabla] = []
+
+        filas = []
+        valores_planos = []
+        for valores, referencias, fila in pendientes:
+            if referencias:
+                valores = list(valores)
+                for i in referencias:
+                    valores[i] = valores[i].id
+                if any(valores[i] is None for i in referencias):
+                    self.descartadas += 1
+                    continue
+            filas.append((valores, fila))
+            valores_planos.extend(valores)
+
+        if not filas:
+            return
+
+        columnas = COLUMNAS_TABLAS[tabla]
+        marcador = "(" + ", ".join(["%s"] * len(columnas)) + ")"
+        query = (f"INSERT IGNORE INTO {tabla} ({', '.join(columnas)}) VALUES "
+                 + ", ".join([marcador] * len(filas)))
+        self.cursor.execute(query, valores_planos)
+
+        insertadas = self.cursor.rowcount
+        primer_id = self.cursor.lastrowid
+        self.insertadas += insertadas
+        self.descartadas += len(filas) - insertadas
+
+        if insertadas == len(filas) and primer_id:
+            incremento = self._incremento_auto()
+            for i, (_, fila) in enumerate(filas):
+                fila.id = primer_id + i * incremento
+        elif insertadas and primer_id:
+            self._resolver_por_clave_unica(tabla, filas, primer_id)
+
+    def _incremento_auto(self):
+        """Paso del auto-incremento del servidor (1 salvo en réplicas multi-maestro)"""
+        if self._incremento is None:
+            self.cursor.execute("SELECT @@auto_increment_increment")
+            self._incremento = int(self.cursor.fetchone()[0])
+        return self._incremento
+
+    def _resolver_por_clave_unica(self, tabla, filas, primer_id):
+        """
+        Asigna ids a un lote con filas descartadas consultando su clave única
+        Sin clave única no hay forma de saber qué filas entraron: se aborta en
+        lugar de dejar sin id (y descartar en silencio) las filas hijas
+        """
+        if tabla not in CLAVES_UNICAS:
+            raise RuntimeError(
+                f"INSERT IGNORE descartó {len(filas) - self.cursor.rowcount} de {len(filas)} "
+                f"filas en {tabla}, que no tiene clave única para resolver los ids insertados"
+            )
+
+        clave_primaria = CLAVES_PRIMARIAS[tabla]
+        clave_unica = CLAVES_UNICAS[tabla]
+        posicion = COLUMNAS_TABLAS[tabla].index(clave_unica)
+        claves = list({valores[posicion] for valores, _ in filas})
+
+        self.cursor.execute(
+            f"SELECT {clave_unica}, {clave_primaria} FROM {tabla} "
+            f"WHERE {clave_unica} IN ({', '.join(['%s'] * len(claves))}) "
+            f"AND {clave_primaria} >= %s",
+            claves + [primer_id]
+        )
+        # Solo cuentan los ids de esta sentencia: el resto ya existía antes del lote
+        ids_por_clave = {clave: id_fila for clave, id_fila in self.cursor.fetchall()}
+
+        for valores, fila in filas:
+            # Con claves repetidas dentro del lote solo la primera aparición se insertó
+            fila.id = ids_por_clave.pop(valores[posicion], None)
+
+
 # =============================================
 # FUNCIONES DE INSERCIÓN
 # =============================================
@@ -158,12 +549,7 @@ def insertar_centros_reconocimiento(cursor, usuario='admin@sistema.com'):
     """Insertar los 5 centros de reconocimiento"""
     print("\n📍 Insertando centros de reconocimiento...")
 
-    query = """
-    INSERT IGNORE INTO centros_reconocimiento 
-    (nit, nombre_centro, direccion, ciudad, departamento, telefono, 
-     habilitacion_ministerio, registro_salud, acreditacion, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+    insertador = InsertadorMasivo(cursor)
 
     for centro in CENTROS_RECONOCIMIENTO:
         values = (
@@ -172,7 +558,9 @@ def insertar_centros_reconocimiento(cursor, usuario='admin@sistema.com'):
             centro['habilitacion'], centro['registro_salud'],
             centro['acreditacion'], usuario
         )
-        cursor.execute(query, values)
+        insertador.agregar('centros_reconocimiento', values)
+
+    insertador.vaciar()
 
     print(f"{len(CENTROS_RECONOCIMIENTO)} centros insertados")
 
@@ -182,34 +570,45 @@ def generar_numero_identificacion():
     return str(random.randint(10000000, 99999999))
 
 
+_tramo_reconocimiento = RANGO_NUMERO_RECONOCIMIENTO
+
+
+def asignar_tramo_reconocimiento(indice, total):
+    """Restringe los números de reconocimiento del proceso al tramo `indice` de `total`"""
+    global _tramo_reconocimiento
+    minimo, maximo = RANGO_NUMERO_RECONOCIMIENTO
+    ancho = (maximo - minimo + 1) // total
+    inicio = minimo + indice * ancho
+    _tramo_reconocimiento = (inicio, maximo if indice == total - 1 else inicio + ancho - 1)
+
+
+def generar_numero_reconocimiento():
+    """Generar número de reconocimiento (único en evaluaciones, dentro del tramo del proceso)"""
+    return str(_enteros_np(obtener_rng_np(), *_tramo_reconocimiento, 1)[0])
+
+
 def generar_telefono():
     """Generar número de teléfono celular colombiano"""
     return f"3{random.randint(100000000, 199999999)}"
 
 
-def insertar_usuarios(cursor, cantidad=1000, usuario='admin@sistema.com'):
-    """Insertar usuarios/pacientes"""
+def insertar_usuarios(cursor, cantidad=1000, usuario='admin@sistema.com',
+                      tamano_lote=TAMANO_LOTE_INSERCION, insertador=None):
+    """Insertar usuarios/pacientes (en el insertador dado, p. ej. un EscritorTSV)"""
     print(f"\n👤 Insertando {cantidad} usuarios...")
 
-    query = """
-    INSERT IGNORE INTO usuarios 
-    (numero_identificacion, tipo_identificacion, nombres, apellidos, 
-     fecha_nacimiento, edad, sexo, estado_civil, grupo_sanguineo, 
-     nivel_educativo, ocupacion, eps, regimen_afiliacion, telefono, 
-     direccion, ciudad_residencia, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-
-    usuarios_ids = []
+    insertador = insertador or InsertadorMasivo(cursor, tamano_lote)
+    pools = obtener_pools_faker()
+    filas = []
 
     for i in range(cantidad):
         # Generar fecha de nacimiento (18-85 años)
         edad = random.randint(18, 85)
-        fecha_nacimiento = fake.date_of_birth(minimum_age=edad, maximum_age=edad)
+        fecha_nacimiento = pools.fecha_nacimiento(edad)
 
         sexo = random.choice(['M', 'F'])
-        nombres = fake.first_name_male() if sexo == 'M' else fake.first_name_female()
-        apellidos = f"{fake.last_name()} {fake.last_name()}"
+        nombres = pools.nombre(sexo)
+        apellidos = pools.apellidos()
 
         values = (
             generar_numero_identificacion(),
@@ -226,42 +625,45 @@ def insertar_usuarios(cursor, cantidad=1000, usuario='admin@sistema.com'):
             random.choice(EPS_LIST),
             random.choice(REGIMENES),
             generar_telefono(),
-            fake.street_address(),
+            pools.direccion(),
             random.choice(CIUDADES_COLOMBIA),
             usuario
         )
 
-        cursor.execute(query, values)
-        usuarios_ids.append(cursor.lastrowid)
+        filas.append(insertador.agregar('usuarios', values))
 
         if (i + 1) % 100 == 0:
             print(f"   ⏳ Insertados {i + 1}/{cantidad} usuarios...")
 
-    print(f"{cantidad} usuarios insertados")
+    insertador.vaciar()
+
+    # Los usuarios descartados por identificación repetida no tienen id
+    usuarios_ids = [fila.id for fila in filas if fila.id is not None]
+
+    print(f"{len(usuarios_ids)} usuarios insertados")
     return usuarios_ids
 
 
-def insertar_contactos_emergencia(cursor, usuarios_ids, usuario='admin@sistema.com'):
+def insertar_contactos_emergencia(cursor, usuarios_ids, usuario='admin@sistema.com',
+                                  tamano_lote=TAMANO_LOTE_INSERCION, insertador=None):
     """Insertar contactos de emergencia"""
     print(f"\n📞 Insertando contactos de emergencia...")
 
-    query = """
-    INSERT IGNORE INTO contactos_emergencia 
-    (id_usuario, nombre_contacto, telefono, parentesco, created_by)
-    VALUES (%s, %s, %s, %s, %s)
-    """
-
+    insertador = insertador or InsertadorMasivo(cursor, tamano_lote)
+    pools = obtener_pools_faker()
     parentescos = ['Hijo(a)', 'Padre/Madre', 'Hermano(a)', 'Cónyuge', 'Amigo(a)', 'Otro']
 
     for id_usuario in usuarios_ids:
         values = (
             id_usuario,
-            fake.name().upper(),
+            pools.nombre_completo().upper(),
             generar_telefono(),
             random.choice(parentescos),
             usuario
         )
-        cursor.execute(query, values)
+        insertador.agregar('contactos_emergencia', values)
+
+    insertador.vaciar()
 
     print(f"{len(usuarios_ids)} contactos de emergencia insertados")
 
@@ -270,19 +672,15 @@ def insertar_profesionales(cursor, cantidad_por_especialidad=10, usuario='admin@
     """Insertar profesionales de salud"""
     print(f"\n👨‍⚕️ Insertando profesionales de salud...")
 
-    query = """
-    INSERT IGNORE INTO profesionales 
-    (registro_medico, nombres, apellidos, especialidad, numero_identificacion, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    """
-
-    profesionales_ids = {especialidad: [] for especialidad in ESPECIALIDADES_PROFESIONALES}
+    insertador = InsertadorMasivo(cursor)
+    pools = obtener_pools_faker()
+    filas = {especialidad: [] for especialidad in ESPECIALIDADES_PROFESIONALES}
 
     for especialidad in ESPECIALIDADES_PROFESIONALES:
         for i in range(cantidad_por_especialidad):
             sexo = random.choice(['M', 'F'])
-            nombres = fake.first_name_male() if sexo == 'M' else fake.first_name_female()
-            apellidos = f"{fake.last_name()} {fake.last_name()}"
+            nombres = pools.nombre(sexo)
+            apellidos = pools.apellidos()
 
             values = (
                 str(random.randint(100000, 999999)),
@@ -293,335 +691,115 @@ def insertar_profesionales(cursor, cantidad_por_especialidad=10, usuario='admin@
                 usuario
             )
 
-            cursor.execute(query, values)
-            profesionales_ids[especialidad].append(cursor.lastrowid)
+            filas[especialidad].append(insertador.agregar('profesionales', values))
+
+    insertador.vaciar()
+
+    profesionales_ids = {
+        especialidad: [fila.id for fila in filas_especialidad if fila.id is not None]
+        for especialidad, filas_especialidad in filas.items()
+    }
 
     total = len(ESPECIALIDADES_PROFESIONALES) * cantidad_por_especialidad
     print(f"{total} profesionales insertados")
     return profesionales_ids
 
 
-def generar_hash_archivo(texto):
-    """Generar hash SHA-256 para simular archivo PDF"""
-    return hashlib.sha256(texto.encode()).hexdigest()
+def generar_hash_archivo(texto, algoritmo=ALGORITMO_HASH_POR_DEFECTO):
+    """Generar hash (SHA-256 por defecto) para simular archivo PDF"""
+    return nuevo_hash(algoritmo, texto.encode()).hexdigest()
 
 
-def insertar_evaluaciones(cursor, usuarios_ids, profesionales_ids, cantidad=1000, usuario='admin@sistema.com'):
+def insertar_evaluaciones(cursor, usuarios_ids, profesionales_ids, cantidad=1000, usuario='admin@sistema.com',
+                          tamano_lote=TAMANO_LOTE_INSERCION, insertador=None):
     """Insertar evaluaciones completas"""
     print(f"\n📋 Insertando {cantidad} evaluaciones completas...")
 
-    evaluaciones_ids = []
-
-    # Query para evaluación principal
-    query_eval = """
-    INSERT IGNORE INTO evaluaciones 
-    (numero_reconocimiento, id_usuario, id_centro, fecha_evaluacion, 
-     fecha_certificacion, fecha_impresion, numero_factura, tramite, 
-     categoria, grupo_categoria, concepto_final, numero_certificado_runt, 
-     numero_resultado, fecha_vencimiento, vigencia_meses,
-     ruta_pdf, nombre_archivo_pdf, hash_archivo, tamanio_archivo_kb, 
-     fecha_carga_pdf, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+    insertador = insertador or InsertadorMasivo(cursor, tamano_lote)
+    filas = []
 
-    for i in range(cantidad):
-        # Datos de la evaluación
-        numero_reconocimiento = str(random.randint(1000, 9999))
-        id_usuario = random.choice(usuarios_ids)
-        id_centro = random.randint(1, 5)  # 5 centros
-
-        # Fechas
-        fecha_eval = fake.date_time_between(start_date='-2y', end_date='now')
-        fecha_cert = fecha_eval + timedelta(hours=random.randint(1, 24))
-        fecha_impresion = fecha_cert + timedelta(hours=random.randint(1, 2))
-        fecha_vencimiento = fecha_cert + timedelta(days=365 * random.choice([1, 2, 3, 5]))
-
-        categoria = random.choice(CATEGORIAS)
-        concepto = random.choice(CONCEPTOS)
-
-        # Generar datos del PDF
-        nombre_pdf = f"Informe_{numero_reconocimiento}_{id_usuario}.pdf"
-        ruta_pdf = f"/documentos/evaluaciones/{fecha_eval.year}/{fecha_eval.month:02d}/{nombre_pdf}"
-        hash_pdf = generar_hash_archivo(f"{numero_reconocimiento}{id_usuario}")
-
-        values_eval = (
-            numero_reconocimiento, id_usuario, id_centro, fecha_eval,
-            fecha_cert, fecha_impresion, str(random.randint(1000, 9999)),
-            random.choice(TRAMITES), categoria, 'Grupo 1', concepto,
-            f"A-{random.randint(1000, 9999)}-{random.randint(100000, 999999)}",
-            str(random.randint(10000000, 99999999)),
-            fecha_vencimiento, random.choice([12, 24, 36, 60]),
-            ruta_pdf, nombre_pdf, hash_pdf, random.randint(150, 500),
-            fecha_impresion, usuario
-        )
+    # Las columnas de cada lote se generan de una vez (generar_lote_evaluaciones)
+    for inicio in range(0, cantidad, TAMANO_LOTE_VECTORIZADO):
+        n = min(TAMANO_LOTE_VECTORIZADO, cantidad - inicio)
+        lote = generar_lote_evaluaciones(n, usuarios_ids, profesionales_ids,
+                                         fechas_recientes_np(n, 2 * 365 * 86400), usuario)
+        filas.extend(agregar_evaluacion_de_lote(insertador, lote, i) for i in range(n))
+        print(f"   ⏳ Insertadas {inicio + n}/{cantidad} evaluaciones...")
 
-        cursor.execute(query_eval, values_eval)
-        id_evaluacion = cursor.lastrowid
-        evaluaciones_ids.append(id_evaluacion)
+    insertador.vaciar()
 
-        # Insertar evaluaciones especializadas
-        insertar_eval_fonoaudiologia(cursor, id_evaluacion, profesionales_ids['Fonoaudiología'], usuario='usuario@sistema.com')
-        insertar_eval_psicologia(cursor, id_evaluacion, profesionales_ids['Psicología'], usuario='usuario@sistema.com')
-        insertar_eval_optometria(cursor, id_evaluacion, profesionales_ids['Optometría'], usuario='usuario@sistema.com')
-        insertar_eval_medicina(cursor, id_evaluacion, profesionales_ids['Medicina General'], usuario='usuario@sistema.com')
-
-        # Insertar restricciones si es APTO CON RESTRICCION
-        if concepto == 'APTO CON RESTRICCION':
-            insertar_restricciones(cursor, id_evaluacion, usuario='usuario@sistema.com')
-
-        # Insertar concepto final
-        insertar_concepto_final(cursor, id_evaluacion, profesionales_ids['Medicina General'], fecha_cert,
-                                fecha_vencimiento, usuario='usuario@sistema.com')
-
-        if (i + 1) % 100 == 0:
-            print(f"   ⏳ Insertadas {i + 1}/{cantidad} evaluaciones...")
+    # Las evaluaciones con número de reconocimiento repetido se descartan junto con sus hijas
+    evaluaciones_ids = [fila.id for fila in filas if fila.id is not None]
 
-    print(f"{cantidad} evaluaciones completas insertadas")
+    print(f"{len(evaluaciones_ids)} evaluaciones completas insertadas")
     return evaluaciones_ids
 
 
-def insertar_eval_fonoaudiologia(cursor, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
-    """Insertar evaluación fonoaudiológica"""
-    query = """
-    INSERT IGNORE INTO eval_fonoaudiologia 
-    (id_evaluacion, id_profesional, fecha_inicio, fecha_fin,
-     freq_250_od, freq_500_od, freq_1000_od, freq_2000_od, 
-     freq_3000_od, freq_4000_od, freq_6000_od, freq_8000_od, pta_od,
-     freq_250_oi, freq_500_oi, freq_1000_oi, freq_2000_oi,
-     freq_3000_oi, freq_4000_oi, freq_6000_oi, freq_8000_oi, pta_oi,
-     audifono, implante_coclear, categoria, concepto, 
-     impresion_diagnostica, observaciones, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-
-    fecha_inicio = fake.date_time_between(start_date='-1d', end_date='now')
-    fecha_fin = fecha_inicio + timedelta(minutes=random.randint(5, 15))
-
-    # Generar valores auditivos (0-40 dB es normal a leve)
-    valores_od = [random.uniform(0, 40) for _ in range(8)]
-    valores_oi = [random.uniform(0, 40) for _ in range(8)]
-
-    # Calcular PTA (promedio de 500, 1000, 2000 Hz)
-    pta_od = round((valores_od[1] + valores_od[2] + valores_od[3]) / 3, 2)
-    pta_oi = round((valores_oi[1] + valores_oi[2] + valores_oi[3]) / 3, 2)
+# Versiones escalares (una fila) de la generación por lotes: las reglas clínicas
+# están solo en generar_lote_evaluaciones
 
-    concepto = 'APTO' if pta_od <= 25 and pta_oi <= 25 else 'APTO CON RESTRICCION'
-
-    values = (
-        id_evaluacion, random.choice(profesionales_ids), fecha_inicio, fecha_fin,
-        *valores_od, pta_od,
-        *valores_oi, pta_oi,
-        'Ninguno', 'Ninguno', random.choice(CATEGORIAS), concepto,
-        'Audición normal' if concepto == 'APTO' else 'Hipoacusia leve',
-        'APTO' if concepto == 'APTO' else 'APTO CON PAL - SE RECOMIENDA CONTROL AUDITIVO',
-        usuario
+def _lote_unitario(profesionales_ids, usuario):
+    """Lote de una evaluación con todas las especialidades a cargo de profesionales_ids"""
+    return generar_lote_evaluaciones(
+        1, [None], dict.fromkeys(ESPECIALIDADES_PROFESIONALES, profesionales_ids),
+        fechas_recientes_np(1, 86400), usuario_especialidades=usuario
     )
 
-    cursor.execute(query, values)
-
-
-def insertar_eval_psicologia(cursor, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
-    """Insertar evaluación psicológica"""
-    query = """
-    INSERT IGNORE INTO eval_psicologia 
-    (id_evaluacion, id_profesional, fecha_inicio, fecha_fin,
-     atencion_tiempo, atencion_errores, reaccion_multiple_tiempo,
-     reaccion_multiple_errores, anticipacion_velocidad, coord_bimanual_tiempo,
-     coord_bimanual_errores, reaccion_frenado, inteligencia_practica,
-     personalidad_puntaje, sustancias_puntaje, coeficiente_intelectual,
-     items_acertados_tepsicon, categoria, concepto,
-     impresion_diagnostica, observaciones, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
 
-    fecha_inicio = fake.date_time_between(start_date='-1d', end_date='now')
-    fecha_fin = fecha_inicio + timedelta(minutes=random.randint(20, 40))
-
-    # Generar valores de pruebas psicotécnicas (dentro de rangos normales)
-    ci = random.randint(89, 125)
-    items_acertados = random.randint(11, 15)
-
-    values = (
-        id_evaluacion, random.choice(profesionales_ids), fecha_inicio, fecha_fin,
-        round(random.uniform(0.15, 0.80), 2), random.randint(0, 3),
-        round(random.uniform(0.15, 0.70), 2), random.randint(0, 4),
-        round(random.uniform(0.20, 0.90), 2), round(random.uniform(0.02, 10.00), 2),
-        random.randint(0, 5), round(random.uniform(0.10, 0.70), 2),
-        'Cumple', random.randint(19, 26), random.randint(15, 20),
-        ci, items_acertados, random.choice(CATEGORIAS), 'APTO',
-        'Candidato apto, cumple con los criterios de aprobación',
-        'APTO', usuario
-    )
+def insertar_eval_fonoaudiologia(insertador, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
+    """Insertar evaluación fonoaudiológica"""
+    lote = _lote_unitario(profesionales_ids, usuario)
+    insertador.agregar('eval_fonoaudiologia', (id_evaluacion, *lote['eval_fonoaudiologia'][0]))
 
-    cursor.execute(query, values)
 
-    # Insertar respuestas TEPSICON
-    insertar_tepsicon_respuestas(cursor, cursor.lastrowid, usuario='usuario@sistema.com')
+def insertar_eval_psicologia(insertador, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
+    """Insertar evaluación psicológica con sus respuestas TEPSICON"""
+    lote = _lote_unitario(profesionales_ids, usuario)
+    fila_psico = insertador.agregar('eval_psicologia', (id_evaluacion, *lote['eval_psicologia'][0]))
+    insertar_tepsicon_respuestas(insertador, fila_psico, usuario)
 
 
-def insertar_tepsicon_respuestas(cursor, id_psico, usuario='usuario@sistema.com'):
+def insertar_tepsicon_respuestas(insertador, id_psico, usuario='usuario@sistema.com'):
     """Insertar respuestas del cuestionario TEPSICON"""
-    query = """
-    INSERT IGNORE INTO tepsicon_respuestas 
-    (id_psico, bloque, numero_pregunta, pregunta, respuesta, criterio_esperado, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
-
-    # Insertar algunas respuestas de ejemplo (normalmente serían 63 preguntas)
-    preguntas_muestra = [
-        ('10.1', 1, 'Con frecuencia se me olvida mi nombre', 'NO', 'NO'),
-        ('10.3', 8, 'Con frecuencia veo cosas que nadie mas ve', 'NO', 'NO'),
-        ('10.4', 10, 'En los últimos meses he pensado en dejar de vivir', 'NO', 'NO'),
-        ('11.1', 28, 'Combino licores para embriagarme más rápido', 'NO', 'NO'),
-        ('11.2', 31, 'Puedo pasar más de un mes sin consumir alcohol', 'NO', 'SI'),
-    ]
-
-    for bloque, num_pregunta, pregunta, respuesta, criterio in preguntas_muestra:
-        values = (id_psico, bloque, num_pregunta, pregunta, respuesta, criterio, usuario)
-        cursor.execute(query, values)
+    for pregunta in PREGUNTAS_TEPSICON:
+        insertador.agregar('tepsicon_respuestas', (id_psico, *pregunta, usuario))
 
 
-def insertar_eval_optometria(cursor, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
+def insertar_eval_optometria(insertador, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
     """Insertar evaluación optométrica"""
-    query = """
-    INSERT IGNORE INTO eval_optometria 
-    (id_evaluacion, id_profesional, fecha_inicio, fecha_fin,
-     av_lejana_binocular, av_lejana_oi, av_lejana_od,
-     av_cercana_binocular, av_cercana_oi, av_cercana_od,
-     campimetria_vertical, campimetria_horizontal,
-     discriminacion_colores, sensibilidad_contraste, vision_mesopica,
-     recuperacion_encandilamiento, encandilamiento_segundos,
-     phorias_lejanas, phorias_cercanas, diplopia, vision_profundidad_pct,
-     categoria, concepto, impresion_diagnostica, observaciones, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-
-    fecha_inicio = fake.date_time_between(start_date='-1d', end_date='now')
-    fecha_fin = fecha_inicio + timedelta(minutes=random.randint(10, 20))
-
-    # Valores de agudeza visual
-    agudezas = ['20/20', '20/25', '20/30', '20/40']
-    usa_lentes = random.choice([True, False])
-
-    concepto = 'APTO CON RESTRICCION' if usa_lentes else 'APTO'
-
-    values = (
-        id_evaluacion, random.choice(profesionales_ids), fecha_inicio, fecha_fin,
-        random.choice(agudezas), random.choice(agudezas), random.choice(agudezas),
-        round(random.uniform(0.5, 1.0), 2), round(random.uniform(0.5, 1.0), 2),
-        round(random.uniform(0.5, 1.0), 2),
-        random.randint(70, 90), random.randint(120, 150),
-        'Normal', 'Normal', 'Normal',
-        '20/20', random.randint(3, 5),
-        'No presenta', 'No presenta', 'No presenta', random.randint(75, 95),
-        random.choice(CATEGORIAS), concepto,
-        'Candidato apto' if not usa_lentes else 'Candidato apto con restricción (gafas)',
-        'APTO' if not usa_lentes else 'APTO CON RESTRICCION',
-        usuario
-    )
+    lote = _lote_unitario(profesionales_ids, usuario)
+    insertador.agregar('eval_optometria', (id_evaluacion, *lote['eval_optometria'][0]))
 
-    cursor.execute(query, values)
 
+def insertar_eval_medicina(insertador, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
+    """Insertar evaluación médica general con sus sistemas evaluados"""
+    lote = _lote_unitario(profesionales_ids, usuario)
+    fila_medico = insertador.agregar('eval_medicina_general', (id_evaluacion, *lote['eval_medicina_general'][0]))
+    insertar_sistemas_evaluados(insertador, fila_medico, usuario, lote['cardiovascular'][0])
 
-def insertar_eval_medicina(cursor, id_evaluacion, profesionales_ids, usuario='usuario@sistema.com'):
-    """Insertar evaluación médica general"""
-    query = """
-    INSERT IGNORE INTO eval_medicina_general 
-    (id_evaluacion, id_profesional, fecha_inicio, fecha_fin,
-     talla_cm, peso_kg, frecuencia_respiratoria, frecuencia_cardiaca,
-     tension_arterial, imc, categoria, concepto,
-     impresion_diagnostica, observaciones, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
 
-    fecha_inicio = fake.date_time_between(start_date='-1d', end_date='now')
-    fecha_fin = fecha_inicio + timedelta(minutes=random.randint(15, 30))
-
-    # Generar signos vitales realistas
-    talla = random.randint(150, 190)
-    peso = random.randint(50, 100)
-    imc = round(peso / ((talla / 100) ** 2), 2)
-
-    presion_sistolica = random.randint(110, 140)
-    presion_diastolica = random.randint(70, 90)
-
-    values = (
-        id_evaluacion, random.choice(profesionales_ids), fecha_inicio, fecha_fin,
-        talla, peso, random.randint(12, 20), random.randint(60, 100),
-        f"{presion_sistolica}/{presion_diastolica}", imc,
-        random.choice(CATEGORIAS), 'APTO',
-        'Candidato apto, cumple con los criterios de aprobación',
-        'CUMPLE RESOLUCION 217/14',
-        usuario
-    )
+def insertar_sistemas_evaluados(insertador, id_medico, usuario='usuario@sistema.com', cardiovascular=None):
+    """Insertar sistemas evaluados en medicina general (cardiovascular=None: resultado al azar)"""
+    if cardiovascular is None:
+        cardiovascular = _elegir_np(obtener_rng_np(), RESULTADOS_CARDIOVASCULAR, 1)[0]
+    insertador.agregar('sistemas_evaluados',
+                       (id_medico, 'Cardiovascular', 'Hipertensión Arterial', cardiovascular, usuario))
+    for sistema, hallazgo, resultado in SISTEMAS_SIN_HALLAZGOS:
+        insertador.agregar('sistemas_evaluados', (id_medico, sistema, hallazgo, resultado, usuario))
 
-    cursor.execute(query, values)
 
-    # Insertar sistemas evaluados
-    insertar_sistemas_evaluados(cursor, cursor.lastrowid, usuario='usuario@sistema.com')
+def insertar_restricciones(insertador, id_evaluacion, usuario='usuario@sistema.com'):
+    """Insertar 1-2 restricciones para conductores"""
+    for codigo, descripcion in _restricciones_np(obtener_rng_np(), 1)[0]:
+        insertador.agregar('restricciones', (id_evaluacion, codigo, descripcion, usuario))
 
 
-def insertar_sistemas_evaluados(cursor, id_medico, usuario='usuario@sistema.com'):
-    """Insertar sistemas evaluados en medicina general"""
-    query = """
-    INSERT IGNORE INTO sistemas_evaluados 
-    (id_medico, sistema, hallazgo, resultado, created_by)
-    VALUES (%s, %s, %s, %s, %s)
-    """
-
-    sistemas = [
-        ('Cardiovascular', 'Hipertensión Arterial', random.choice(['Sí presenta', 'No presenta'])),
-        ('Respiratorio', 'Disneas', 'No presenta'),
-        ('Nervioso', 'Alteraciones del equilibrio', 'No presenta'),
-        ('Locomotor', 'Motilidad', 'No presenta')
-    ]
-
-    for sistema, hallazgo, resultado in sistemas:
-        values = (id_medico, sistema, hallazgo, resultado, usuario)
-        cursor.execute(query, values)
-
-
-def insertar_restricciones(cursor, id_evaluacion, usuario='usuario@sistema.com'):
-    """Insertar restricciones para conductores"""
-    query = """
-    INSERT IGNORE INTO restricciones 
-    (id_evaluacion, codigo_restriccion, descripcion_restriccion, created_by)
-    VALUES (%s, %s, %s, %s)
-    """
-
-    # Seleccionar 1-2 restricciones aleatorias
-    num_restricciones = random.randint(1, 2)
-    restricciones_seleccionadas = random.sample(RESTRICCIONES_CODIGOS, num_restricciones)
-
-    for codigo, descripcion in restricciones_seleccionadas:
-        values = (id_evaluacion, codigo, descripcion, usuario)
-        cursor.execute(query, values)
-
-
-def insertar_concepto_final(cursor, id_evaluacion, profesionales_ids, fecha_cert, fecha_venc, usuario='usuario@sistema.com'):
+def insertar_concepto_final(insertador, id_evaluacion, profesionales_ids, fecha_cert, fecha_venc,
+                            usuario='usuario@sistema.com'):
     """Insertar concepto final de la evaluación"""
-    query = """
-    INSERT IGNORE INTO concepto_final 
-    (id_evaluacion, id_certificador, tramite, categoria, concepto_general,
-     observaciones_generales, limitaciones_fisicas_progresivas,
-     fecha_certificacion, fecha_vencimiento, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+    concepto = _lote_unitario(profesionales_ids, usuario)['concepto_final'][0]
+    insertador.agregar('concepto_final', (id_evaluacion, *concepto[:6], fecha_cert, fecha_venc, usuario))
 
-    values = (
-        id_evaluacion,
-        random.choice(profesionales_ids),
-        random.choice(TRAMITES),
-        random.choice(CATEGORIAS),
-        'Cumple con los criterios de aprobación de la resolución 0217 de 2014 anexo I',
-        'El candidato cumple con los requisitos exigidos',
-        False,
-        fecha_cert,
-        fecha_venc,
-        usuario
-    )
-
-    cursor.execute(query, values)
 
 def distribuir_evaluaciones_por_anio(total_evaluaciones):
     """Distribuir evaluaciones por año con crecimiento orgánico"""
@@ -646,21 +824,265 @@ def distribuir_evaluaciones_por_anio(total_evaluaciones):
 
     return distribucion
 
+
 def generar_fecha_historica(anio_inicio=ANIO_INICIO, anio_fin=ANIO_FIN):
-    """Generar fecha aleatoria entre años especificados"""
-    fecha_inicio = datetime(anio_inicio, 1, 1)
-    fecha_fin = datetime(anio_fin, 12, 31)
+    """Generar fecha aleatoria entre años especificados (hora entre 8:00 y 17:59)"""
+    return _fechas_a_lista(fechas_historicas_np(1, anio_inicio, anio_fin))[0]
+
+# =============================================
+# GENERACIÓN VECTORIZADA (NUMPY)
+# =============================================
+
+# Evaluaciones generadas por cada lote de columnas
+TAMANO_LOTE_VECTORIZADO = 10000
+
+_rng_np = None
+
+
+def obtener_rng_np():
+    """Generador de NumPy compartido del proceso (se crea al primer uso)"""
+    global _rng_np
+    if _rng_np is None:
+        _rng_np = np.random.default_rng()
+    return _rng_np
+
+
+def sembrar_proceso(semilla=None):
+    """
+    Siembra random, Faker y NumPy del proceso actual
+    Los procesos hijos heredan el estado del padre al crearse; sin volver a
+    sembrarlos generarían todos los mismos datos. None toma entropía del sistema
+    """
+    global _rng_np
+    random.seed(semilla)
+    fake.seed_instance(semilla)
+    _rng_np = np.random.default_rng(semilla)
+
+
+def _elegir_np(rng, opciones, n):
+    """n elecciones uniformes de una lista, como lista de Python"""
+    return [opciones[i] for i in rng.integers(0, len(opciones), n).tolist()]
+
+
+def _enteros_np(rng, minimo, maximo, n):
+    """Equivalente vectorizado de random.randint (ambos extremos incluidos)"""
+    return rng.integers(minimo, maximo + 1, n)
+
+
+def _uniformes_np(rng, minimo, maximo, n, decimales=None):
+    valores = rng.uniform(minimo, maximo, n)
+    return np.round(valores, decimales) if decimales is not None else valores
+
+
+def _fechas_a_lista(fechas):
+    """datetime64 -> lista de datetime para el conector"""
+    return fechas.astype('datetime64[s]').tolist()
+
+
+def fechas_historicas_np(n, anio_inicio=ANIO_INICIO, anio_fin=ANIO_FIN, rng=None):
+    """Fechas al azar entre los años indicados, con hora entre 8:00 y 17:59"""
+    rng = rng or obtener_rng_np()
+    inicio = np.datetime64(f"{anio_inicio}-01-01", 'D')
+    dias = (np.datetime64(f"{anio_fin}-12-31", 'D') - inicio).astype(int)
+
+    return (inicio.astype('datetime64[s]')
+            + (_enteros_np(rng, 0, dias, n) * 86400
+               + _enteros_np(rng, 8, 17, n) * 3600
+               + _enteros_np(rng, 0, 59, n) * 60).astype('timedelta64[s]'))
+
+
+def fechas_recientes_np(n, segundos, rng=None):
+    """Fechas al azar en los últimos `segundos` (como fake.date_time_between(...,'now'))"""
+    rng = rng or obtener_rng_np()
+    ahora = np.datetime64(datetime.now(), 's')
+    return ahora - rng.integers(0, segundos + 1, n).astype('timedelta64[s]')
+
+
+def ruta_pdf_documentos(numero_reconocimiento, id_usuario, fecha_eval):
+    """(ruta, nombre) del informe PDF en el repositorio de documentos"""
+    nombre_pdf = f"Informe_{numero_reconocimiento}_{id_usuario}.pdf"
+    return f"/documentos/evaluaciones/{fecha_eval.year}/{fecha_eval.month:02d}/{nombre_pdf}", nombre_pdf
+
+
+def generar_lote_evaluaciones(n, usuarios_ids, profesionales_ids, fechas_eval, usuario='admin@sistema.com',
+                              usuario_especialidades='usuario@sistema.com', ruta_pdf=ruta_pdf_documentos,
+                              rng=None, id_centro=None):
+    """
+    Genera n evaluaciones completas columna a columna con NumPy
+
+    Es la única implementación de las reglas clínicas de la población (PTA,
+    IMC, conceptos); las filas hijas van sin la columna del padre.
+    Retorna un dict tabla -> lista con la fila (o filas) de cada evaluación,
+    lista para agregar_evaluacion_de_lote
+
+    Args:
+        fechas_eval: array datetime64 con la fecha de cada evaluación
+        ruta_pdf: función (numero_reconocimiento, id_usuario, fecha_eval) -> (ruta, nombre)
+        id_centro: centro de todas las evaluaciones (None = uno al azar por evaluación)
+    """
+    rng = rng or obtener_rng_np()
+    horas = np.timedelta64(1, 'h')
+    minutos = np.timedelta64(1, 'm')
+
+    # Evaluación principal
+    fecha_cert = fechas_eval + _enteros_np(rng, 1, 24, n) * horas
+    fecha_impresion = fecha_cert + _enteros_np(rng, 1, 2, n) * horas
+    fecha_vencimiento = fecha_cert + rng.choice([1, 2, 3, 5], n) * np.timedelta64(365, 'D')
+    conceptos = _elegir_np(rng, CONCEPTOS, n)
+    numeros = _enteros_np(rng, *_tramo_reconocimiento, n).tolist()
+    ids_usuario = _elegir_np(rng, usuarios_ids, n)
+    centros = repeat(id_centro) if id_centro else _enteros_np(rng, 1, 5, n).tolist()
+    fechas_eval_py = _fechas_a_lista(fechas_eval)
+    fecha_cert_py = _fechas_a_lista(fecha_cert)
+    fecha_impresion_py = _fechas_a_lista(fecha_impresion)
+    fecha_vencimiento_py = _fechas_a_lista(fecha_vencimiento)
+    pdfs = [ruta_pdf(str(numero), id_usuario, fecha)
+            for numero, id_usuario, fecha in zip(numeros, ids_usuario, fechas_eval_py)]
+
+    evaluaciones = list(zip(
+        map(str, numeros), ids_usuario, centros, fechas_eval_py,
+        fecha_cert_py, fecha_impresion_py, map(str, _enteros_np(rng, 1000, 9999, n).tolist()),
+        _elegir_np(rng, TRAMITES, n), _elegir_np(rng, CATEGORIAS, n), repeat('Grupo 1'), conceptos,
+        [f"A-{a}-{b}" for a, b in zip(_enteros_np(rng, 1000, 9999, n).tolist(),
+                                      _enteros_np(rng, 100000, 999999, n).tolist())],
+        map(str, _enteros_np(rng, 10000000, 99999999, n).tolist()),
+        fecha_vencimiento_py, rng.choice([12, 24, 36, 60], n).tolist(),
+        [ruta for ruta, _ in pdfs], [nombre for _, nombre in pdfs],
+        [generar_hash_archivo(f"{numero}{id_usuario}") for numero, id_usuario in zip(numeros, ids_usuario)],
+        _enteros_np(rng, 150, 500, n).tolist(), fecha_impresion_py, repeat(usuario)
+    ))
+
+    # Fonoaudiología: umbrales 0-40 dB y PTA con 500, 1000 y 2000 Hz
+    inicio = fechas_recientes_np(n, 86400, rng)
+    umbrales_od = rng.uniform(0, 40, (n, 8))
+    umbrales_oi = rng.uniform(0, 40, (n, 8))
+    pta_od = np.round(umbrales_od[:, 1:4].mean(axis=1), 2)
+    pta_oi = np.round(umbrales_oi[:, 1:4].mean(axis=1), 2)
+    audicion_normal = ((pta_od <= 25) & (pta_oi <= 25)).tolist()
+
+    fonoaudiologia = [
+        (id_profesional, fecha_inicio, fecha_fin, *od, p_od, *oi, p_oi, 'Ninguno', 'Ninguno', categoria,
+         'APTO' if normal else 'APTO CON RESTRICCION',
+         'Audición normal' if normal else 'Hipoacusia leve',
+         'APTO' if normal else 'APTO CON PAL - SE RECOMIENDA CONTROL AUDITIVO',
+         usuario_especialidades)
+        for id_profesional, fecha_inicio, fecha_fin, od, p_od, oi, p_oi, categoria, normal in zip(
+            _elegir_np(rng, profesionales_ids['Fonoaudiología'], n), _fechas_a_lista(inicio),
+            _fechas_a_lista(inicio + _enteros_np(rng, 5, 15, n) * minutos),
+            umbrales_od.tolist(), pta_od.tolist(), umbrales_oi.tolist(), pta_oi.tolist(),
+            _elegir_np(rng, CATEGORIAS, n), audicion_normal)
+    ]
+
+    # Psicología: pruebas psicotécnicas dentro de rangos normales
+    inicio = fechas_recientes_np(n, 86400, rng)
+    psicologia = list(zip(
+        _elegir_np(rng, profesionales_ids['Psicología'], n), _fechas_a_lista(inicio),
+        _fechas_a_lista(inicio + _enteros_np(rng, 20, 40, n) * minutos),
+        _uniformes_np(rng, 0.15, 0.80, n, 2).tolist(), _enteros_np(rng, 0, 3, n).tolist(),
+        _uniformes_np(rng, 0.15, 0.70, n, 2).tolist(), _enteros_np(rng, 0, 4, n).tolist(),
+        _uniformes_np(rng, 0.20, 0.90, n, 2).tolist(), _uniformes_np(rng, 0.02, 10.00, n, 2).tolist(),
+        _enteros_np(rng, 0, 5, n).tolist(), _uniformes_np(rng, 0.10, 0.70, n, 2).tolist(),
+        repeat('Cumple'), _enteros_np(rng, 19, 26, n).tolist(), _enteros_np(rng, 15, 20, n).tolist(),
+        _enteros_np(rng, 89, 125, n).tolist(), _enteros_np(rng, 11, 15, n).tolist(),
+        _elegir_np(rng, CATEGORIAS, n), repeat('APTO'),
+        repeat('Candidato apto, cumple con los criterios de aprobación'),
+        repeat('APTO'), repeat(usuario_especialidades)
+    ))
+
+    # Optometría: el uso de lentes decide el concepto
+    inicio = fechas_recientes_np(n, 86400, rng)
+    usa_lentes = (rng.random(n) < 0.5).tolist()
+    optometria = list(zip(
+        _elegir_np(rng, profesionales_ids['Optometría'], n), _fechas_a_lista(inicio),
+        _fechas_a_lista(inicio + _enteros_np(rng, 10, 20, n) * minutos),
+        _elegir_np(rng, AGUDEZAS_VISUALES, n), _elegir_np(rng, AGUDEZAS_VISUALES, n),
+        _elegir_np(rng, AGUDEZAS_VISUALES, n),
+        _uniformes_np(rng, 0.5, 1.0, n, 2).tolist(), _uniformes_np(rng, 0.5, 1.0, n, 2).tolist(),
+        _uniformes_np(rng, 0.5, 1.0, n, 2).tolist(),
+        _enteros_np(rng, 70, 90, n).tolist(), _enteros_np(rng, 120, 150, n).tolist(),
+        repeat('Normal'), repeat('Normal'), repeat('Normal'),
+        repeat('20/20'), _enteros_np(rng, 3, 5, n).tolist(),
+        repeat('No presenta'), repeat('No presenta'), repeat('No presenta'),
+        _enteros_np(rng, 75, 95, n).tolist(),
+        _elegir_np(rng, CATEGORIAS, n),
+        ['APTO CON RESTRICCION' if lentes else 'APTO' for lentes in usa_lentes],
+        ['Candidato apto con restricción (gafas)' if lentes else 'Candidato apto' for lentes in usa_lentes],
+        ['APTO CON RESTRICCION' if lentes else 'APTO' for lentes in usa_lentes],
+        repeat(usuario_especialidades)
+    ))
+
+    # Medicina general: signos vitales e IMC
+    inicio = fechas_recientes_np(n, 86400, rng)
+    talla = _enteros_np(rng, 150, 190, n)
+    peso = _enteros_np(rng, 50, 100, n)
+    imc = np.round(peso / (talla / 100) ** 2, 2)
+    medicina = list(zip(
+        _elegir_np(rng, profesionales_ids['Medicina General'], n), _fechas_a_lista(inicio),
+        _fechas_a_lista(inicio + _enteros_np(rng, 15, 30, n) * minutos),
+        talla.tolist(), peso.tolist(), _enteros_np(rng, 12, 20, n).tolist(), _enteros_np(rng, 60, 100, n).tolist(),
+        [f"{sistolica}/{diastolica}" for sistolica, diastolica in zip(_enteros_np(rng, 110, 140, n).tolist(),
+                                                                      _enteros_np(rng, 70, 90, n).tolist())],
+        imc.tolist(), _elegir_np(rng, CATEGORIAS, n), repeat('APTO'),
+        repeat('Candidato apto, cumple con los criterios de aprobación'),
+        repeat('CUMPLE RESOLUCION 217/14'), repeat(usuario_especialidades)
+    ))
+
+    # Restricciones solo en los APTO CON RESTRICCION
+    restricciones = [
+        codigos if concepto == 'APTO CON RESTRICCION' else []
+        for concepto, codigos in zip(conceptos, _restricciones_np(rng, n))
+    ]
+
+    conceptos_finales = list(zip(
+        _elegir_np(rng, profesionales_ids['Medicina General'], n), _elegir_np(rng, TRAMITES, n),
+        _elegir_np(rng, CATEGORIAS, n),
+        repeat('Cumple con los criterios de aprobación de la resolución 0217 de 2014 anexo I'),
+        repeat('El candidato cumple con los requisitos exigidos'), repeat(False),
+        fecha_cert_py, fecha_vencimiento_py, repeat(usuario_especialidades)
+    ))
+
+    return {
+        'evaluaciones': evaluaciones,
+        'eval_fonoaudiologia': fonoaudiologia,
+        'eval_psicologia': psicologia,
+        'eval_optometria': optometria,
+        'eval_medicina_general': medicina,
+        'cardiovascular': _elegir_np(rng, RESULTADOS_CARDIOVASCULAR, n),
+        'restricciones': restricciones,
+        'concepto_final': conceptos_finales,
+        'usuario_especialidades': usuario_especialidades,
+    }
+
+
+def _restricciones_np(rng, n):
+    """1-2 restricciones distintas (código, descripción) para cada una de n evaluaciones"""
+    orden_codigos = np.argsort(rng.random((n, len(RESTRICCIONES_CODIGOS))), axis=1).tolist()
+    cantidades = _enteros_np(rng, 1, 2, n).tolist()
+    return [[RESTRICCIONES_CODIGOS[j] for j in orden[:cantidad]]
+            for orden, cantidad in zip(orden_codigos, cantidades)]
+
+
+def agregar_evaluacion_de_lote(insertador, lote, i):
+    """Agrega al insertador la evaluación i del lote con todas sus filas hijas; retorna su fila"""
+    usuario = lote['usuario_especialidades']
+
+    fila_eval = insertador.agregar('evaluaciones', lote['evaluaciones'][i])
+    insertador.agregar('eval_fonoaudiologia', (fila_eval, *lote['eval_fonoaudiologia'][i]))
+
+    fila_psico = insertador.agregar('eval_psicologia', (fila_eval, *lote['eval_psicologia'][i]))
+    insertar_tepsicon_respuestas(insertador, fila_psico, usuario)
+
+    insertador.agregar('eval_optometria', (fila_eval, *lote['eval_optometria'][i]))
 
-    delta = fecha_fin - fecha_inicio
-    dias_random = random.randint(0, delta.days)
+    fila_medico = insertador.agregar('eval_medicina_general', (fila_eval, *lote['eval_medicina_general'][i]))
+    insertar_sistemas_evaluados(insertador, fila_medico, usuario, lote['cardiovascular'][i])
 
-    fecha = fecha_inicio + timedelta(days=dias_random)
+    for codigo, descripcion in lote['restricciones'][i]:
+        insertador.agregar('restricciones', (fila_eval, codigo, descripcion, usuario))
 
-    # Agregar hora aleatoria (8:00 AM - 5:00 PM)
-    hora = random.randint(8, 17)
-    minuto = random.randint(0, 59)
+    insertador.agregar('concepto_final', (fila_eval, *lote['concepto_final'][i]))
+    return fila_eval
 
-    return fecha.replace(hour=hora, minute=minuto, second=0)
 
 # =============================================
 # FUNCIÓN PRINCIPAL DE POBLACIÓN
@@ -1125,6 +1547,7 @@ if __name__ == "__main__":
 ║   • Configure las credenciales en DB_CONFIG                 ║
 ║   • Se recomienda comenzar con 1000 registros               ║
 ║   • Instale dependencias: pip install faker mysql-connector ║
+║     numpy (obligatorio: genera las evaluaciones por lotes)   ║
 ║                                                              ║
 ╚══════════════════════════════════════════════════════════════╝
     """)
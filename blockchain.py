@@ -3,14 +3,232 @@ Sistema de Blockchain para Garantizar Integridad de Evaluaciones Médicas
 Implementación de cadena de bloques para registros inmutables
 """
 
+import atexit
+import csv
 import hashlib
+import heapq
+import hmac
+import itertools
 import json
+import mmap
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import threading
 import time
-from datetime import datetime
-from typing import Dict, List, Optional
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import mysql.connector
 from mysql.connector import Error
 
+from algoritmos_hash import ALGORITMO_HASH_POR_DEFECTO, TAMANO_HASH, nuevo_hash
+
+# Ed25519 es opcional: sin cryptography solo está disponible la firma HMAC
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+        Ed25519PrivateKey, Ed25519PublicKey
+    )
+except ImportError:
+    Ed25519PrivateKey = None
+
+# zstd es opcional: sin zstandard los datos de bloques se comprimen con zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# =============================================
+# CODIFICACIÓN CANÓNICA DE BLOQUES
+# =============================================
+
+# Versiones del formato que se hashea: 1 = JSON ordenado (bloques históricos),
+# 2 = binario canónico con el nonce en los últimos 8 bytes
+VERSION_BLOQUE_JSON = 1
+VERSION_BLOQUE_BINARIO = 2
+VERSION_BLOQUE_ACTUAL = VERSION_BLOQUE_BINARIO
+
+CABECERA_BLOQUE_BINARIO = b'BLQ'
+
+def _escribir_varint(numero: int, salida: bytearray):
+    """Longitud (entero no negativo) en base 128, 7 bits por byte"""
+    while numero > 0x7f:
+        salida.append((numero & 0x7f) | 0x80)
+        numero >>= 7
+    salida.append(numero)
+
+def _leer_varint(datos: bytes, posicion: int) -> Tuple[int, int]:
+    """Lee un varint y retorna (numero, siguiente posición)"""
+    numero = 0
+    desplazamiento = 0
+    while True:
+        byte = datos[posicion]
+        posicion += 1
+        numero |= (byte & 0x7f) << desplazamiento
+        if byte < 0x80:
+            return numero, posicion
+        desplazamiento += 7
+
+def _escribir_texto(etiqueta: bytes, texto: str, salida: bytearray):
+    """Etiqueta + longitud + texto UTF-8"""
+    contenido = texto.encode('utf-8')
+    salida += etiqueta
+    _escribir_varint(len(contenido), salida)
+    salida += contenido
+
+# Enteros de 64 bits con signo; fuera de ese rango se guardan como texto
+_ENTERO_64 = struct.Struct('>q')
+_FLOTANTE_64 = struct.Struct('>d')
+_MIN_ENTERO_64 = -2 ** 63
+_MAX_ENTERO_64 = 2 ** 63 - 1
+
+def _codificar_valor(valor, salida: bytearray):
+    """
+    Codifica un valor con una etiqueta de tipo de un byte
+    Los diccionarios se ordenan por clave; fechas y decimales tienen su propia
+    etiqueta en lugar de depender de str(); una lista formada solo por enteros
+    de 64 bits se empaqueta entera con una llamada a struct
+    """
+    tipo = type(valor)
+    
+    if tipo is str:
+        _escribir_texto(b'S', valor, salida)
+    elif tipo is bool or valor is None:
+        salida += b'T' if valor is True else b'F' if valor is False else b'N'
+    elif tipo is int or (isinstance(valor, int) and not isinstance(valor, bool)):
+        if _MIN_ENTERO_64 <= valor <= _MAX_ENTERO_64:
+            salida += b'I'
+            salida += _ENTERO_64.pack(valor)
+        else:
+            _escribir_texto(b'G', str(int(valor)), salida)
+    elif tipo is float or isinstance(valor, float):
+        salida += b'D'
+        salida += _FLOTANTE_64.pack(valor)
+    elif tipo is dict or isinstance(valor, dict):
+        salida += b'M'
+        _escribir_varint(len(valor), salida)
+        for clave in sorted(valor):
+            if type(clave) is not str:
+                raise TypeError(f'Clave no serializable en bloque: {clave!r}')
+            _escribir_texto(b'', clave, salida)
+            _codificar_valor(valor[clave], salida)
+    elif tipo is list or tipo is tuple or isinstance(valor, (list, tuple)):
+        if valor and set(map(type, valor)) == {int}:
+            try:
+                empaquetado = struct.pack(f'>{len(valor)}q', *valor)
+            except struct.error:
+                empaquetado = None
+            if empaquetado is not None:
+                salida += b'Q'
+                _escribir_varint(len(valor), salida)
+                salida += empaquetado
+                return
+        salida += b'L'
+        _escribir_varint(len(valor), salida)
+        for elemento in valor:
+            _codificar_valor(elemento, salida)
+    elif isinstance(valor, datetime):
+        _escribir_texto(b'Z', valor.isoformat(), salida)
+    elif isinstance(valor, date):
+        _escribir_texto(b'A', valor.isoformat(), salida)
+    elif isinstance(valor, Decimal):
+        _escribir_texto(b'C', str(valor), salida)
+    elif isinstance(valor, (bytes, bytearray)):
+        salida += b'B'
+        _escribir_varint(len(valor), salida)
+        salida += valor
+    else:
+        raise TypeError(f'Tipo no serializable en bloque: {type(valor).__name__}')
+
+def _leer_texto(datos: bytes, posicion: int) -> Tuple[str, int]:
+    """Lee longitud + texto UTF-8"""
+    longitud, posicion = _leer_varint(datos, posicion)
+    fin = posicion + longitud
+    return datos[posicion:fin].decode('utf-8'), fin
+
+def _decodificar_valor(datos: bytes, posicion: int):
+    """Decodifica el valor que empieza en la posición dada; retorna (valor, siguiente posición)"""
+    etiqueta = datos[posicion:posicion + 1]
+    posicion += 1
+    
+    if etiqueta == b'N':
+        return None, posicion
+    if etiqueta == b'T':
+        return True, posicion
+    if etiqueta == b'F':
+        return False, posicion
+    if etiqueta == b'I':
+        return _ENTERO_64.unpack_from(datos, posicion)[0], posicion + 8
+    if etiqueta == b'G':
+        texto, posicion = _leer_texto(datos, posicion)
+        return int(texto), posicion
+    if etiqueta == b'D':
+        return _FLOTANTE_64.unpack_from(datos, posicion)[0], posicion + 8
+    if etiqueta == b'S':
+        return _leer_texto(datos, posicion)
+    if etiqueta == b'M':
+        cantidad, posicion = _leer_varint(datos, posicion)
+        resultado = {}
+        for _ in range(cantidad):
+            clave, posicion = _leer_texto(datos, posicion)
+            resultado[clave], posicion = _decodificar_valor(datos, posicion)
+        return resultado, posicion
+    if etiqueta == b'Q':
+        cantidad, posicion = _leer_varint(datos, posicion)
+        fin = posicion + 8 * cantidad
+        return list(struct.unpack_from(f'>{cantidad}q', datos, posicion)), fin
+    if etiqueta == b'L':
+        cantidad, posicion = _leer_varint(datos, posicion)
+        resultado = []
+        for _ in range(cantidad):
+            elemento, posicion = _decodificar_valor(datos, posicion)
+            resultado.append(elemento)
+        return resultado, posicion
+    if etiqueta == b'Z':
+        texto, posicion = _leer_texto(datos, posicion)
+        return datetime.fromisoformat(texto), posicion
+    if etiqueta == b'A':
+        texto, posicion = _leer_texto(datos, posicion)
+        return date.fromisoformat(texto), posicion
+    if etiqueta == b'C':
+        texto, posicion = _leer_texto(datos, posicion)
+        return Decimal(texto), posicion
+    if etiqueta == b'B':
+        longitud, posicion = _leer_varint(datos, posicion)
+        return bytes(datos[posicion:posicion + longitud]), posicion + longitud
+    raise ValueError(f'Etiqueta desconocida en datos de bloque: {etiqueta!r}')
+
+def codificar_canonico(valor) -> bytes:
+    """Representación binaria canónica de un valor (mismos datos = mismos bytes)"""
+    salida = bytearray()
+    _codificar_valor(valor, salida)
+    return bytes(salida)
+
+def decodificar_canonico(datos: bytes):
+    """Inversa de codificar_canonico"""
+    valor, posicion = _decodificar_valor(datos, 0)
+    if posicion != len(datos):
+        raise ValueError('Bytes sobrantes al decodificar datos de bloque')
+    return valor
+
+def _nonce_json(nonce: int) -> bytes:
+    return str(nonce).encode()
+
+def _nonce_binario(nonce: int) -> bytes:
+    return nonce.to_bytes(8, 'big')
+
+# Bytes del nonce que se concatenan al prefijo según la versión del bloque
+CODIFICADORES_NONCE = {
+    VERSION_BLOQUE_JSON: _nonce_json,
+    VERSION_BLOQUE_BINARIO: _nonce_binario,
+}
+
 # =============================================
 # CLASE BLOQUE
 # =============================================
@@ -19,19 +237,36 @@ class Bloque:
     """
     Representa un bloque en la cadena de blockchain
     """
+    __slots__ = ('indice', 'timestamp', 'datos', 'hash_anterior', 'nonce', 'hash', 'version',
+                 'algoritmo', 'firma')
+    
     def __init__(self, indice: int, timestamp: float, datos: Dict, 
-                 hash_anterior: str, nonce: int = 0):
+                 hash_anterior: str, nonce: int = 0, hash: str = None,
+                 version: int = VERSION_BLOQUE_JSON,
+                 algoritmo: str = ALGORITMO_HASH_POR_DEFECTO, firma: str = None):
         self.indice = indice
         self.timestamp = timestamp
         self.datos = datos
         self.hash_anterior = hash_anterior
         self.nonce = nonce
-        self.hash = self.calcular_hash()
+        # Formato con el que se hashea el bloque (ver CODIFICACIÓN CANÓNICA)
+        self.version = version
+        self.algoritmo = algoritmo
+        # Firma hex del hash (prueba de autoridad); None en bloques minados
+        self.firma = firma
+        # Los bloques leídos de la BD traen su hash almacenado
+        self.hash = hash if hash is not None else self.calcular_hash()
     
     def calcular_hash(self) -> str:
         """
-        Calcula el hash SHA-256 del bloque
+        Calcula el hash del bloque con su algoritmo (SHA-256 por defecto)
         """
+        if self.version != VERSION_BLOQUE_JSON:
+            prefijo, sufijo = self.serializar_sin_nonce()
+            return nuevo_hash(
+                self.algoritmo, prefijo + CODIFICADORES_NONCE[self.version](self.nonce) + sufijo
+            ).hexdigest()
+        
         contenido_bloque = json.dumps({
             'indice': self.indice,
             'timestamp': self.timestamp,
@@ -40,21 +275,69 @@ class Bloque:
             'nonce': self.nonce
         }, sort_keys=True, default=str)
         
-        return hashlib.sha256(contenido_bloque.encode()).hexdigest()
+        return nuevo_hash(self.algoritmo, contenido_bloque.encode()).hexdigest()
+    
+    def serializar_sin_nonce(self):
+        """
+        Divide la serialización del bloque en (prefijo, sufijo) alrededor del nonce
+        prefijo + str(nonce) + sufijo es exactamente lo que hashea calcular_hash,
+        así la minería solo serializa una vez la parte invariante del bloque
+        En la versión binaria el nonce va al final y el sufijo es vacío
+        """
+        if self.version == VERSION_BLOQUE_BINARIO:
+            salida = bytearray(CABECERA_BLOQUE_BINARIO)
+            salida.append(self.version)
+            _codificar_valor(self.indice, salida)
+            _codificar_valor(float(self.timestamp), salida)
+            _codificar_valor(self.hash_anterior, salida)
+            _codificar_valor(self.datos, salida)
+            return bytes(salida), b''
+        
+        contenido_bloque = json.dumps({
+            'indice': self.indice,
+            'timestamp': self.timestamp,
+            'datos': self.datos,
+            'hash_anterior': self.hash_anterior,
+            'nonce': None
+        }, sort_keys=True, default=str)
+        
+        # Con sort_keys el nonce de primer nivel es la última clave "nonce" antes
+        # de "timestamp", por eso se parte por la última ocurrencia
+        prefijo, _, sufijo = contenido_bloque.rpartition('"nonce": null')
+        return (prefijo + '"nonce": ').encode(), sufijo.encode()
     
-    def minar_bloque(self, dificultad: int = 4):
+    def minar_bloque(self, dificultad: int = 4, minador: 'MinadorParalelo' = None):
         """
         Prueba de trabajo (Proof of Work)
         Encuentra un nonce que genere un hash con N ceros al inicio
+        Si se recibe un minador paralelo, el espacio de nonces se reparte entre sus procesos
         """
         objetivo = '0' * dificultad
         
-        while self.hash[:dificultad] != objetivo:
-            self.nonce += 1
-            self.hash = self.calcular_hash()
+        if minador is not None and minador.procesos > 1:
+            if self.hash[:dificultad] != objetivo:
+                self.nonce, self.hash = minador.minar(self, dificultad)
+        elif self.hash[:dificultad] != objetivo:
+            # Estado SHA-256 ya alimentado con la parte invariante (midstate)
+            prefijo, sufijo = self.serializar_sin_nonce()
+            codificar_nonce = CODIFICADORES_NONCE[self.version]
+            estado_base = nuevo_hash(self.algoritmo, prefijo)
+            
+            while self.hash[:dificultad] != objetivo:
+                self.nonce += 1
+                estado = estado_base.copy()
+                estado.update(codificar_nonce(self.nonce) + sufijo)
+                self.hash = estado.hexdigest()
         
         print(f"Bloque minado: {self.hash}")
     
+    def firmar_bloque(self, firmante: 'FirmanteHMAC'):
+        """
+        Prueba de autoridad: en lugar de minar, firma el hash del bloque con
+        la clave configurada (el nonce queda en 0)
+        """
+        self.firma = firmante.firmar(self.hash)
+    
     def to_dict(self) -> Dict:
         """Convierte el bloque a diccionario"""
         return {
@@ -63,9 +346,815 @@ class Bloque:
             'datos': self.datos,
             'hash_anterior': self.hash_anterior,
             'nonce': self.nonce,
-            'hash': self.hash
+            'hash': self.hash,
+            'version': self.version,
+            'algoritmo': self.algoritmo,
+            'firma': self.firma
         }
 
+# =============================================
+# MINERÍA PARALELA
+# =============================================
+
+# Cada cuántos nonces un worker revisa si otro proceso ya encontró la solución
+INTERVALO_REVISION_MINERIA = 2000
+
+# Ronda ganadora compartida entre procesos (se asigna en cada worker)
+_ronda_ganadora = None
+
+def _inicializar_worker_mineria(ronda_ganadora):
+    """Guarda en el worker el contador compartido de rondas resueltas"""
+    global _ronda_ganadora
+    _ronda_ganadora = ronda_ganadora
+
+def _buscar_nonce(tarea):
+    """
+    Recorre los nonces inicio, inicio + paso, inicio + 2*paso, ...
+    hasta encontrar un hash válido o hasta que otro worker resuelva la ronda
+    """
+    prefijo, sufijo, dificultad, inicio, paso, ronda, version, algoritmo = tarea
+    objetivo = '0' * dificultad
+    codificar_nonce = CODIFICADORES_NONCE[version]
+    estado_base = nuevo_hash(algoritmo, prefijo)
+    nonce = inicio
+    
+    while _ronda_ganadora.value < ronda:
+        for _ in range(INTERVALO_REVISION_MINERIA):
+            estado = estado_base.copy()
+            estado.update(codificar_nonce(nonce) + sufijo)
+            hash_bloque = estado.hexdigest()
+            
+            if hash_bloque[:dificultad] == objetivo:
+                with _ronda_ganadora.get_lock():
+                    if _ronda_ganadora.value < ronda:
+                        _ronda_ganadora.value = ronda
+                return nonce, hash_bloque
+            
+            nonce += paso
+    
+    return None
+
+class MinadorParalelo:
+    """
+    Pool de procesos que reparte el espacio de nonces de cada bloque
+    El pool se crea en la primera minería y se reutiliza para los bloques siguientes
+    """
+    def __init__(self, procesos: int = None):
+        self.procesos = procesos or os.cpu_count() or 1
+        self._pool = None
+        self._ronda_ganadora = None
+        self._ronda = 0
+    
+    def _obtener_pool(self):
+        """Crea el pool de procesos si aún no existe"""
+        if self._pool is None:
+            self._ronda_ganadora = multiprocessing.Value('q', 0)
+            self._pool = multiprocessing.Pool(
+                self.procesos,
+                initializer=_inicializar_worker_mineria,
+                initargs=(self._ronda_ganadora,)
+            )
+        return self._pool
+    
+    def minar(self, bloque: 'Bloque', dificultad: int):
+        """
+        Busca en paralelo un nonce válido para el bloque
+        Retorna la tupla (nonce, hash); el primer worker que acierta detiene a los demás
+        """
+        pool = self._obtener_pool()
+        self._ronda += 1
+        
+        prefijo, sufijo = bloque.serializar_sin_nonce()
+        tareas = [
+            (prefijo, sufijo, dificultad, bloque.nonce + k, self.procesos, self._ronda,
+             bloque.version, bloque.algoritmo)
+            for k in range(self.procesos)
+        ]
+        
+        # Se consumen todos los resultados para que ningún worker siga en la ronda
+        resultado = None
+        for encontrado in pool.imap_unordered(_buscar_nonce, tareas):
+            if encontrado and resultado is None:
+                resultado = encontrado
+        
+        return resultado
+    
+    def cerrar(self):
+        """Libera los procesos del pool"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+# =============================================
+# FIRMA DE BLOQUES (PRUEBA DE AUTORIDAD)
+# =============================================
+
+# Consenso de los bloques nuevos: minería o firma con clave configurada
+CONSENSO_POW = 'pow'
+CONSENSO_HMAC = 'hmac'
+CONSENSO_ED25519 = 'ed25519'
+
+class FirmanteHMAC:
+    """
+    Firma y verifica hash de bloques con HMAC-SHA256 y una clave compartida
+    """
+    def __init__(self, clave: bytes):
+        if not clave:
+            raise ValueError('La firma HMAC requiere una clave')
+        self.clave = clave.encode() if isinstance(clave, str) else clave
+    
+    def firmar(self, hash_bloque: str) -> str:
+        return hmac.new(self.clave, hash_bloque.encode('ascii'), hashlib.sha256).hexdigest()
+    
+    def verificar(self, hash_bloque: str, firma: str) -> bool:
+        return hmac.compare_digest(self.firmar(hash_bloque), firma)
+
+class FirmanteEd25519:
+    """
+    Firma y verifica hash de bloques con Ed25519 (requiere cryptography)
+    Con solo la clave pública se pueden validar cadenas pero no firmar bloques
+    """
+    def __init__(self, clave_privada: bytes = None, clave_publica: bytes = None):
+        if Ed25519PrivateKey is None:
+            raise ImportError('La firma Ed25519 requiere el paquete cryptography')
+        if clave_privada is None and clave_publica is None:
+            raise ValueError('La firma Ed25519 requiere una clave privada o pública')
+        
+        self.clave_privada = (
+            Ed25519PrivateKey.from_private_bytes(clave_privada) if clave_privada else None
+        )
+        self.clave_publica = (
+            self.clave_privada.public_key() if self.clave_privada
+            else Ed25519PublicKey.from_public_bytes(clave_publica)
+        )
+    
+    def firmar(self, hash_bloque: str) -> str:
+        if self.clave_privada is None:
+            raise ValueError('No hay clave privada Ed25519 para firmar bloques')
+        return self.clave_privada.sign(hash_bloque.encode('ascii')).hex()
+    
+    def __reduce__(self):
+        """Permite enviar el firmante a procesos worker (se rearma desde las claves)"""
+        if self.clave_privada is not None:
+            return FirmanteEd25519, (self.clave_privada.private_bytes_raw(),)
+        return FirmanteEd25519, (None, self.clave_publica.public_bytes_raw())
+    
+    def verificar(self, hash_bloque: str, firma: str) -> bool:
+        try:
+            self.clave_publica.verify(bytes.fromhex(firma), hash_bloque.encode('ascii'))
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+def crear_firmante(consenso: str, clave: str = None):
+    """
+    Firmante para el modo de consenso indicado (None para minería)
+    Las claves son hex; si no se pasan se leen de las variables de entorno
+    BLOCKCHAIN_CLAVE_HMAC, BLOCKCHAIN_CLAVE_ED25519 (privada) o
+    BLOCKCHAIN_CLAVE_PUBLICA_ED25519 (solo validación)
+    """
+    if consenso == CONSENSO_POW:
+        return None
+    
+    if consenso == CONSENSO_HMAC:
+        clave = clave or os.getenv('BLOCKCHAIN_CLAVE_HMAC')
+        if not clave:
+            raise ValueError('Falta la clave HMAC (BLOCKCHAIN_CLAVE_HMAC)')
+        return FirmanteHMAC(bytes.fromhex(clave))
+    
+    if consenso == CONSENSO_ED25519:
+        clave = clave or os.getenv('BLOCKCHAIN_CLAVE_ED25519')
+        if clave:
+            return FirmanteEd25519(clave_privada=bytes.fromhex(clave))
+        clave_publica = os.getenv('BLOCKCHAIN_CLAVE_PUBLICA_ED25519')
+        if not clave_publica:
+            raise ValueError('Falta la clave Ed25519 (BLOCKCHAIN_CLAVE_ED25519)')
+        return FirmanteEd25519(clave_publica=bytes.fromhex(clave_publica))
+    
+    raise ValueError(f'Modo de consenso desconocido: {consenso}')
+
+def motivo_bloque_invalido(bloque: Bloque, hash_anterior_esperado: Optional[str],
+                           dificultad: int, firmante=None, exigir_firma: bool = False) -> Optional[str]:
+    """
+    Revisa un bloque de forma aislada (hash, enlace, firma o prueba de trabajo)
+    Retorna el motivo por el que es inválido o None si es válido;
+    con hash_anterior_esperado None no se revisa el enlace.
+    exigir_firma rechaza bloques minados: una vez que la cadena pasó a prueba de
+    autoridad, quitar la firma y minar con dificultad baja no debe bastar
+    """
+    if bloque.hash != bloque.calcular_hash():
+        return "Hash inválido"
+    
+    if hash_anterior_esperado is not None and bloque.hash_anterior != hash_anterior_esperado:
+        return "Cadena rota"
+    
+    # Bloques firmados: se verifica la firma en lugar de la prueba de trabajo
+    if bloque.firma is None and exigir_firma:
+        return "Bloque sin firma en cadena firmada"
+    if bloque.firma is not None:
+        if firmante is None or not firmante.verificar(bloque.hash, bloque.firma):
+            return "Firma inválida"
+    elif not bloque.hash.startswith('0' * dificultad):
+        return "Prueba de trabajo inválida"
+    
+    return None
+
+# =============================================
+# ÁRBOL DE MERKLE
+# =============================================
+
+# Versiones del árbol (se guarda en los datos del bloque como 'version_merkle'):
+# 1 = SHA-256, hojas sin prefijo y último nodo de un nivel impar duplicado (bloques históricos),
+# 2 = algoritmo del bloque, hojas y nodos con prefijo de dominio y nodo impar promovido
+# sin duplicar, así ninguna otra lista de hojas ni un nodo interno reproduce la misma raíz
+VERSION_MERKLE_DUPLICADO = 1
+VERSION_MERKLE_PREFIJADO = 2
+VERSION_MERKLE_ACTUAL = VERSION_MERKLE_PREFIJADO
+
+PREFIJO_HOJA_MERKLE = b'\x00'
+PREFIJO_NODO_MERKLE = b'\x01'
+
+def _hash_hoja_merkle(hoja: str, algoritmo: str, version: int) -> str:
+    """Nodo del árbol que corresponde a un hash de datos"""
+    if version == VERSION_MERKLE_DUPLICADO:
+        return hoja
+    return nuevo_hash(algoritmo, PREFIJO_HOJA_MERKLE + hoja.encode()).hexdigest()
+
+def _hash_nodo_merkle(izquierdo: str, derecho: str, algoritmo: str, version: int) -> str:
+    """Hash de un nodo interno a partir de sus dos hijos"""
+    if version == VERSION_MERKLE_DUPLICADO:
+        return hashlib.sha256((izquierdo + derecho).encode()).hexdigest()
+    return nuevo_hash(algoritmo, PREFIJO_NODO_MERKLE + (izquierdo + derecho).encode()).hexdigest()
+
+def construir_arbol_merkle(hojas: List[str], algoritmo: str = ALGORITMO_HASH_POR_DEFECTO,
+                           version: int = VERSION_MERKLE_ACTUAL) -> List[List[str]]:
+    """
+    Construye el árbol de Merkle nivel por nivel
+    niveles[0] son las hojas y niveles[-1] contiene solo la raíz;
+    en niveles impares el último nodo sube sin cambios (en la versión 1 se
+    emparejaba consigo mismo)
+    """
+    niveles = [[_hash_hoja_merkle(hoja, algoritmo, version) for hoja in hojas]]
+    
+    while len(niveles[-1]) > 1:
+        nivel = niveles[-1]
+        siguiente = []
+        for i in range(0, len(nivel), 2):
+            if i + 1 < len(nivel):
+                siguiente.append(_hash_nodo_merkle(nivel[i], nivel[i + 1], algoritmo, version))
+            elif version == VERSION_MERKLE_DUPLICADO:
+                siguiente.append(_hash_nodo_merkle(nivel[i], nivel[i], algoritmo, version))
+            else:
+                siguiente.append(nivel[i])
+        niveles.append(siguiente)
+    
+    return niveles
+
+def obtener_prueba_merkle(niveles: List[List[str]], posicion: int,
+                          version: int = VERSION_MERKLE_ACTUAL) -> List[List[str]]:
+    """
+    Prueba de inclusión de la hoja en la posición dada
+    Cada paso es [lado, hash_hermano], con lado 'I' (izquierda) o 'D' (derecha);
+    un nodo promovido sin hermano no agrega paso
+    """
+    prueba = []
+    
+    for nivel in niveles[:-1]:
+        if posicion % 2 == 1:
+            prueba.append(['I', nivel[posicion - 1]])
+        elif posicion + 1 < len(nivel):
+            prueba.append(['D', nivel[posicion + 1]])
+        elif version == VERSION_MERKLE_DUPLICADO:
+            prueba.append(['D', nivel[posicion]])
+        posicion //= 2
+    
+    return prueba
+
+def calcular_raiz_merkle(hoja: str, prueba: List[List[str]], algoritmo: str = ALGORITMO_HASH_POR_DEFECTO,
+                         version: int = VERSION_MERKLE_ACTUAL) -> str:
+    """Recalcula la raíz de Merkle a partir de una hoja y su prueba de inclusión"""
+    actual = _hash_hoja_merkle(hoja, algoritmo, version)
+    
+    for lado, hermano in prueba:
+        if lado == 'I':
+            actual = _hash_nodo_merkle(hermano, actual, algoritmo, version)
+        else:
+            actual = _hash_nodo_merkle(actual, hermano, algoritmo, version)
+    
+    return actual
+
+# =============================================
+# CADENA COMPACTA
+# =============================================
+
+# Los hash se guardan como TAMANO_HASH bytes ASCII (el génesis usa '0' como hash anterior)
+
+# Espacio por firma: HMAC-SHA256 ocupa 32 bytes y Ed25519 64
+TAMANO_FIRMA = 64
+
+class CadenaCompacta:
+    """
+    Cadena con los encabezados de los bloques en arrays contiguos
+    Los datos de los bloques leídos de la BD se cargan solo cuando se necesitan;
+    los bloques agregados en esta sesión se conservan completos en memoria
+    Se comporta como una lista de Bloque: len(), cadena[i], iteración y append()
+    """
+    def __init__(self, cargar_datos: Callable[[int], Dict] = None,
+                 iterar_datos: Callable[[int, int], Iterator[Tuple[int, Dict]]] = None):
+        self.indices = array('q')
+        self.timestamps = array('d')
+        self.nonces = array('q')
+        self.versiones = array('B')
+        # Algoritmo de cada bloque como código de un byte (ver _codigo_algoritmo)
+        self.algoritmos = bytearray()
+        self._nombres_algoritmos: List[str] = []
+        self.hashes = bytearray()
+        self.hashes_anteriores = bytearray()
+        # Firmas en binario, TAMANO_FIRMA bytes por bloque; longitud 0 = bloque minado
+        self.firmas = bytearray()
+        self.longitudes_firma = array('B')
+        # Primera posición firmada y hasta dónde se buscó (ver posicion_primera_firma)
+        self._primera_firma: Optional[int] = None
+        self._firmas_revisadas = 0
+        # Bloques completos por posición (los agregados en memoria)
+        self._bloques: Dict[int, Bloque] = {}
+        # cargar_datos(indice) -> datos; iterar_datos(desde, hasta) -> (indice, datos) en orden
+        self.cargar_datos = cargar_datos
+        self.iterar_datos = iterar_datos
+        # Archivo mapeado del que se leen las secciones (cadena cargada de un snapshot)
+        self.mapa_snapshot = None
+    
+    def __len__(self) -> int:
+        return len(self.indices)
+    
+    def _posicion(self, posicion: int) -> int:
+        """Normaliza posiciones negativas y valida el rango"""
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError('posición fuera de la cadena')
+        return posicion
+    
+    def _codigo_algoritmo(self, algoritmo: str) -> int:
+        """Código de un byte para el nombre del algoritmo (se asigna al primer uso)"""
+        if algoritmo not in self._nombres_algoritmos:
+            self._nombres_algoritmos.append(algoritmo)
+        return self._nombres_algoritmos.index(algoritmo)
+    
+    def agregar_encabezado(self, indice: int, timestamp: float, hash_bloque: str,
+                           hash_anterior: str, nonce: int, version: int = VERSION_BLOQUE_JSON,
+                           algoritmo: str = ALGORITMO_HASH_POR_DEFECTO, firma: str = None):
+        """Agrega solo el encabezado de un bloque cuyos datos quedan en la BD"""
+        firma_binaria = bytes.fromhex(firma) if firma else b''
+        if len(firma_binaria) > TAMANO_FIRMA:
+            raise ValueError(f'Firma de {len(firma_binaria)} bytes en bloque {indice}')
+        self.firmas += firma_binaria.ljust(TAMANO_FIRMA, b'\0')
+        self.longitudes_firma.append(len(firma_binaria))
+        self.indices.append(indice)
+        self.timestamps.append(timestamp)
+        self.nonces.append(nonce)
+        self.versiones.append(version)
+        self.algoritmos.append(self._codigo_algoritmo(algoritmo))
+        self.hashes += hash_bloque.encode('ascii').ljust(TAMANO_HASH, b'\0')
+        self.hashes_anteriores += hash_anterior.encode('ascii').ljust(TAMANO_HASH, b'\0')
+    
+    def append(self, bloque: Bloque):
+        """Agrega un bloque completo"""
+        self.agregar_encabezado(
+            bloque.indice, bloque.timestamp, bloque.hash, bloque.hash_anterior, bloque.nonce,
+            bloque.version, bloque.algoritmo, bloque.firma
+        )
+        self._bloques[len(self) - 1] = bloque
+    
+    def indice_en(self, posicion: int) -> int:
+        """Índice del bloque en la posición dada"""
+        return self.indices[self._posicion(posicion)]
+    
+    def hash_en(self, posicion: int) -> str:
+        """Hash del bloque en la posición dada, sin materializar el bloque"""
+        inicio = self._posicion(posicion) * TAMANO_HASH
+        return self.hashes[inicio:inicio + TAMANO_HASH].rstrip(b'\0').decode('ascii')
+    
+    def hash_anterior_en(self, posicion: int) -> str:
+        """Hash anterior del bloque en la posición dada"""
+        inicio = self._posicion(posicion) * TAMANO_HASH
+        return self.hashes_anteriores[inicio:inicio + TAMANO_HASH].rstrip(b'\0').decode('ascii')
+    
+    def firma_en(self, posicion: int) -> Optional[str]:
+        """Firma hex del bloque en la posición dada (None si fue minado)"""
+        posicion = self._posicion(posicion)
+        longitud = self.longitudes_firma[posicion]
+        if not longitud:
+            return None
+        inicio = posicion * TAMANO_FIRMA
+        return self.firmas[inicio:inicio + longitud].hex()
+    
+    def encabezado_en(self, posicion: int) -> Tuple:
+        """Encabezado del bloque en la posición dada, en el orden de agregar_encabezado"""
+        posicion = self._posicion(posicion)
+        return (
+            self.indices[posicion], self.timestamps[posicion], self.hash_en(posicion),
+            self.hash_anterior_en(posicion), self.nonces[posicion], self.versiones[posicion],
+            self._nombres_algoritmos[self.algoritmos[posicion]], self.firma_en(posicion)
+        )
+    
+    def posicion_primera_firma(self) -> Optional[int]:
+        """
+        Posición del primer bloque firmado (None si la cadena solo tiene bloques minados)
+        Desde ahí todos los bloques deben estar firmados; solo se buscan los
+        bloques agregados desde la consulta anterior
+        """
+        if self._primera_firma is None and self._firmas_revisadas < len(self):
+            pendientes = bytes(self.longitudes_firma[self._firmas_revisadas:])
+            sin_firma = len(pendientes) - len(pendientes.lstrip(b'\0'))
+            if sin_firma < len(pendientes):
+                self._primera_firma = self._firmas_revisadas + sin_firma
+            self._firmas_revisadas = len(self)
+        return self._primera_firma
+    
+    def _materializar(self, posicion: int, datos: Dict) -> Bloque:
+        """Construye el Bloque de una posición con los datos indicados"""
+        return Bloque(
+            self.indices[posicion], self.timestamps[posicion], datos,
+            self.hash_anterior_en(posicion), self.nonces[posicion],
+            hash=self.hash_en(posicion), version=self.versiones[posicion],
+            algoritmo=self._nombres_algoritmos[self.algoritmos[posicion]],
+            firma=self.firma_en(posicion)
+        )
+    
+    def __getitem__(self, posicion: int) -> Bloque:
+        posicion = self._posicion(posicion)
+        
+        bloque = self._bloques.get(posicion)
+        if bloque is None:
+            bloque = self._materializar(posicion, self.cargar_datos(self.indices[posicion]))
+        return bloque
+    
+    def iterar_bloques(self, desde: int = 0) -> Iterator[Bloque]:
+        """
+        Recorre los bloques en orden desde una posición
+        Los datos de los bloques guardados en BD se leen por rangos, no uno a uno
+        """
+        posicion = desde
+        
+        while posicion < len(self):
+            if posicion in self._bloques:
+                yield self._bloques[posicion]
+                posicion += 1
+                continue
+            
+            # Tramo contiguo de bloques sin datos en memoria
+            fin = posicion
+            while fin + 1 < len(self) and (fin + 1) not in self._bloques:
+                fin += 1
+            
+            for indice, datos in self.iterar_datos(self.indices[posicion], self.indices[fin]):
+                if posicion > fin:
+                    break
+                if indice != self.indices[posicion]:
+                    # Fila inesperada (la tabla cambió durante la lectura)
+                    continue
+                yield self._materializar(posicion, datos)
+                posicion += 1
+            
+            # Bloques que no llegaron en el recorrido por rango
+            while posicion <= fin:
+                yield self[posicion]
+                posicion += 1
+    
+    def __iter__(self) -> Iterator[Bloque]:
+        return self.iterar_bloques()
+
+class IndiceHashes:
+    """
+    Índice hash -> posición para una cadena cargada desde un snapshot
+    Las posiciones del snapshot vienen ordenadas por hash y se buscan por
+    bisección directamente sobre cadena.hashes (no hay que armar un dict al
+    arrancar); los bloques agregados después van a un dict normal
+    """
+    def __init__(self, cadena: CadenaCompacta, orden: array):
+        self.cadena = cadena
+        self.orden = orden
+        self.nuevos: Dict[str, int] = {}
+    
+    def get(self, hash_buscado: str, por_defecto: Optional[int] = None) -> Optional[int]:
+        posicion = self.nuevos.get(hash_buscado)
+        if posicion is not None:
+            return posicion
+        
+        clave = hash_buscado.encode('ascii').ljust(TAMANO_HASH, b'\0')
+        hashes = self.cadena.hashes
+        bajo, alto = 0, len(self.orden)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            inicio = self.orden[medio] * TAMANO_HASH
+            if hashes[inicio:inicio + TAMANO_HASH] < clave:
+                bajo = medio + 1
+            else:
+                alto = medio
+        
+        if bajo < len(self.orden):
+            inicio = self.orden[bajo] * TAMANO_HASH
+            if hashes[inicio:inicio + TAMANO_HASH] == clave:
+                return self.orden[bajo]
+        return por_defecto
+    
+    def __setitem__(self, hash_bloque: str, posicion: int):
+        self.nuevos[hash_bloque] = posicion
+    
+    def __contains__(self, hash_bloque: str) -> bool:
+        return self.get(hash_bloque) is not None
+
+# =============================================
+# SNAPSHOT BINARIO DE LA CADENA
+# =============================================
+
+# Cabecera: marca, orden de bytes, bloques, largo de los nombres de algoritmo,
+# bloques por tramo y MAC BLAKE2b (con clave) de la cabecera, los nombres y la
+# tabla de resúmenes de tramos
+MARCA_SNAPSHOT = b'BCSNAP03'
+CABECERA_SNAPSHOT = struct.Struct('<8s1sQII32s')
+
+# Cada sección se resume por tramos de bloques; un tramo se comprueba contra su
+# resumen la primera vez que se lee, así abrir el snapshot no recorre la cadena
+BLOQUES_POR_TRAMO_SNAPSHOT = 4096
+TAMANO_RESUMEN_TRAMO = 32
+
+# Bloques nuevos que debe haber para reescribir el snapshot al desconectar
+BLOQUES_MINIMOS_SNAPSHOT = 1000
+
+def _mac_snapshot(clave: bytes):
+    """
+    MAC BLAKE2b del snapshot; sin la clave no se puede recalcular, así que un
+    archivo editado no pasa por válido (BLAKE2b admite claves de hasta 64 bytes)
+    """
+    if len(clave) > 64:
+        clave = hashlib.blake2b(clave).digest()
+    return hashlib.blake2b(key=clave, digest_size=32)
+
+def _alinear(posicion: int) -> int:
+    """Siguiente múltiplo de 8 (las secciones se mapean como arrays de 8 bytes)"""
+    return (posicion + 7) & ~7
+
+class SeccionMapeada:
+    """
+    Sección de encabezados de una cadena leída de un snapshot
+    Los elementos del snapshot se leen directamente del archivo mapeado, sin
+    copiarlos; cada tramo se comprueba contra su resumen (autenticado por el MAC
+    de la cabecera) la primera vez que se accede y lanza ValueError si no
+    coincide. Los elementos agregados después van a un contenedor normal
+    Se usa como el array o bytearray que reemplaza; los cortes devuelven bytes
+    """
+    def __init__(self, crudo: memoryview, resumenes: memoryview, nuevos, items_por_tramo: int):
+        self.typecode = nuevos.typecode if isinstance(nuevos, array) else 'B'
+        self.crudo = crudo
+        self.base = crudo.cast(self.typecode)
+        self.itemsize = self.base.itemsize
+        self.resumenes = resumenes
+        self.nuevos = nuevos
+        self.items_por_tramo = items_por_tramo
+        self.verificados = bytearray(len(resumenes) // TAMANO_RESUMEN_TRAMO)
+    
+    def _verificar(self, inicio: int, fin: int):
+        """Comprueba los tramos del snapshot que cubren los elementos [inicio, fin)"""
+        for tramo in range(inicio // self.items_por_tramo, (fin - 1) // self.items_por_tramo + 1):
+            if self.verificados[tramo]:
+                continue
+            desde = tramo * self.items_por_tramo * self.itemsize
+            hasta = min(desde + self.items_por_tramo * self.itemsize, len(self.crudo))
+            resumen = hashlib.blake2b(self.crudo[desde:hasta], digest_size=TAMANO_RESUMEN_TRAMO).digest()
+            esperado = self.resumenes[tramo * TAMANO_RESUMEN_TRAMO:(tramo + 1) * TAMANO_RESUMEN_TRAMO]
+            if not hmac.compare_digest(resumen, esperado):
+                raise ValueError(f'Snapshot alterado: el tramo {tramo} no coincide con su resumen')
+            self.verificados[tramo] = 1
+    
+    def verificar_todo(self):
+        """Comprueba todos los tramos pendientes (antes de reescribir el snapshot)"""
+        if len(self.base):
+            self._verificar(0, len(self.base))
+    
+    def partes(self) -> List:
+        """Contenido completo en dos búferes, sin copiar: snapshot y agregados"""
+        self.verificar_todo()
+        return [self.crudo, self.nuevos]
+    
+    def liberar(self):
+        """Suelta las vistas sobre el mapa para poder cerrarlo"""
+        self.base.release()
+        self.crudo.release()
+        self.resumenes.release()
+    
+    def __len__(self) -> int:
+        return len(self.base) + len(self.nuevos)
+    
+    def __getitem__(self, posicion):
+        total_base = len(self.base)
+        if isinstance(posicion, slice):
+            inicio, fin, _ = posicion.indices(len(self))
+            contenido = b''
+            if inicio < min(fin, total_base):
+                self._verificar(inicio, min(fin, total_base))
+                contenido = self.crudo[inicio * self.itemsize:min(fin, total_base) * self.itemsize].tobytes()
+            if fin > total_base:
+                contenido += bytes(self.nuevos[max(inicio - total_base, 0):fin - total_base])
+            return contenido
+        
+        if posicion < 0:
+            posicion += len(self)
+        if posicion < total_base:
+            if not self.verificados[posicion // self.items_por_tramo]:
+                self._verificar(posicion, posicion + 1)
+            return self.base[posicion]
+        return self.nuevos[posicion - total_base]
+    
+    def __iter__(self) -> Iterator:
+        for inicio in range(0, len(self.base), self.items_por_tramo):
+            fin = min(inicio + self.items_por_tramo, len(self.base))
+            self._verificar(inicio, fin)
+            yield from self.base[inicio:fin]
+        yield from self.nuevos
+    
+    def append(self, valor):
+        self.nuevos.append(valor)
+    
+    def __iadd__(self, contenido):
+        self.nuevos += contenido
+        return self
+
+def _secciones_snapshot(cadena: CadenaCompacta, orden: array) -> List[Tuple]:
+    """
+    Secciones del cuerpo del snapshot, en el orden en que se escriben y leen
+    Cada una es (contenedor, bytes por bloque)
+    """
+    return [
+        (cadena.indices, cadena.indices.itemsize),
+        (cadena.timestamps, cadena.timestamps.itemsize),
+        (cadena.nonces, cadena.nonces.itemsize),
+        (cadena.versiones, cadena.versiones.itemsize),
+        (cadena.algoritmos, 1),
+        (cadena.longitudes_firma, cadena.longitudes_firma.itemsize),
+        (cadena.hashes, TAMANO_HASH),
+        (cadena.hashes_anteriores, TAMANO_HASH),
+        (cadena.firmas, TAMANO_FIRMA),
+        (orden, orden.itemsize),
+    ]
+
+def _resumenes_tramos(partes: List, bytes_por_tramo: int) -> bytes:
+    """Resumen de cada tramo de bytes_por_tramo bytes del contenido de las partes"""
+    resumenes = bytearray()
+    resumen = hashlib.blake2b(digest_size=TAMANO_RESUMEN_TRAMO)
+    acumulados = 0
+    for parte in partes:
+        with memoryview(parte) as vista, vista.cast('B') as octetos:
+            posicion = 0
+            while posicion < len(octetos):
+                cantidad = min(bytes_por_tramo - acumulados, len(octetos) - posicion)
+                resumen.update(octetos[posicion:posicion + cantidad])
+                posicion += cantidad
+                acumulados += cantidad
+                if acumulados == bytes_por_tramo:
+                    resumenes += resumen.digest()
+                    resumen = hashlib.blake2b(digest_size=TAMANO_RESUMEN_TRAMO)
+                    acumulados = 0
+    if acumulados:
+        resumenes += resumen.digest()
+    return bytes(resumenes)
+
+def escribir_snapshot_cadena(cadena: CadenaCompacta, ruta: str, clave: bytes,
+                             orden_previo: array = None):
+    """
+    Escribe los encabezados de la cadena y el índice ordenado por hash en un
+    archivo binario; se escribe en un temporal y se reemplaza de forma atómica
+    Con el orden del snapshot anterior solo se ordenan los bloques agregados
+    después y se intercalan con él
+    """
+    total = len(cadena)
+    clave_orden = lambda posicion: cadena.hashes[posicion * TAMANO_HASH:(posicion + 1) * TAMANO_HASH]
+    if orden_previo is None:
+        orden = array('I', sorted(range(total), key=clave_orden))
+    else:
+        nuevos = sorted(range(len(orden_previo), total), key=clave_orden)
+        orden = array('I', heapq.merge(orden_previo, nuevos, key=clave_orden))
+    nombres = json.dumps(cadena._nombres_algoritmos).encode()
+    
+    # Lo que venga del snapshot anterior se comprueba entero antes de volver a firmarlo
+    secciones = [
+        (seccion.partes() if isinstance(seccion, SeccionMapeada) else [seccion], bytes_por_bloque)
+        for seccion, bytes_por_bloque in _secciones_snapshot(cadena, orden)
+    ]
+    tabla = b''.join(
+        _resumenes_tramos(partes, BLOQUES_POR_TRAMO_SNAPSHOT * bytes_por_bloque)
+        for partes, bytes_por_bloque in secciones
+    )
+    
+    orden_bytes = b'<' if sys.byteorder == 'little' else b'>'
+    mac = _mac_snapshot(clave)
+    mac.update(CABECERA_SNAPSHOT.pack(
+        MARCA_SNAPSHOT, orden_bytes, total, len(nombres), BLOQUES_POR_TRAMO_SNAPSHOT, bytes(32)
+    ))
+    mac.update(nombres)
+    mac.update(tabla)
+    
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(CABECERA_SNAPSHOT.pack(
+            MARCA_SNAPSHOT, orden_bytes, total, len(nombres), BLOQUES_POR_TRAMO_SNAPSHOT, mac.digest()
+        ))
+        archivo.write(nombres)
+        archivo.write(tabla)
+        for partes, _ in secciones:
+            archivo.write(bytes(_alinear(archivo.tell()) - archivo.tell()))
+            for parte in partes:
+                archivo.write(parte)
+    os.replace(temporal, ruta)
+
+def leer_snapshot_cadena(ruta: str, clave: bytes, cargar_datos: Callable = None,
+                         iterar_datos: Callable = None) -> Optional[Tuple[CadenaCompacta, array]]:
+    """
+    Mapea en memoria un snapshot y arma la cadena compacta sobre el mapa
+    Las secciones quedan como vistas del archivo (SeccionMapeada, sin copiar) y
+    al abrir solo se autentican la cabecera y la tabla de resúmenes de tramos;
+    el mapa sigue abierto mientras se use la cadena
+    Retorna (cadena, orden_por_hash) o None si el archivo no existe, es de otra
+    arquitectura o su MAC no coincide (archivo dañado, alterado o de otra clave)
+    """
+    if not os.path.exists(ruta):
+        return None
+    
+    with open(ruta, 'rb') as archivo:
+        if os.fstat(archivo.fileno()).st_size < CABECERA_SNAPSHOT.size:
+            return None
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    vistas = []
+    secciones = []
+    armada = False
+    try:
+        marca, orden_bytes, total, largo_nombres, bloques_por_tramo, resumen = CABECERA_SNAPSHOT.unpack_from(mapa)
+        if (marca != MARCA_SNAPSHOT or orden_bytes != (b'<' if sys.byteorder == 'little' else b'>')
+                or not bloques_por_tramo):
+            return None
+        
+        cadena = CadenaCompacta(cargar_datos, iterar_datos)
+        contenedores = _secciones_snapshot(cadena, array('I'))
+        
+        # Tamaño esperado del archivo según la cabecera
+        inicio_tabla = CABECERA_SNAPSHOT.size + largo_nombres
+        largo_tabla = 0
+        for _, bytes_por_bloque in contenedores:
+            bytes_por_tramo = bloques_por_tramo * bytes_por_bloque
+            largo_tabla += -(-total * bytes_por_bloque // bytes_por_tramo) * TAMANO_RESUMEN_TRAMO
+        posicion = inicio_tabla + largo_tabla
+        for _, bytes_por_bloque in contenedores:
+            posicion = _alinear(posicion) + total * bytes_por_bloque
+        if posicion != len(mapa):
+            return None
+        
+        vista = memoryview(mapa)
+        vistas.append(vista)
+        mac = _mac_snapshot(clave)
+        mac.update(CABECERA_SNAPSHOT.pack(
+            marca, orden_bytes, total, largo_nombres, bloques_por_tramo, bytes(32)
+        ))
+        mac.update(vista[CABECERA_SNAPSHOT.size:inicio_tabla + largo_tabla])
+        if not hmac.compare_digest(mac.digest(), resumen):
+            return None
+        
+        cadena._nombres_algoritmos = json.loads(bytes(vista[CABECERA_SNAPSHOT.size:inicio_tabla]))
+        posicion_tabla = inicio_tabla
+        posicion = inicio_tabla + largo_tabla
+        for contenedor, bytes_por_bloque in contenedores:
+            posicion = _alinear(posicion)
+            largo = total * bytes_por_bloque
+            bytes_por_tramo = bloques_por_tramo * bytes_por_bloque
+            largo_resumenes = -(-largo // bytes_por_tramo) * TAMANO_RESUMEN_TRAMO
+            itemsize = contenedor.itemsize if isinstance(contenedor, array) else 1
+            secciones.append(SeccionMapeada(
+                vista[posicion:posicion + largo],
+                vista[posicion_tabla:posicion_tabla + largo_resumenes],
+                contenedor, bytes_por_tramo // itemsize
+            ))
+            posicion += largo
+            posicion_tabla += largo_resumenes
+        
+        # Mismo orden que _secciones_snapshot
+        (cadena.indices, cadena.timestamps, cadena.nonces, cadena.versiones, cadena.algoritmos,
+         cadena.longitudes_firma, cadena.hashes, cadena.hashes_anteriores, cadena.firmas,
+         orden) = secciones
+        cadena.mapa_snapshot = mapa
+        armada = True
+        return cadena, orden
+    finally:
+        # Sin cadena armada el mapa se cierra; las vistas se sueltan antes
+        # (si no, mmap.close() lanza BufferError y tapa el error original)
+        if not armada:
+            for seccion in secciones:
+                seccion.liberar()
+            for vista in vistas:
+                vista.release()
+            mapa.close()
+
 # =============================================
 # CLASE BLOCKCHAIN
 # =============================================
@@ -74,12 +1163,30 @@ class BlockchainEvaluaciones:
     """
     Cadena de bloques para registros de evaluaciones médicas
     """
-    def __init__(self, dificultad: int = 4):
-        self.cadena: List[Bloque] = []
+    def __init__(self, dificultad: int = 4, minador: MinadorParalelo = None,
+                 crear_genesis: bool = True, version_bloque: int = VERSION_BLOQUE_ACTUAL,
+                 algoritmo_hash: str = ALGORITMO_HASH_POR_DEFECTO, firmante=None):
+        self.cadena = CadenaCompacta()
         self.dificultad = dificultad
-        self.crear_bloque_genesis()
+        self.minador = minador
+        # Con firmante los bloques nuevos se firman en lugar de minarse
+        self.firmante = firmante
+        # Formato y algoritmo de los bloques nuevos; los existentes conservan los suyos
+        self.version_bloque = version_bloque
+        nuevo_hash(algoritmo_hash)  # ValueError si el algoritmo no está registrado
+        self.algoritmo_hash = algoritmo_hash
+        # Marca de agua: último bloque ya validado (indice, hash)
+        self.checkpoint_indice: Optional[int] = None
+        self.checkpoint_hash: Optional[str] = None
+        # Índices en memoria: hash -> posición, id_evaluacion -> posiciones
+        # (None = armar el de evaluaciones al primer uso leyendo los datos de los bloques)
+        self.posiciones_por_hash = {}
+        self.posiciones_por_evaluacion: Optional[Dict[int, List[int]]] = {}
+        # Con cadena persistida el génesis se omite: se carga de la BD
+        if crear_genesis:
+            self.crear_bloque_genesis()
     
-    def crear_bloque_genesis(self):
+    def crear_bloque_genesis(self) -> Bloque:
         """
         Crea el primer bloque de la cadena (Bloque Génesis)
         """
@@ -91,11 +1198,16 @@ class BlockchainEvaluaciones:
                 'mensaje': 'Bloque Génesis - Sistema de Evaluaciones Médicas',
                 'fecha_creacion': datetime.now().isoformat()
             },
-            hash_anterior='0'
+            hash_anterior='0',
+            version=self.version_bloque,
+            algoritmo=self.algoritmo_hash
         )
-        bloque_genesis.minar_bloque(self.dificultad)
+        self.sellar_bloque(bloque_genesis)
         self.cadena.append(bloque_genesis)
+        self.indexar_bloque(bloque_genesis, len(self.cadena) - 1)
         print(f"Bloque Génesis creado: {bloque_genesis.hash}")
+        
+        return bloque_genesis
     
     def obtener_ultimo_bloque(self) -> Bloque:
         """Retorna el último bloque de la cadena"""
@@ -105,102 +1217,262 @@ class BlockchainEvaluaciones:
         """
         Agrega un nuevo bloque a la cadena
         """
-        ultimo_bloque = self.obtener_ultimo_bloque()
-        
         nuevo_bloque = Bloque(
-            indice=ultimo_bloque.indice + 1,
+            indice=self.cadena.indice_en(-1) + 1,
             timestamp=time.time(),
             datos=datos,
-            hash_anterior=ultimo_bloque.hash
+            hash_anterior=self.cadena.hash_en(-1),
+            version=self.version_bloque,
+            algoritmo=self.algoritmo_hash
         )
         
-        nuevo_bloque.minar_bloque(self.dificultad)
+        self.sellar_bloque(nuevo_bloque)
         self.cadena.append(nuevo_bloque)
+        self.indexar_bloque(nuevo_bloque, len(self.cadena) - 1)
         
         return nuevo_bloque
     
-    def validar_cadena(self) -> bool:
+    def sellar_bloque(self, bloque: Bloque):
+        """Firma el bloque si hay firmante configurado; si no, lo mina"""
+        if self.firmante is not None:
+            bloque.firmar_bloque(self.firmante)
+        else:
+            bloque.minar_bloque(self.dificultad, self.minador)
+    
+    def indexar_bloque(self, bloque: Bloque, posicion: int):
+        """Agrega el bloque a los índices por hash y por evaluación"""
+        self.posiciones_por_hash[bloque.hash] = posicion
+        
+        if self.posiciones_por_evaluacion is None:
+            return
+        
+        # Bloques individuales guardan id_evaluacion; los de lote, la lista de evaluaciones
+        ids_evaluaciones = bloque.datos.get('evaluaciones', [])
+        if 'id_evaluacion' in bloque.datos:
+            ids_evaluaciones = [bloque.datos['id_evaluacion']] + ids_evaluaciones
+        
+        for id_evaluacion in ids_evaluaciones:
+            self.posiciones_por_evaluacion.setdefault(id_evaluacion, []).append(posicion)
+    
+    def cargar_cadena(self, cadena: CadenaCompacta, orden_hashes: array = None,
+                      posiciones_por_evaluacion: Dict[int, List[int]] = None):
+        """
+        Reemplaza la cadena y reconstruye el índice por hash en una sola pasada
+        sobre los encabezados
+        Con el orden por hash de un snapshot el índice se usa tal cual (IndiceHashes)
+        Sin el índice por evaluación (ver SistemaBlockchainEvaluaciones.
+        cargar_posiciones_por_evaluacion) se arma al primer uso leyendo los datos
         """
-        Valida toda la cadena de bloques
+        self.cadena = cadena
+        if orden_hashes is not None:
+            self.posiciones_por_hash = IndiceHashes(cadena, orden_hashes)
+            for posicion in range(len(orden_hashes), len(cadena)):
+                self.posiciones_por_hash[cadena.hash_en(posicion)] = posicion
+        else:
+            self.posiciones_por_hash = {
+                cadena.hash_en(posicion): posicion for posicion in range(len(cadena))
+            }
+        self.posiciones_por_evaluacion = posiciones_por_evaluacion
+    
+    def _posicion_checkpoint(self) -> Optional[int]:
+        """
+        Posición en la cadena del bloque marcado como validado
+        Retorna None si no hay checkpoint o si ya no coincide con la cadena actual
+        """
+        if self.checkpoint_indice is None or not len(self.cadena):
+            return None
+        
+        posicion = self.checkpoint_indice - self.cadena.indice_en(0)
+        if 0 <= posicion < len(self.cadena) and self.cadena.hash_en(posicion) == self.checkpoint_hash:
+            return posicion
+        return None
+    
+    def validar_cadena(self, completa: bool = False) -> bool:
+        """
+        Valida la cadena de bloques
         Verifica:
         1. Hash de cada bloque es correcto
         2. Hash anterior coincide con el bloque previo
-        3. Prueba de trabajo es válida
+        3. Prueba de trabajo es válida, o la firma si el bloque está firmado;
+           después del primer bloque firmado todos deben estarlo
+        Por defecto solo revisa los bloques agregados después del checkpoint;
+        con completa=True vuelve a validar desde el génesis
         """
-        for i in range(1, len(self.cadena)):
-            bloque_actual = self.cadena[i]
-            bloque_anterior = self.cadena[i - 1]
-            
-            # Verificar hash del bloque
-            if bloque_actual.hash != bloque_actual.calcular_hash():
-                print(f"Hash inválido en bloque {i}")
-                return False
-            
-            # Verificar enlace con bloque anterior
-            if bloque_actual.hash_anterior != bloque_anterior.hash:
-                print(f"Cadena rota en bloque {i}")
-                return False
-            
-            # Verificar prueba de trabajo
-            if not bloque_actual.hash.startswith('0' * self.dificultad):
-                print(f"Prueba de trabajo inválida en bloque {i}")
+        inicio = 1
+        if not completa:
+            posicion = self._posicion_checkpoint()
+            if posicion is not None:
+                inicio = posicion + 1
+        
+        primera_firma = self.cadena.posicion_primera_firma()
+        
+        for i, bloque_actual in enumerate(self.cadena.iterar_bloques(inicio), start=inicio):
+            motivo = motivo_bloque_invalido(
+                bloque_actual, self.cadena.hash_en(i - 1), self.dificultad, self.firmante,
+                exigir_firma=primera_firma is not None and i > primera_firma
+            )
+            if motivo:
+                print(f"{motivo} en bloque {i}")
                 return False
         
+        # Avanzar la marca de agua hasta el último bloque validado
+        if len(self.cadena):
+            self.checkpoint_indice = self.cadena.indice_en(-1)
+            self.checkpoint_hash = self.cadena.hash_en(-1)
+        
         return True
     
     def obtener_bloque_por_hash(self, hash_buscado: str) -> Optional[Bloque]:
         """Busca un bloque específico por su hash"""
-        for bloque in self.cadena:
-            if bloque.hash == hash_buscado:
-                return bloque
-        return None
+        posicion = self.posiciones_por_hash.get(hash_buscado)
+        if posicion is None:
+            return None
+        return self.cadena[posicion]
     
     def obtener_bloques_por_evaluacion(self, id_evaluacion: int) -> List[Bloque]:
         """Obtiene todos los bloques relacionados a una evaluación"""
-        bloques = []
-        for bloque in self.cadena:
-            if bloque.datos.get('id_evaluacion') == id_evaluacion:
-                bloques.append(bloque)
-        return bloques
+        if self.posiciones_por_evaluacion is None:
+            self.posiciones_por_evaluacion = {}
+            for posicion, bloque in enumerate(self.cadena.iterar_bloques()):
+                self.indexar_bloque(bloque, posicion)
+        
+        return [self.cadena[posicion]
+                for posicion in self.posiciones_por_evaluacion.get(id_evaluacion, [])]
+
+# =============================================
+# COMPRESIÓN DE DATOS DE BLOQUES
+# =============================================
+
+# Nivel de zlib: 6 reduce casi lo mismo que 9 en JSON corto y es varias veces más rápido
+NIVEL_ZLIB = 6
+NIVEL_ZSTD = 3
+
+# Nombre guardado en blockchain_bloques.compresion -> (comprimir, descomprimir)
+# Los datos de cada bloque se comprimen y descomprimen enteros, en memoria
+COMPRESORES: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'zlib': (lambda datos: zlib.compress(datos, NIVEL_ZLIB), zlib.decompress),
+}
+
+if zstandard is not None:
+    COMPRESORES['zstd'] = (
+        zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress,
+        zstandard.ZstdDecompressor().decompress,
+    )
+
+def comprimir_datos(contenido: bytes, compresion: str) -> bytes:
+    """Comprime el contenido serializado de un bloque"""
+    try:
+        comprimir, _ = COMPRESORES[compresion]
+    except KeyError:
+        raise ValueError(f'Compresión no disponible: {compresion}') from None
+    return comprimir(contenido)
+
+def descomprimir_datos(contenido: bytes, compresion: str) -> bytes:
+    """Inversa de comprimir_datos"""
+    try:
+        _, descomprimir = COMPRESORES[compresion]
+    except KeyError:
+        raise ValueError(f'Compresión no disponible: {compresion}') from None
+    return descomprimir(bytes(contenido))
 
 # =============================================
 # FUNCIONES DE INTEGRACIÓN CON BD
 # =============================================
 
-def guardar_bloque_en_bd(cursor, bloque: Bloque) -> int:
+QUERY_INSERTAR_BLOQUE = """
+    INSERT INTO blockchain_bloques 
+    (indice, timestamp, hash, hash_anterior, nonce, version, algoritmo_hash, firma,
+     datos_json, datos_bin, datos_comprimidos, compresion)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
     """
-    Guarda un bloque en la base de datos
+
+# Columnas que necesita decodificar_datos_bloque, en su orden de argumentos
+COLUMNAS_DATOS_BLOQUE = "version, datos_json, datos_bin, datos_comprimidos, compresion"
+
+QUERY_INSERTAR_VINCULO = """
+    INSERT INTO blockchain_evaluaciones 
+    (id_evaluacion, id_bloque, hash_bloque, hash_datos, algoritmo_hash, prueba_merkle)
+    VALUES (%s, %s, %s, %s, %s, %s)
     """
-    query = """
-    INSERT INTO blockchain_bloques 
-    (indice, timestamp, hash, hash_anterior, nonce, datos_json)
+
+QUERY_INSERTAR_AUDITORIA = """
+    INSERT INTO blockchain_auditoria 
+    (id_evaluacion, tipo_operacion, hash_bloque, es_valida, detalles, usuario)
     VALUES (%s, %s, %s, %s, %s, %s)
     """
+
+def guardar_bloque_en_bd(cursor, bloque: Bloque, compresion: str = None) -> int:
+    """
+    Guarda un bloque en la base de datos
+    Con compresion ('zlib' o 'zstd') los datos van solo en datos_comprimidos
+    """
+    cursor.execute(QUERY_INSERTAR_BLOQUE, _valores_bloque(bloque, compresion))
     
-    datos_json = json.dumps(bloque.datos, default=str)
+    return cursor.lastrowid
+
+def _serializar_datos(version: int, datos: Dict) -> bytes:
+    """
+    Contenido que se guarda de los datos de un bloque
+    Los bloques binarios usan la codificación canónica: JSON no conserva los
+    tipos (fechas, decimales) que entran en su hash
+    """
+    if version == VERSION_BLOQUE_JSON:
+        return json.dumps(datos, default=str).encode()
+    return codificar_canonico(datos)
+
+def _valores_bloque(bloque: Bloque, compresion: str = None) -> Tuple:
+    """
+    Valores de la fila de blockchain_bloques para un bloque
+    Sin compresión los datos van en datos_json (versión 1) o datos_bin
+    """
+    contenido = _serializar_datos(bloque.version, bloque.datos)
+    datos_json = datos_bin = datos_comprimidos = None
+    if compresion:
+        datos_comprimidos = comprimir_datos(contenido, compresion)
+    elif bloque.version == VERSION_BLOQUE_JSON:
+        datos_json = contenido.decode()
+    else:
+        datos_bin = contenido
     
-    cursor.execute(query, (
+    return (
         bloque.indice,
         bloque.timestamp,
         bloque.hash,
         bloque.hash_anterior,
         bloque.nonce,
-        datos_json
-    ))
-    
-    return cursor.lastrowid
+        bloque.version,
+        bloque.algoritmo,
+        bloque.firma,
+        datos_json,
+        datos_bin,
+        datos_comprimidos,
+        compresion
+    )
+
+def decodificar_datos_bloque(version: int, datos_json: Optional[str], datos_bin: Optional[bytes],
+                             datos_comprimidos: Optional[bytes] = None,
+                             compresion: Optional[str] = None) -> Dict:
+    """
+    Datos de un bloque leído de la BD, en el formato con que se guardó
+    Recibe las columnas de COLUMNAS_DATOS_BLOQUE
+    """
+    if compresion:
+        contenido = descomprimir_datos(datos_comprimidos, compresion)
+        if version == VERSION_BLOQUE_JSON:
+            return json.loads(contenido)
+        return decodificar_canonico(contenido)
+    if datos_bin is not None:
+        return decodificar_canonico(bytes(datos_bin))
+    return json.loads(datos_json)
 
 def registrar_evaluacion_en_blockchain(cursor, id_evaluacion: int, 
-                                      bloque: Bloque, hash_datos: str):
+                                      bloque: Bloque, hash_datos: str,
+                                      prueba_merkle: List[List[str]] = None):
     """
     Registra la relación entre evaluación y bloque
+    En bloques por lote se guarda además la prueba de inclusión de Merkle
+    El hash de datos debe estar calculado con el algoritmo del bloque
     """
-    query = """
-    INSERT INTO blockchain_evaluaciones 
-    (id_evaluacion, id_bloque, hash_bloque, hash_datos)
-    VALUES (%s, %s, %s, %s)
-    """
-    
     # Obtener id_bloque
     cursor.execute(
         "SELECT id_bloque FROM blockchain_bloques WHERE hash = %s",
@@ -208,7 +1480,10 @@ def registrar_evaluacion_en_blockchain(cursor, id_evaluacion: int,
     )
     id_bloque = cursor.fetchone()[0]
     
-    cursor.execute(query, (id_evaluacion, id_bloque, bloque.hash, hash_datos))
+    cursor.execute(QUERY_INSERTAR_VINCULO, (
+        id_evaluacion, id_bloque, bloque.hash, hash_datos, bloque.algoritmo,
+        json.dumps(prueba_merkle) if prueba_merkle is not None else None
+    ))
 
 def registrar_auditoria(cursor, id_evaluacion: int, tipo_operacion: str,
                        hash_bloque: str = None, es_valida: bool = True,
@@ -216,18 +1491,245 @@ def registrar_auditoria(cursor, id_evaluacion: int, tipo_operacion: str,
     """
     Registra operaciones en auditoría
     """
-    query = """
-    INSERT INTO blockchain_auditoria 
-    (id_evaluacion, tipo_operacion, hash_bloque, es_valida, detalles, usuario)
-    VALUES (%s, %s, %s, %s, %s, %s)
+    cursor.execute(QUERY_INSERTAR_AUDITORIA, (
+        id_evaluacion, tipo_operacion, hash_bloque, 
+        es_valida, detalles, usuario
+    ))
+
+class PersistenciaDiferida:
+    """
+    Buffer de escritura (write-behind) para bloques, vínculos con evaluaciones
+    y filas de auditoría
+    Al vaciarse inserta cada tabla con un solo executemany multi-fila y confirma
+    todo en una única transacción
+    """
+    def __init__(self, connection, tamano_buffer: int = 1, compresion: str = None):
+        self.connection = connection
+        # Bloques acumulados antes de escribir (1 = escribir en cada registro)
+        self.tamano_buffer = tamano_buffer
+        self.compresion = compresion
+        self._bloques: List[Bloque] = []
+        self._vinculos: List[Tuple] = []
+        self._auditorias: List[Tuple] = []
+        # Vínculos evaluación-bloque ya confirmados en la BD
+        self.vinculos_confirmados = 0
+    
+    def agregar_bloque(self, bloque: Bloque):
+        """Encola un bloque nuevo"""
+        self._bloques.append(bloque)
+    
+    def agregar_vinculo(self, id_evaluacion: int, bloque: Bloque, hash_datos: str,
+                        prueba_merkle: List[List[str]] = None):
+        """Encola la relación evaluación-bloque (el bloque debe estar en el mismo buffer)"""
+        self._vinculos.append((
+            id_evaluacion, bloque.hash, hash_datos, bloque.algoritmo,
+            json.dumps(prueba_merkle) if prueba_merkle is not None else None
+        ))
+    
+    def agregar_auditoria(self, id_evaluacion: int, tipo_operacion: str,
+                          hash_bloque: str = None, es_valida: bool = True,
+                          detalles: str = None, usuario: str = None):
+        """Encola una fila de auditoría"""
+        self._auditorias.append((
+            id_evaluacion, tipo_operacion, hash_bloque, es_valida, detalles, usuario
+        ))
+    
+    def pendientes(self) -> int:
+        """Bloques esperando escritura"""
+        return len(self._bloques)
+    
+    def vinculos_pendientes(self) -> int:
+        """Vínculos evaluación-bloque esperando escritura"""
+        return len(self._vinculos)
+    
+    def vaciar_si_lleno(self):
+        """Escribe el buffer si alcanzó su tamaño"""
+        if len(self._bloques) >= self.tamano_buffer:
+            self.vaciar()
+    
+    def vaciar(self):
+        """
+        Escribe todo lo acumulado en una transacción
+        Si falla se revierte y el buffer se conserva para reintentar: los bloques
+        ya están en la cadena en memoria y los siguientes enlazan con ellos
+        """
+        if not (self._bloques or self._vinculos or self._auditorias):
+            return
+        
+        cursor = self.connection.cursor()
+        try:
+            ids_bloques = {}
+            if self._bloques:
+                cursor.executemany(QUERY_INSERTAR_BLOQUE, [
+                    _valores_bloque(b, self.compresion) for b in self._bloques
+                ])
+                
+                # Los ids se consultan por hash: con auto_increment_increment > 1 o
+                # innodb_autoinc_lock_mode 2 no son lastrowid + i (son pocos bloques)
+                hashes = [bloque.hash for bloque in self._bloques]
+                cursor.execute(
+                    f"SELECT hash, id_bloque FROM blockchain_bloques "
+                    f"WHERE hash IN ({', '.join(['%s'] * len(hashes))})",
+                    hashes
+                )
+                ids_bloques = dict(cursor.fetchall())
+            
+            if self._vinculos:
+                cursor.executemany(QUERY_INSERTAR_VINCULO, [
+                    (id_evaluacion, ids_bloques[hash_bloque], hash_bloque, hash_datos, algoritmo, prueba)
+                    for id_evaluacion, hash_bloque, hash_datos, algoritmo, prueba in self._vinculos
+                ])
+            
+            if self._auditorias:
+                cursor.executemany(QUERY_INSERTAR_AUDITORIA, self._auditorias)
+            
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        
+        self.vinculos_confirmados += len(self._vinculos)
+        self._bloques = []
+        self._vinculos = []
+        self._auditorias = []
+
+# Filas de auditoría que el sumidero retiene para reintentar si la BD falla
+MAXIMO_PENDIENTES_AUDITORIA = 50000
+
+class SumideroAuditoria:
+    """
+    Escritura asíncrona de filas de auditoría
+    Un hilo con conexión propia acumula las filas y las inserta con un solo
+    executemany cuando el buffer se llena o pasa intervalo_flush segundos
+    Si la BD no da abasto la cola se llena y registrar() bloquea (backpressure);
+    si el hilo ya no está vivo las filas se escriben en el acto
+    Las filas de una escritura fallida se reintentan en la siguiente (hasta
+    MAXIMO_PENDIENTES_AUDITORIA); cerrar() se registra con atexit para no
+    perder lo encolado si el programa termina sin llamarlo
     """
+    def __init__(self, db_config: Dict, tamano_buffer: int = 500,
+                 intervalo_flush: float = 2.0):
+        self.db_config = db_config
+        self.tamano_buffer = tamano_buffer
+        self.intervalo_flush = intervalo_flush
+        self.cola: queue.Queue = queue.Queue(maxsize=tamano_buffer)
+        self.connection = None
+        self.hilo: Optional[threading.Thread] = None
+        # Filas de escrituras fallidas que se reintentan en la siguiente
+        self.pendientes: List[Tuple] = []
+        self.escritas = 0
+        self.fallidas = 0
     
-    cursor.execute(query, (
-        id_evaluacion, tipo_operacion, hash_bloque, 
-        es_valida, detalles, usuario
-    ))
+    def iniciar(self):
+        """Abre la conexión del sumidero y arranca el hilo de escritura"""
+        self.connection = mysql.connector.connect(**self.db_config)
+        self.hilo = threading.Thread(target=self._procesar, name='sumidero-auditoria', daemon=True)
+        self.hilo.start()
+        atexit.register(self.cerrar)
+    
+    def registrar(self, id_evaluacion: int, tipo_operacion: str,
+                  hash_bloque: str = None, es_valida: bool = True,
+                  detalles: str = None, usuario: str = None):
+        """Encola una fila de auditoría (bloquea si el buffer está lleno)"""
+        fila = (id_evaluacion, tipo_operacion, hash_bloque, es_valida, detalles, usuario)
+        if not self._encolar(fila):
+            self._escribir([fila])
+    
+    def cerrar(self):
+        """Escribe lo pendiente, detiene el hilo y cierra la conexión"""
+        if self.hilo is None:
+            return
+        atexit.unregister(self.cerrar)
+        if self._encolar(None):
+            self.hilo.join()
+        self.hilo = None
+        
+        # Filas que dejó en la cola un hilo que terminó antes de tiempo
+        filas = []
+        while not self.cola.empty():
+            fila = self.cola.get_nowait()
+            if fila is not None:
+                filas.append(fila)
+        if filas or self.pendientes:
+            self._escribir(filas)
+        # Último intento: lo que siga sin escribirse se pierde
+        if self.pendientes:
+            self.fallidas += len(self.pendientes)
+            print(f"Auditoría sin escribir al cerrar: {len(self.pendientes)} filas")
+            self.pendientes = []
+        
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def _encolar(self, fila) -> bool:
+        """Encola esperando espacio mientras el hilo siga vivo; False si no lo está"""
+        while self.hilo is not None and self.hilo.is_alive():
+            try:
+                self.cola.put(fila, timeout=self.intervalo_flush)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _procesar(self):
+        """Bucle del hilo: junta filas hasta llenar el buffer o vencer el intervalo"""
+        terminar = False
+        while not terminar:
+            filas = []
+            limite = time.monotonic() + self.intervalo_flush
+            while len(filas) < self.tamano_buffer:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    fila = self.cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if fila is None:
+                    terminar = True
+                    break
+                filas.append(fila)
+            
+            if filas or self.pendientes:
+                self._escribir(filas)
+    
+    def _escribir(self, filas: List[Tuple]):
+        """
+        Inserta en una transacción las filas pendientes más las nuevas
+        Si falla, todas quedan pendientes para la siguiente escritura (con la
+        conexión reabierta si se perdió) sin detener el hilo; las que excedan
+        MAXIMO_PENDIENTES_AUDITORIA se descartan y se cuentan en fallidas
+        """
+        filas = self.pendientes + filas
+        self.pendientes = []
+        cursor = None
+        try:
+            if not self.connection.is_connected():
+                self.connection.reconnect()
+            cursor = self.connection.cursor()
+            cursor.executemany(QUERY_INSERTAR_AUDITORIA, filas)
+            self.connection.commit()
+            self.escritas += len(filas)
+        except Exception as e:
+            print(f"Error escribiendo auditoría ({len(filas)} filas, se reintentarán): {e}")
+            try:
+                self.connection.rollback()
+            except Exception:
+                pass
+            descartadas = len(filas) - MAXIMO_PENDIENTES_AUDITORIA
+            if descartadas > 0:
+                self.fallidas += descartadas
+                print(f"Auditoría descartada: {descartadas} filas más antiguas")
+                filas = filas[descartadas:]
+            self.pendientes = filas
+        finally:
+            if cursor is not None:
+                cursor.close()
 
-def calcular_hash_evaluacion(cursor, id_evaluacion: int) -> str:
+def calcular_hash_evaluacion(cursor, id_evaluacion: int,
+                             algoritmo: str = ALGORITMO_HASH_POR_DEFECTO) -> str:
     """
     Calcula el hash de todos los datos de una evaluación
     Incluye: evaluacion principal + evaluaciones especializadas
@@ -261,21 +1763,462 @@ def calcular_hash_evaluacion(cursor, id_evaluacion: int) -> str:
         'medicina': list(eval_med) if eval_med else None
     }
     
-    # Calcular hash
+    return _hash_datos_evaluacion(datos_completos, algoritmo)
+
+def _hash_datos_evaluacion(datos_completos: Dict,
+                           algoritmo: str = ALGORITMO_HASH_POR_DEFECTO) -> str:
+    """Hash de la estructura de datos completa de una evaluación"""
     datos_json = json.dumps(datos_completos, sort_keys=True, default=str)
-    return hashlib.sha256(datos_json.encode()).hexdigest()
+    return nuevo_hash(algoritmo, datos_json.encode()).hexdigest()
+
+# Tablas que forman el hash de una evaluación: (clave en el hash, tabla, clave primaria)
+TABLAS_HASH_EVALUACION = [
+    ('evaluacion_principal', 'evaluaciones', 'id_evaluacion'),
+    ('fonoaudiologia', 'eval_fonoaudiologia', 'id_fono'),
+    ('psicologia', 'eval_psicologia', 'id_psico'),
+    ('optometria', 'eval_optometria', 'id_opto'),
+    ('medicina', 'eval_medicina_general', 'id_medico'),
+]
+
+# Evaluaciones consultadas por cada tanda de calcular_hashes_evaluaciones
+TAMANO_LOTE_HASH = 1000
+
+def calcular_hashes_evaluaciones(cursor, ids_evaluaciones,
+                                 algoritmo: str = ALGORITMO_HASH_POR_DEFECTO
+                                 ) -> Iterator[Tuple[int, Optional[str]]]:
+    """
+    Versión masiva de calcular_hash_evaluacion
+    Recibe una lista o un range de ids y consulta cada tabla una sola vez por
+    tanda (IN o BETWEEN), agrupando las filas en memoria
+    Genera pares (id_evaluacion, hash_datos), con hash None si la evaluación no existe;
+    el hash es idéntico al de calcular_hash_evaluacion
+    """
+    es_rango = isinstance(ids_evaluaciones, range) and ids_evaluaciones.step == 1
+    if not es_rango:
+        ids_evaluaciones = list(ids_evaluaciones)
+    
+    for inicio in range(0, len(ids_evaluaciones), TAMANO_LOTE_HASH):
+        tanda = ids_evaluaciones[inicio:inicio + TAMANO_LOTE_HASH]
+        
+        if es_rango:
+            condicion = "id_evaluacion BETWEEN %s AND %s"
+            parametros = (tanda[0], tanda[-1])
+        else:
+            condicion = f"id_evaluacion IN ({', '.join(['%s'] * len(tanda))})"
+            parametros = tuple(tanda)
+        
+        # Por tabla: id_evaluacion -> primera fila, igual que el fetchone de la versión individual
+        filas_por_tabla = {}
+        for clave, tabla, clave_primaria in TABLAS_HASH_EVALUACION:
+            cursor.execute(
+                f"SELECT * FROM {tabla} WHERE {condicion} ORDER BY id_evaluacion, {clave_primaria}",
+                parametros
+            )
+            columna_id = cursor.column_names.index('id_evaluacion')
+            
+            filas = {}
+            for fila in cursor.fetchall():
+                filas.setdefault(fila[columna_id], fila)
+            filas_por_tabla[clave] = filas
+        
+        for id_evaluacion in tanda:
+            if id_evaluacion not in filas_por_tabla['evaluacion_principal']:
+                yield id_evaluacion, None
+                continue
+            
+            datos_completos = {}
+            for clave, _, _ in TABLAS_HASH_EVALUACION:
+                fila = filas_por_tabla[clave].get(id_evaluacion)
+                datos_completos[clave] = list(fila) if fila else None
+            
+            yield id_evaluacion, _hash_datos_evaluacion(datos_completos, algoritmo)
+
+# =============================================
+# AUDITORÍA MASIVA DE INTEGRIDAD
+# =============================================
+
+# Conexión propia de cada proceso worker (se asigna en el inicializador)
+_conexion_worker = None
+
+def _inicializar_worker_bd(db_config: Dict):
+    """Abre la conexión a BD del proceso worker"""
+    global _conexion_worker
+    _conexion_worker = mysql.connector.connect(**db_config)
+
+def _auditar_tanda(registros: List[Tuple[int, str, str]]) -> Tuple[int, List[Tuple[int, str, Optional[str]]]]:
+    """
+    Recalcula en el worker los hash de una tanda de evaluaciones registradas
+    Cada registro es (id_evaluacion, hash_datos, algoritmo_hash)
+    Retorna (cantidad_validas, [(id_evaluacion, hash_registrado, hash_actual), ...])
+    """
+    hashes_registrados = {}
+    ids_por_algoritmo: Dict[str, List[int]] = {}
+    for id_evaluacion, hash_datos, algoritmo in registros:
+        hashes_registrados[id_evaluacion] = hash_datos
+        ids_por_algoritmo.setdefault(algoritmo, []).append(id_evaluacion)
+    validas = 0
+    diferencias = []
+    
+    cursor = _conexion_worker.cursor()
+    for algoritmo, ids_evaluaciones in ids_por_algoritmo.items():
+        for id_evaluacion, hash_actual in calcular_hashes_evaluaciones(cursor, ids_evaluaciones, algoritmo):
+            if hash_actual == hashes_registrados[id_evaluacion]:
+                validas += 1
+            else:
+                diferencias.append((id_evaluacion, hashes_registrados[id_evaluacion], hash_actual))
+    cursor.close()
+    
+    # Cerrar la transacción de lectura para que la próxima tanda vea datos actuales
+    _conexion_worker.commit()
+    
+    return validas, diferencias
+
+def _tandas_registradas(cursor, tamano_tanda: int) -> Iterator[List[Tuple[int, str, str]]]:
+    """
+    Agrupa en tandas el registro más reciente de cada evaluación
+    (id_evaluacion, hash_datos, algoritmo_hash)
+    Pagina por id_evaluacion y lee cada página completa (fetchall), así entre
+    tandas no queda ningún resultado abierto en la conexión
+    """
+    ultimo_id = 0
+    while True:
+        cursor.execute("""
+            SELECT DISTINCT id_evaluacion
+            FROM blockchain_evaluaciones
+            WHERE id_evaluacion > %s
+            ORDER BY id_evaluacion
+            LIMIT %s
+        """, (ultimo_id, tamano_tanda))
+        ids = cursor.fetchall()
+        if not ids:
+            return
+        primer_id, ultimo_id = ids[0][0], ids[-1][0]
+        
+        cursor.execute("""
+            SELECT id_evaluacion, hash_datos, algoritmo_hash
+            FROM blockchain_evaluaciones
+            WHERE id_evaluacion BETWEEN %s AND %s
+            ORDER BY id_evaluacion, timestamp_registro, id_registro
+        """, (primer_id, ultimo_id))
+        # El último registro de cada evaluación reemplaza a los anteriores
+        registros = {registro[0]: tuple(registro) for registro in cursor.fetchall()}
+        yield list(registros.values())
+
+# Tandas leídas por adelantado para cada proceso del pool en cada ronda
+TANDAS_POR_PROCESO = 4
+
+# La marca de agua solo avanza: una auditoría que empezó antes del último
+# barrido no debe hacer que se revise de nuevo lo ya barrido (ni al revés)
+QUERY_GUARDAR_MARCA_BARRIDO = """
+    INSERT INTO blockchain_barrido (id_barrido, marca_agua)
+    VALUES (1, %s)
+    ON DUPLICATE KEY UPDATE marca_agua = GREATEST(marca_agua, VALUES(marca_agua))
+    """
+
+def auditar_integridad_completa(db_config: Dict, archivo_salida: str = 'auditoria_integridad.csv',
+                                procesos: int = None, tamano_tanda: int = TAMANO_LOTE_HASH) -> Dict:
+    """
+    Audita todas las evaluaciones registradas en blockchain
+    Las tandas se reparten entre un pool de procesos, cada uno con su conexión,
+    y las diferencias se escriben en el archivo CSV a medida que aparecen
+    Las tandas se leen en el hilo principal, por rondas de TANDAS_POR_PROCESO
+    por proceso: la conexión principal no se comparte con los hilos del pool
+    Al terminar deja la marca de agua del barrido en el inicio de la auditoría
+    Retorna los conteos de evaluaciones válidas, modificadas, eliminadas
+    (registradas pero sin datos al auditar) y no registradas
+    """
+    procesos = procesos or os.cpu_count() or 1
+    tiempo_inicio = time.time()
+    
+    print(f"\nAuditando integridad con {procesos} procesos...")
+    
+    connection = mysql.connector.connect(**db_config)
+    cursor = connection.cursor()
+    
+    # Lo modificado desde el inicio de la auditoría queda para el barrido incremental
+    cursor.execute("SELECT NOW()")
+    inicio_auditoria = cursor.fetchone()[0]
+    
+    validas = 0
+    modificadas = 0
+    eliminadas = 0
+    
+    with open(archivo_salida, 'w', newline='', encoding='utf-8') as archivo, \
+            multiprocessing.Pool(procesos, initializer=_inicializar_worker_bd,
+                                 initargs=(db_config,)) as pool:
+        escritor = csv.writer(archivo)
+        escritor.writerow(['id_evaluacion', 'estado', 'hash_registrado', 'hash_actual'])
+        
+        tandas = _tandas_registradas(cursor, tamano_tanda)
+        while True:
+            ronda = list(itertools.islice(tandas, procesos * TANDAS_POR_PROCESO))
+            if not ronda:
+                break
+            
+            for validas_tanda, diferencias in pool.imap_unordered(_auditar_tanda, ronda):
+                validas += validas_tanda
+                
+                for id_evaluacion, hash_registrado, hash_actual in diferencias:
+                    if hash_actual:
+                        estado = 'MODIFICADA'
+                        modificadas += 1
+                    else:
+                        estado = 'ELIMINADA'
+                        eliminadas += 1
+                    escritor.writerow([id_evaluacion, estado, hash_registrado, hash_actual or ''])
+                archivo.flush()
+                
+                auditadas = validas + modificadas + eliminadas
+                if auditadas % (tamano_tanda * 100) < tamano_tanda:
+                    print(f"   {auditadas} auditadas | {modificadas} modificadas | {eliminadas} eliminadas")
+    
+    # Evaluaciones que nunca se registraron en blockchain
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM evaluaciones e
+        WHERE NOT EXISTS (
+            SELECT 1 FROM blockchain_evaluaciones be
+            WHERE be.id_evaluacion = e.id_evaluacion
+        )
+    """)
+    no_registradas = cursor.fetchone()[0]
+    
+    cursor.execute(QUERY_GUARDAR_MARCA_BARRIDO, (inicio_auditoria,))
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+    
+    return {
+        'validas': validas,
+        'modificadas': modificadas,
+        'eliminadas': eliminadas,
+        'no_registradas': no_registradas,
+        'total_auditadas': validas + modificadas + eliminadas,
+        'archivo_diferencias': archivo_salida,
+        'tiempo_segundos': round(time.time() - tiempo_inicio, 2)
+    }
+
+# =============================================
+# VALIDACIÓN PARALELA DE LA CADENA
+# =============================================
+
+# Bloques (rango de índices) que revisa cada tarea del pool
+TAMANO_TRAMO_VALIDACION = 10000
+
+def _validar_tramo(tarea) -> Tuple:
+    """
+    Revisa en el worker los bloques guardados con índice entre desde y hasta
+    Los enlaces se revisan dentro del tramo; el del primer bloque lo revisa el
+    proceso principal contra el último hash del tramo anterior
+    Retorna (bloques, primer_indice, primer_hash_anterior, ultimo_hash, error)
+    con error (indice, motivo) o None
+    """
+    desde, hasta, dificultad, firmante, omitir_primero, indice_primera_firma = tarea
+    
+    bloques = 0
+    primer_indice = None
+    primer_hash_anterior = None
+    hash_previo = None
+    error = None
+    
+    cursor = _conexion_worker.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT indice, timestamp, hash, hash_anterior, nonce, algoritmo_hash, firma,
+                   {COLUMNAS_DATOS_BLOQUE}
+            FROM blockchain_bloques
+            WHERE indice BETWEEN %s AND %s
+            ORDER BY indice
+        """, (desde, hasta))
+        
+        while True:
+            filas = cursor.fetchmany(TAMANO_PAGINA_BLOQUES)
+            if not filas:
+                break
+            if error is not None:
+                # El cursor no es buffered: hay que leer el resto antes de cerrarlo
+                continue
+            for (indice, timestamp, hash_bloque, hash_anterior, nonce, algoritmo, firma,
+                 *columnas_datos) in filas:
+                bloque = Bloque(
+                    indice, timestamp, decodificar_datos_bloque(*columnas_datos),
+                    hash_anterior, nonce, hash=hash_bloque, version=columnas_datos[0],
+                    algoritmo=algoritmo, firma=firma
+                )
+                
+                # Igual que validar_cadena, el primer bloque de la cadena no se revisa
+                if bloques == 0:
+                    primer_indice, primer_hash_anterior = indice, hash_anterior
+                if not (bloques == 0 and omitir_primero):
+                    exigir_firma = indice_primera_firma is not None and indice > indice_primera_firma
+                    motivo = motivo_bloque_invalido(bloque, hash_previo, dificultad, firmante, exigir_firma)
+                    if motivo:
+                        error = (indice, motivo)
+                        break
+                
+                hash_previo = hash_bloque
+                bloques += 1
+    finally:
+        cursor.close()
+    _conexion_worker.commit()
+    
+    return bloques, primer_indice, primer_hash_anterior, hash_previo, error
+
+def validar_cadena_paralela(db_config: Dict, dificultad: int = 4, firmante=None,
+                            procesos: int = None,
+                            tamano_tramo: int = TAMANO_TRAMO_VALIDACION) -> Dict:
+    """
+    Valida toda la cadena guardada en blockchain_bloques repartiendo tramos de
+    índices entre un pool de procesos, cada uno con su conexión
+    Los tramos se revisan en orden, así el error reportado es el del primer
+    bloque inválido de la cadena
+    Retorna si es válida, el primer índice inválido y su motivo, los bloques
+    revisados y el hash del último bloque
+    """
+    procesos = procesos or os.cpu_count() or 1
+    tiempo_inicio = time.time()
+    
+    connection = mysql.connector.connect(**db_config)
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(indice), MAX(indice) FROM blockchain_bloques")
+    primero, ultimo = cursor.fetchone()
+    # Desde el primer bloque firmado los tramos rechazan bloques sin firma
+    cursor.execute("SELECT MIN(indice) FROM blockchain_bloques WHERE firma IS NOT NULL")
+    indice_primera_firma = cursor.fetchone()[0]
+    cursor.close()
+    connection.close()
+    
+    resultado = {
+        'valida': True,
+        'indice_invalido': None,
+        'motivo': None,
+        'bloques_validados': 0,
+        'ultimo_hash': None,
+    }
+    if primero is None:
+        resultado['tiempo_segundos'] = round(time.time() - tiempo_inicio, 2)
+        return resultado
+    
+    print(f"\nValidando bloques {primero}-{ultimo} con {procesos} procesos...")
+    
+    tareas = (
+        (desde, min(desde + tamano_tramo - 1, ultimo), dificultad, firmante, desde == primero,
+         indice_primera_firma)
+        for desde in range(primero, ultimo + 1, tamano_tramo)
+    )
+    
+    with multiprocessing.Pool(procesos, initializer=_inicializar_worker_bd,
+                              initargs=(db_config,)) as pool:
+        for bloques, primer_indice, primer_hash_anterior, ultimo_hash, error in pool.imap(
+                _validar_tramo, tareas):
+            if not bloques and not error:
+                continue
+            
+            # Enlace entre el último bloque del tramo anterior y el primero de este
+            # (si ese bloque ya falló dentro del tramo se conserva su motivo)
+            enlace_roto = (resultado['ultimo_hash'] is not None
+                           and primer_hash_anterior != resultado['ultimo_hash'])
+            if enlace_roto and not (error and error[0] == primer_indice):
+                error = (primer_indice, "Cadena rota")
+            
+            if error:
+                indice, motivo = error
+                resultado.update(valida=False, indice_invalido=indice, motivo=motivo)
+                print(f"{motivo} en bloque {indice}")
+                break
+            
+            resultado['bloques_validados'] += bloques
+            resultado['ultimo_hash'] = ultimo_hash
+    
+    resultado['tiempo_segundos'] = round(time.time() - tiempo_inicio, 2)
+    return resultado
 
 # =============================================
 # CLASE PRINCIPAL DEL SISTEMA
 # =============================================
 
+# Filas por página al leer encabezados y datos de blockchain_bloques
+TAMANO_PAGINA_BLOQUES = 5000
+
+# Certificados de integridad guardados en memoria (LRU)
+TAMANO_CACHE_CERTIFICADOS = 1024
+
+# Registro más reciente de una evaluación en blockchain
+QUERY_REGISTRO_EVALUACION = """
+    SELECT hash_bloque, hash_datos, algoritmo_hash, prueba_merkle
+    FROM blockchain_evaluaciones
+    WHERE id_evaluacion = %s
+    ORDER BY timestamp_registro DESC
+    LIMIT 1
+    """
+
+# Versión de una evaluación para la caché de certificados, en una sola consulta
+# por índices: último cambio de cada tabla de la evaluación (los borrados de
+# filas hijas tocan evaluaciones.updated_at por trigger), último registro
+# blockchain y la hora del servidor
+QUERY_VERSION_EVALUACION = """
+    SELECT e.updated_at,
+           (SELECT MAX(updated_at) FROM eval_fonoaudiologia WHERE id_evaluacion = e.id_evaluacion),
+           (SELECT MAX(updated_at) FROM eval_psicologia WHERE id_evaluacion = e.id_evaluacion),
+           (SELECT MAX(updated_at) FROM eval_optometria WHERE id_evaluacion = e.id_evaluacion),
+           (SELECT MAX(updated_at) FROM eval_medicina_general WHERE id_evaluacion = e.id_evaluacion),
+           (SELECT MAX(id_registro) FROM blockchain_evaluaciones WHERE id_evaluacion = e.id_evaluacion),
+           NOW()
+    FROM evaluaciones e
+    WHERE e.id_evaluacion = %s
+    """
+
 class SistemaBlockchainEvaluaciones:
     """
     Sistema completo de blockchain integrado con la base de datos
     """
-    def __init__(self, db_config: Dict, dificultad: int = 4):
+    def __init__(self, db_config: Dict, dificultad: int = 4, procesos_mineria: int = None,
+                 tamano_buffer_escritura: int = 1, tamano_buffer_auditoria: int = 500,
+                 intervalo_flush_auditoria: float = 2.0,
+                 tamano_cache_certificados: int = TAMANO_CACHE_CERTIFICADOS,
+                 version_bloque: int = VERSION_BLOQUE_ACTUAL,
+                 algoritmo_hash: str = ALGORITMO_HASH_POR_DEFECTO,
+                 consenso: str = CONSENSO_POW, clave_firma: str = None,
+                 ruta_snapshot: str = None, procesos_validacion: int = None,
+                 compresion: str = None, clave_snapshot: str = None):
         self.db_config = db_config
-        self.blockchain = BlockchainEvaluaciones(dificultad=dificultad)
+        # Compresión de los datos de bloques nuevos ('zlib', 'zstd' o None)
+        if compresion and compresion not in COMPRESORES:
+            raise ValueError(f'Compresión no disponible: {compresion}')
+        self.compresion = compresion
+        # Procesos de la revalidación completa (1 = secuencial sobre la cadena en memoria)
+        self.procesos_validacion = procesos_validacion or os.cpu_count() or 1
+        # Archivo con los encabezados de la cadena para arrancar sin leer toda la tabla
+        # Se autentica con la clave HMAC (hex): pedir un snapshot sin clave es un error
+        clave_snapshot = (
+            clave_snapshot or (clave_firma if consenso == CONSENSO_HMAC else None)
+            or os.getenv('BLOCKCHAIN_CLAVE_HMAC')
+        )
+        self.clave_snapshot = bytes.fromhex(clave_snapshot) if clave_snapshot else None
+        if ruta_snapshot and self.clave_snapshot is None:
+            raise ValueError('El snapshot de la cadena requiere la clave HMAC (BLOCKCHAIN_CLAVE_HMAC)')
+        self.ruta_snapshot = ruta_snapshot
+        self.bloques_en_snapshot = 0
+        # id_evaluacion -> (punta de la cadena, versión de los datos, certificado)
+        self.tamano_cache_certificados = tamano_cache_certificados
+        self.cache_certificados: OrderedDict = OrderedDict()
+        # Auditoría de verificaciones: se escribe en segundo plano (0 = síncrona)
+        self.tamano_buffer_auditoria = tamano_buffer_auditoria
+        self.intervalo_flush_auditoria = intervalo_flush_auditoria
+        self.sumidero_auditoria: Optional[SumideroAuditoria] = None
+        # Bloques registrados que se acumulan antes de escribirlos en la BD
+        self.tamano_buffer_escritura = tamano_buffer_escritura
+        self.persistencia: Optional[PersistenciaDiferida] = None
+        # Por defecto se mina con todos los núcleos disponibles (1 = minería secuencial)
+        self.minador = MinadorParalelo(procesos_mineria)
+        # El génesis se crea solo si la BD no tiene cadena (ver cargar_blockchain_desde_bd)
+        # Con consenso 'hmac' o 'ed25519' los bloques se firman en lugar de minarse
+        self.blockchain = BlockchainEvaluaciones(
+            dificultad=dificultad, minador=self.minador, crear_genesis=False,
+            version_bloque=version_bloque, algoritmo_hash=algoritmo_hash,
+            firmante=crear_firmante(consenso, clave_firma)
+        )
         self.connection = None
         self.cursor = None
     
@@ -284,14 +2227,30 @@ class SistemaBlockchainEvaluaciones:
         try:
             self.connection = mysql.connector.connect(**self.db_config)
             self.cursor = self.connection.cursor()
+            self.persistencia = PersistenciaDiferida(
+                self.connection, self.tamano_buffer_escritura, self.compresion
+            )
             print("Conectado a la base de datos")
             return True
         except Error as e:
             print(f"Error de conexión: {e}")
             return False
     
+    def vaciar_escrituras(self):
+        """Escribe en la BD los registros que queden en el buffer"""
+        if self.persistencia:
+            self.persistencia.vaciar()
+    
     def desconectar(self):
         """Cierra la conexión"""
+        self.minador.cerrar()
+        if self.sumidero_auditoria:
+            self.sumidero_auditoria.cerrar()
+            self.sumidero_auditoria = None
+        if self.connection and self.connection.is_connected():
+            self.vaciar_escrituras()
+            if self.snapshot_pendiente():
+                self.guardar_snapshot()
         if self.cursor:
             self.cursor.close()
         if self.connection and self.connection.is_connected():
@@ -308,40 +2267,397 @@ class SistemaBlockchainEvaluaciones:
         
         return True
     
+    def cargar_snapshot(self) -> Optional[Tuple[CadenaCompacta, array]]:
+        """
+        Lee el snapshot de la cadena si existe y sigue vigente: su último bloque
+        debe estar en la BD con el mismo hash (si no, la BD se reinició o se
+        reescribió y hay que cargar todo de nuevo)
+        Los encabezados posteriores al checkpoint se comparan con los de la BD:
+        la validación incremental parte de ellos, así que no basta con el MAC
+        """
+        snapshot = leer_snapshot_cadena(
+            self.ruta_snapshot, self.clave_snapshot,
+            self.cargar_datos_bloque, self.iterar_datos_bloques
+        )
+        if snapshot is None or not len(snapshot[0]):
+            return None
+        
+        # Sin un checkpoint que coincida con el snapshot se comparan todos sus
+        # encabezados; siempre se compara al menos el último
+        cadena = snapshot[0]
+        desde = cadena.indice_en(0) - 1
+        checkpoint = self.blockchain.checkpoint_indice
+        if checkpoint is not None and 0 <= checkpoint - cadena.indice_en(0) < len(cadena):
+            if cadena.hash_en(checkpoint - cadena.indice_en(0)) == self.blockchain.checkpoint_hash:
+                desde = checkpoint
+        desde = min(desde, cadena.indice_en(-1) - 1)
+        self.cursor.execute("""
+            SELECT indice, timestamp, hash, hash_anterior, nonce, version, algoritmo_hash, firma
+            FROM blockchain_bloques
+            WHERE indice > %s AND indice <= %s
+            ORDER BY indice
+        """, (desde, cadena.indice_en(-1)))
+        
+        posicion = max(desde + 1 - cadena.indice_en(0), 0)
+        vigente = True
+        while True:
+            filas = self.cursor.fetchmany(TAMANO_PAGINA_BLOQUES)
+            if not filas:
+                break
+            for indice, timestamp, hash_bloque, hash_anterior, nonce, version, algoritmo, firma in filas:
+                if not vigente:
+                    continue
+                encabezado_bd = (
+                    indice, float(timestamp), hash_bloque, hash_anterior, nonce, version,
+                    algoritmo, firma or None
+                )
+                if posicion >= len(cadena) or cadena.encabezado_en(posicion) != encabezado_bd:
+                    vigente = False
+                posicion += 1
+        
+        # Debe haber llegado hasta el último bloque del snapshot sin diferencias
+        if not vigente or posicion != len(cadena):
+            print("Snapshot de la cadena desactualizado, se carga desde la BD")
+            return None
+        
+        return snapshot
+    
+    def snapshot_pendiente(self) -> bool:
+        """Hay que reescribir el snapshot (la cadena creció lo suficiente desde el último)"""
+        return bool(self.ruta_snapshot) and (
+            len(self.blockchain.cadena) - self.bloques_en_snapshot >= BLOQUES_MINIMOS_SNAPSHOT
+        )
+    
+    def guardar_snapshot(self):
+        """Escribe el snapshot con los encabezados actuales de la cadena"""
+        indice = self.blockchain.posiciones_por_hash
+        orden_previo = indice.orden if isinstance(indice, IndiceHashes) else None
+        escribir_snapshot_cadena(
+            self.blockchain.cadena, self.ruta_snapshot, self.clave_snapshot, orden_previo
+        )
+        self.bloques_en_snapshot = len(self.blockchain.cadena)
+    
     def cargar_blockchain_desde_bd(self):
-        """Carga la blockchain desde la base de datos"""
-        query = """
-        SELECT indice, timestamp, hash, hash_anterior, nonce, datos_json
-        FROM blockchain_bloques
-        ORDER BY indice
         """
+        Carga la blockchain desde la base de datos
+        Solo se leen los encabezados; los datos de cada bloque se cargan bajo demanda
+        Si hay un snapshot vigente solo se leen los bloques posteriores a él
+        """
+        self.cargar_checkpoint()
+        snapshot = self.cargar_snapshot() if self.ruta_snapshot else None
+        
+        if snapshot:
+            cadena, orden_hashes = snapshot
+            self.bloques_en_snapshot = len(cadena)
+            self.cursor.execute("""
+                SELECT indice, timestamp, hash, hash_anterior, nonce, version, algoritmo_hash, firma
+                FROM blockchain_bloques
+                WHERE indice > %s
+                ORDER BY indice
+            """, (cadena.indice_en(-1),))
+        else:
+            cadena = CadenaCompacta(self.cargar_datos_bloque, self.iterar_datos_bloques)
+            orden_hashes = None
+            self.cursor.execute("""
+                SELECT indice, timestamp, hash, hash_anterior, nonce, version, algoritmo_hash, firma
+                FROM blockchain_bloques
+                ORDER BY indice
+            """)
         
-        self.cursor.execute(query)
-        bloques = self.cursor.fetchall()
+        while True:
+            filas = self.cursor.fetchmany(TAMANO_PAGINA_BLOQUES)
+            if not filas:
+                break
+            for fila in filas:
+                cadena.agregar_encabezado(*fila)
         
-        if not bloques:
+        if not len(cadena):
             print("No hay blockchain previa, se creará nueva")
+            # Persistir el génesis para que no se vuelva a minar en cada arranque
+            bloque_genesis = self.blockchain.crear_bloque_genesis()
+            guardar_bloque_en_bd(self.cursor, bloque_genesis, self.compresion)
+            self.connection.commit()
             return
         
-        # Si hay bloques, reconstruir la cadena
-        self.blockchain.cadena = []
+        # Si hay bloques, reemplazar la cadena
+        self.blockchain.cargar_cadena(cadena, orden_hashes, self.cargar_posiciones_por_evaluacion(cadena))
+        
+        print(f"Blockchain cargada: {len(self.blockchain.cadena)} bloques"
+              + (f" ({self.bloques_en_snapshot} desde snapshot)" if snapshot else ""))
+        
+        # Validar integridad (solo los bloques posteriores al checkpoint)
+        if self.validar_cadena():
+            print("Blockchain válida")
+            if self.snapshot_pendiente():
+                self.guardar_snapshot()
+        else:
+            print("ADVERTENCIA: Blockchain corrupta")
+    
+    def cargar_posiciones_por_evaluacion(self, cadena: CadenaCompacta) -> Dict[int, List[int]]:
+        """
+        Índice id_evaluacion -> posiciones en la cadena, desde los vínculos de
+        blockchain_evaluaciones (sin leer ni decodificar los datos de los bloques)
+        Las evaluaciones borradas pierden sus vínculos (ON DELETE CASCADE) y no aparecen
+        """
+        posiciones: Dict[int, List[int]] = {}
+        primer_indice = cadena.indice_en(0)
+        self.cursor.execute("""
+            SELECT be.id_evaluacion, bb.indice
+            FROM blockchain_evaluaciones be
+            JOIN blockchain_bloques bb ON bb.id_bloque = be.id_bloque
+            ORDER BY be.id_registro
+        """)
+        while True:
+            filas = self.cursor.fetchmany(TAMANO_PAGINA_BLOQUES)
+            if not filas:
+                break
+            for id_evaluacion, indice in filas:
+                posicion = indice - primer_indice
+                if 0 <= posicion < len(cadena):
+                    posiciones.setdefault(id_evaluacion, []).append(posicion)
+        
+        for lista in posiciones.values():
+            if len(lista) > 1:
+                lista.sort()
+        return posiciones
+    
+    def cargar_datos_bloque(self, indice: int) -> Dict:
+        """Lee y decodifica los datos de un bloque guardado"""
+        self.cursor.execute(
+            f"SELECT {COLUMNAS_DATOS_BLOQUE} FROM blockchain_bloques WHERE indice = %s", (indice,)
+        )
+        fila = self.cursor.fetchone()
+        return decodificar_datos_bloque(*fila) if fila else {}
+    
+    def iterar_datos_bloques(self, desde: int, hasta: int) -> Iterator[Tuple[int, Dict]]:
+        """Recorre (indice, datos) de un rango de bloques, una página por consulta"""
+        while desde <= hasta:
+            limite = min(desde + TAMANO_PAGINA_BLOQUES - 1, hasta)
+            self.cursor.execute(f"""
+                SELECT indice, {COLUMNAS_DATOS_BLOQUE}
+                FROM blockchain_bloques
+                WHERE indice BETWEEN %s AND %s
+                ORDER BY indice
+            """, (desde, limite))
+            
+            for indice, *columnas_datos in self.cursor.fetchall():
+                yield indice, decodificar_datos_bloque(*columnas_datos)
+            
+            desde = limite + 1
+    
+    def migrar_compresion_bloques(self, compresion: str = 'zlib',
+                                  tamano_lote: int = TAMANO_PAGINA_BLOQUES) -> int:
+        """
+        Comprime los datos de los bloques guardados sin compresión
+        Avanza por id_bloque en lotes, cada uno en su propia transacción, así
+        puede interrumpirse y retomarse; retorna la cantidad de bloques migrados
+        """
+        if compresion not in COMPRESORES:
+            raise ValueError(f'Compresión no disponible: {compresion}')
         
-        for row in bloques:
-            indice, timestamp, hash_bloque, hash_anterior, nonce, datos_json = row
-            datos = json.loads(datos_json)
+        migrados = 0
+        ultimo_id = 0
+        while True:
+            self.cursor.execute("""
+                SELECT id_bloque, datos_json, datos_bin
+                FROM blockchain_bloques
+                WHERE id_bloque > %s AND compresion IS NULL
+                ORDER BY id_bloque
+                LIMIT %s
+            """, (ultimo_id, tamano_lote))
+            filas = self.cursor.fetchall()
+            if not filas:
+                break
             
-            bloque = Bloque(indice, timestamp, datos, hash_anterior, nonce)
-            bloque.hash = hash_bloque  # Usar hash almacenado
+            valores = []
+            for id_bloque, datos_json, datos_bin in filas:
+                contenido = bytes(datos_bin) if datos_bin is not None else datos_json.encode()
+                valores.append((comprimir_datos(contenido, compresion), compresion, id_bloque))
             
-            self.blockchain.cadena.append(bloque)
+            self.cursor.executemany("""
+                UPDATE blockchain_bloques
+                SET datos_comprimidos = %s, compresion = %s, datos_json = NULL, datos_bin = NULL
+                WHERE id_bloque = %s
+            """, valores)
+            self.connection.commit()
+            
+            migrados += len(filas)
+            ultimo_id = filas[-1][0]
+            print(f"   {migrados} bloques comprimidos")
         
-        print(f"Blockchain cargada: {len(self.blockchain.cadena)} bloques")
+        return migrados
+    
+    def cargar_checkpoint(self):
+        """Lee de la BD la marca de agua de validación de la cadena"""
+        self.cursor.execute("""
+            SELECT indice_validado, hash_validado
+            FROM blockchain_checkpoint
+            WHERE id_checkpoint = 1
+        """)
+        checkpoint = self.cursor.fetchone()
         
-        # Validar integridad
-        if self.blockchain.validar_cadena():
-            print("Blockchain válida")
+        if checkpoint:
+            self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash = checkpoint
+    
+    def guardar_checkpoint(self):
+        """Persiste la marca de agua de validación de la cadena"""
+        if self.blockchain.checkpoint_indice is None:
+            self.cursor.execute("DELETE FROM blockchain_checkpoint WHERE id_checkpoint = 1")
         else:
-            print("ADVERTENCIA: Blockchain corrupta")
+            self.cursor.execute("""
+                INSERT INTO blockchain_checkpoint (id_checkpoint, indice_validado, hash_validado)
+                VALUES (1, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    indice_validado = VALUES(indice_validado),
+                    hash_validado = VALUES(hash_validado)
+            """, (self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash))
+        self.connection.commit()
+    
+    def validar_cadena(self, completa: bool = False) -> bool:
+        """
+        Valida la cadena y persiste el checkpoint si avanzó
+        Si una validación completa falla se descarta el checkpoint, para que
+        las validaciones incrementales siguientes también detecten el daño
+        """
+        checkpoint_previo = (self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash)
+        
+        cadena_valida = self.blockchain.validar_cadena(completa=completa)
+        
+        if not cadena_valida and completa:
+            self.blockchain.checkpoint_indice = None
+            self.blockchain.checkpoint_hash = None
+        
+        checkpoint_actual = (self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash)
+        if checkpoint_actual != checkpoint_previo:
+            self.guardar_checkpoint()
+        
+        return cadena_valida
+    
+    def cargar_marca_barrido(self) -> Optional[datetime]:
+        """
+        Marca de agua del barrido de modificaciones
+        La fijan el barrido anterior o la última auditoría completa; None si
+        no hubo ninguno (el primer barrido sería rehashear todo)
+        """
+        self.cursor.execute("SELECT marca_agua FROM blockchain_barrido WHERE id_barrido = 1")
+        fila = self.cursor.fetchone()
+        return fila[0] if fila else None
+    
+    def barrer_modificaciones(self, usuario: str = 'sistema') -> Dict:
+        """
+        Barrido incremental de integridad
+        Busca por updated_at las evaluaciones con filas cambiadas desde la
+        última marca de agua, recalcula solo sus hash y registra
+        INTENTO_MODIFICACION en las que no coinciden con el registro blockchain
+        La nueva marca es el NOW() del inicio y se compara con >=, así no se
+        pierden cambios hechos durante el barrido ni en el mismo segundo
+        Sin marca previa no se barre: primero hay que ejecutar la auditoría
+        completa (auditar_integridad_completa), que la fija
+        Los borrados de filas hijas se ven porque los triggers de init_sincro.sql
+        tocan updated_at de la evaluación; borrar la evaluación elimina también
+        su registro blockchain (ON DELETE CASCADE) y no lo detecta el barrido,
+        sino la revalidación de la cadena
+        """
+        tiempo_inicio = time.time()
+        
+        self.cursor.execute("SELECT NOW()")
+        nueva_marca = self.cursor.fetchone()[0]
+        marca = self.cargar_marca_barrido()
+        
+        resultado = {'revisadas': 0, 'modificadas': [], 'marca_agua': marca}
+        if marca is None:
+            print("Sin marca de agua: ejecute primero la auditoría completa de evaluaciones")
+            resultado['tiempo_segundos'] = round(time.time() - tiempo_inicio, 2)
+            return resultado
+        resultado['marca_agua'] = nueva_marca
+        
+        # Evaluaciones con alguna fila cambiada (usa el índice por updated_at)
+        ids_cambiados = set()
+        for _, tabla, _ in TABLAS_HASH_EVALUACION:
+            self.cursor.execute(
+                f"SELECT DISTINCT id_evaluacion FROM {tabla} WHERE updated_at >= %s", (marca,)
+            )
+            ids_cambiados.update(fila[0] for fila in self.cursor.fetchall())
+        
+        # Último registro blockchain de cada una (las no registradas se ignoran)
+        registros = {}
+        ids_ordenados = sorted(ids_cambiados)
+        for inicio in range(0, len(ids_ordenados), TAMANO_LOTE_HASH):
+            tanda = ids_ordenados[inicio:inicio + TAMANO_LOTE_HASH]
+            self.cursor.execute(f"""
+                SELECT id_evaluacion, hash_bloque, hash_datos, algoritmo_hash
+                FROM blockchain_evaluaciones
+                WHERE id_evaluacion IN ({', '.join(['%s'] * len(tanda))})
+                ORDER BY id_evaluacion, timestamp_registro, id_registro
+            """, tuple(tanda))
+            for id_evaluacion, hash_bloque, hash_datos, algoritmo in self.cursor.fetchall():
+                registros[id_evaluacion] = (hash_bloque, hash_datos, algoritmo)
+        
+        ids_por_algoritmo: Dict[str, List[int]] = {}
+        for id_evaluacion, (_, _, algoritmo) in registros.items():
+            ids_por_algoritmo.setdefault(algoritmo, []).append(id_evaluacion)
+        
+        for algoritmo, ids_evaluaciones in ids_por_algoritmo.items():
+            for id_evaluacion, hash_actual in calcular_hashes_evaluaciones(
+                    self.cursor, ids_evaluaciones, algoritmo):
+                hash_bloque, hash_registrado, _ = registros[id_evaluacion]
+                resultado['revisadas'] += 1
+                if hash_actual == hash_registrado:
+                    continue
+                
+                resultado['modificadas'].append(id_evaluacion)
+                self.auditar_verificacion(
+                    id_evaluacion, 'INTENTO_MODIFICACION',
+                    hash_bloque, False,
+                    f'Barrido: hash original: {hash_registrado}, hash actual: {hash_actual}',
+                    usuario
+                )
+        
+        self.cursor.execute(QUERY_GUARDAR_MARCA_BARRIDO, (nueva_marca,))
+        self.connection.commit()
+        
+        resultado['tiempo_segundos'] = round(time.time() - tiempo_inicio, 2)
+        return resultado
+    
+    def revalidar_cadena_completa(self) -> bool:
+        """
+        Auditoría profunda: vuelve a hashear todos los bloques desde el génesis
+        ignorando el checkpoint
+        Con varios procesos se valida en paralelo lo guardado en la BD, que
+        además debe terminar en el mismo bloque que la cadena en memoria
+        """
+        print(f"\nRevalidando {len(self.blockchain.cadena)} bloques desde el génesis...")
+        
+        if self.procesos_validacion > 1:
+            self.vaciar_escrituras()
+            resultado = validar_cadena_paralela(
+                self.db_config, self.blockchain.dificultad, self.blockchain.firmante,
+                self.procesos_validacion
+            )
+            cadena = self.blockchain.cadena
+            valida = resultado['valida'] and (
+                not len(cadena) or resultado['ultimo_hash'] == cadena.hash_en(-1)
+            )
+            
+            # Mismo manejo del checkpoint que validar_cadena(completa=True)
+            checkpoint_previo = (self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash)
+            if valida and len(cadena):
+                self.blockchain.checkpoint_indice = cadena.indice_en(-1)
+                self.blockchain.checkpoint_hash = cadena.hash_en(-1)
+            elif not valida:
+                self.blockchain.checkpoint_indice = None
+                self.blockchain.checkpoint_hash = None
+            if (self.blockchain.checkpoint_indice, self.blockchain.checkpoint_hash) != checkpoint_previo:
+                self.guardar_checkpoint()
+        else:
+            valida = self.validar_cadena(completa=True)
+        
+        if valida:
+            print("Blockchain válida")
+            return True
+        
+        print("ADVERTENCIA: Blockchain corrupta")
+        return False
     
     def registrar_evaluacion(self, id_evaluacion: int, usuario: str = 'sistema') -> bool:
         """
@@ -355,8 +2671,10 @@ class SistemaBlockchainEvaluaciones:
 
         print(f"\nRegistrando evaluación {id_evaluacion} en blockchain...")
         
-        # Calcular hash de los datos de la evaluación
-        hash_datos = calcular_hash_evaluacion(self.cursor, id_evaluacion)
+        # Calcular hash de los datos de la evaluación (con el algoritmo de los bloques nuevos)
+        hash_datos = calcular_hash_evaluacion(
+            self.cursor, id_evaluacion, self.blockchain.algoritmo_hash
+        )
         
         if not hash_datos:
             print(f"No se encontró la evaluación {id_evaluacion}")
@@ -397,19 +2715,16 @@ class SistemaBlockchainEvaluaciones:
         # Agregar bloque a la cadena
         nuevo_bloque = self.blockchain.agregar_bloque(datos_bloque)
         
-        # Guardar en BD
-        guardar_bloque_en_bd(self.cursor, nuevo_bloque)
-        registrar_evaluacion_en_blockchain(
-            self.cursor, id_evaluacion, nuevo_bloque, hash_datos
-        )
-        registrar_auditoria(
-            self.cursor, id_evaluacion, 'CREACION', 
+        # Guardar en BD (se escribe en bloque cuando se llena el buffer)
+        self.persistencia.agregar_bloque(nuevo_bloque)
+        self.persistencia.agregar_vinculo(id_evaluacion, nuevo_bloque, hash_datos)
+        self.persistencia.agregar_auditoria(
+            id_evaluacion, 'CREACION', 
             nuevo_bloque.hash, True, 
             f'Evaluación registrada en bloque {nuevo_bloque.indice}',
             usuario
         )
-        
-        self.connection.commit()
+        self.persistencia.vaciar_si_lleno()
         
         print(f"Evaluación {id_evaluacion} registrada en bloque {nuevo_bloque.indice}")
         print(f"   Hash del bloque: {nuevo_bloque.hash}")
@@ -417,6 +2732,99 @@ class SistemaBlockchainEvaluaciones:
         
         return True
     
+    def registrar_lote_evaluaciones(self, ids_evaluaciones: List[int],
+                                    usuario: str = 'sistema') -> int:
+        """
+        Registra varias evaluaciones en un único bloque
+        El bloque guarda la raíz de Merkle de los hash de datos y cada
+        evaluación queda vinculada con su prueba de inclusión
+        Retorna la cantidad de evaluaciones registradas
+        """
+        try:
+            self.connection.commit()
+        except Exception as e:
+            print(f"Advertencia al hacer commit: {e}")
+        
+        print(f"\nRegistrando lote de {len(ids_evaluaciones)} evaluaciones en blockchain...")
+        
+        # Calcular hash de los datos de cada evaluación
+        ids_lote = []
+        hashes_lote = []
+        for id_evaluacion, hash_datos in calcular_hashes_evaluaciones(
+                self.cursor, ids_evaluaciones, self.blockchain.algoritmo_hash):
+            if not hash_datos:
+                print(f"No se encontró la evaluación {id_evaluacion}")
+                continue
+            ids_lote.append(id_evaluacion)
+            hashes_lote.append(hash_datos)
+        
+        if not ids_lote:
+            return 0
+        
+        niveles = construir_arbol_merkle(hashes_lote, self.blockchain.algoritmo_hash)
+        raiz_merkle = niveles[-1][0]
+        
+        # Crear datos del bloque
+        datos_bloque = {
+            'tipo': 'LOTE_EVALUACIONES',
+            'evaluaciones': ids_lote,
+            'total_evaluaciones': len(ids_lote),
+            'raiz_merkle': raiz_merkle,
+            'version_merkle': VERSION_MERKLE_ACTUAL,
+            'timestamp_registro': datetime.now().isoformat(),
+            'registrado_por': usuario
+        }
+        
+        # Agregar bloque a la cadena
+        nuevo_bloque = self.blockchain.agregar_bloque(datos_bloque)
+        
+        # Guardar en BD (se escribe en bloque cuando se llena el buffer)
+        self.persistencia.agregar_bloque(nuevo_bloque)
+        for posicion, (id_evaluacion, hash_datos) in enumerate(zip(ids_lote, hashes_lote)):
+            self.persistencia.agregar_vinculo(
+                id_evaluacion, nuevo_bloque, hash_datos,
+                obtener_prueba_merkle(niveles, posicion)
+            )
+            self.persistencia.agregar_auditoria(
+                id_evaluacion, 'CREACION',
+                nuevo_bloque.hash, True,
+                f'Evaluación registrada en bloque {nuevo_bloque.indice} (lote de {len(ids_lote)})',
+                usuario
+            )
+        self.persistencia.vaciar_si_lleno()
+        
+        print(f"Lote registrado en bloque {nuevo_bloque.indice}")
+        print(f"   Hash del bloque: {nuevo_bloque.hash}")
+        print(f"   Raíz de Merkle: {raiz_merkle}")
+        
+        return len(ids_lote)
+    
+    def auditar_verificacion(self, id_evaluacion: int, tipo_operacion: str,
+                             hash_bloque: str = None, es_valida: bool = True,
+                             detalles: str = None, usuario: str = None):
+        """
+        Registra el resultado de una verificación en blockchain_auditoria
+        Con buffer la fila va al sumidero asíncrono (se arranca al primer uso);
+        sin buffer se inserta y confirma en la conexión principal
+        """
+        if self.tamano_buffer_auditoria <= 0:
+            registrar_auditoria(
+                self.cursor, id_evaluacion, tipo_operacion,
+                hash_bloque, es_valida, detalles, usuario
+            )
+            self.connection.commit()
+            return
+        
+        if self.sumidero_auditoria is None:
+            self.sumidero_auditoria = SumideroAuditoria(
+                self.db_config, self.tamano_buffer_auditoria, self.intervalo_flush_auditoria
+            )
+            self.sumidero_auditoria.iniciar()
+        
+        self.sumidero_auditoria.registrar(
+            id_evaluacion, tipo_operacion, hash_bloque, es_valida, detalles, usuario
+        )
+    
     def verificar_integridad_evaluacion(self, id_evaluacion: int, 
                                        usuario: str = 'sistema') -> Dict:
         """
@@ -425,15 +2833,7 @@ class SistemaBlockchainEvaluaciones:
         print(f"\n🔍 Verificando integridad de evaluación {id_evaluacion}...")
         
         # Obtener registro blockchain de la evaluación
-        query = """
-        SELECT hash_bloque, hash_datos
-        FROM blockchain_evaluaciones
-        WHERE id_evaluacion = %s
-        ORDER BY timestamp_registro DESC
-        LIMIT 1
-        """
-        
-        self.cursor.execute(query, (id_evaluacion,))
+        self.cursor.execute(QUERY_REGISTRO_EVALUACION, (id_evaluacion,))
         registro = self.cursor.fetchone()
         
         if not registro:
@@ -443,17 +2843,19 @@ class SistemaBlockchainEvaluaciones:
                 'valida': False,
                 'mensaje': 'Evaluación no registrada en blockchain'
             }
-            registrar_auditoria(
-                self.cursor, id_evaluacion, 'VALIDACION',
+            self.auditar_verificacion(
+                id_evaluacion, 'VALIDACION',
                 None, False, resultado['mensaje'], usuario
             )
+            # Cierra la transacción de lectura para ver datos nuevos en la siguiente
             self.connection.commit()
             return resultado
         
-        hash_bloque_registrado, hash_datos_registrado = registro
+        hash_bloque_registrado, hash_datos_registrado, algoritmo, prueba_merkle = registro
+        prueba_merkle = json.loads(prueba_merkle) if prueba_merkle is not None else None
         
-        # Calcular hash actual de los datos
-        hash_datos_actual = calcular_hash_evaluacion(self.cursor, id_evaluacion)
+        # Calcular hash actual de los datos con el algoritmo usado al registrarla
+        hash_datos_actual = calcular_hash_evaluacion(self.cursor, id_evaluacion, algoritmo)
         
         # Verificar bloque en la cadena
         bloque = self.blockchain.obtener_bloque_por_hash(hash_bloque_registrado)
@@ -478,15 +2880,36 @@ class SistemaBlockchainEvaluaciones:
                 'bloque_hash': bloque.hash,
                 'timestamp_registro': datetime.fromtimestamp(bloque.timestamp).isoformat()
             }
-            registrar_auditoria(
-                self.cursor, id_evaluacion, 'INTENTO_MODIFICACION',
+            self.auditar_verificacion(
+                id_evaluacion, 'INTENTO_MODIFICACION',
                 hash_bloque_registrado, False,
                 f'Hash original: {hash_datos_registrado}, Hash actual: {hash_datos_actual}',
                 usuario
             )
+        # Todo bloque de lote se contrasta con su raíz, también el de una sola
+        # evaluación (prueba vacía; los vínculos antiguos la guardaban como NULL)
+        elif bloque.datos.get('tipo') == 'LOTE_EVALUACIONES' and calcular_raiz_merkle(
+                hash_datos_actual, prueba_merkle or [], bloque.algoritmo,
+                bloque.datos.get('version_merkle', VERSION_MERKLE_DUPLICADO)) != bloque.datos.get('raiz_merkle'):
+            resultado = {
+                'evaluacion_id': id_evaluacion,
+                'registrada': True,
+                'valida': False,
+                'mensaje': 'PRUEBA MERKLE INVÁLIDA: El registro no pertenece a la raíz del bloque',
+                'hash_datos': hash_datos_actual,
+                'bloque_indice': bloque.indice,
+                'bloque_hash': bloque.hash,
+                'raiz_merkle': bloque.datos.get('raiz_merkle')
+            }
+            self.auditar_verificacion(
+                id_evaluacion, 'INTENTO_MODIFICACION',
+                hash_bloque_registrado, False,
+                'La prueba de Merkle no reproduce la raíz del bloque',
+                usuario
+            )
         else:
-            # Validar toda la cadena
-            cadena_valida = self.blockchain.validar_cadena()
+            # Validar la cadena (bloques nuevos desde el checkpoint)
+            cadena_valida = self.validar_cadena()
             
             resultado = {
                 'evaluacion_id': id_evaluacion,
@@ -499,22 +2922,64 @@ class SistemaBlockchainEvaluaciones:
                 'timestamp_registro': datetime.fromtimestamp(bloque.timestamp).isoformat(),
                 'cadena_blockchain_valida': cadena_valida
             }
-            registrar_auditoria(
-                self.cursor, id_evaluacion, 'VALIDACION',
+            self.auditar_verificacion(
+                id_evaluacion, 'VALIDACION',
                 hash_bloque_registrado, True,
                 'Verificación exitosa', usuario
             )
         
+        # Cierra la transacción de lectura (sin escrituras no hay fsync)
         self.connection.commit()
         return resultado
     
-    def obtener_certificado_integridad(self, id_evaluacion: int) -> Dict:
+    def _version_evaluacion(self, id_evaluacion: int) -> Optional[Tuple]:
+        """
+        Versión de la evaluación: (updated_at de cada tabla, id_registro del
+        último registro blockchain). None si no existe, no está registrada o
+        cambió en el segundo actual (updated_at tiene resolución de segundos y
+        otro cambio en ese mismo segundo no movería la versión)
+        """
+        self.cursor.execute(QUERY_VERSION_EVALUACION, (id_evaluacion,))
+        fila = self.cursor.fetchone()
+        # Cierra la transacción de lectura para ver cambios en la siguiente consulta
+        self.connection.commit()
+        if not fila or fila[5] is None:
+            return None
+        ultimo_cambio = max(marca for marca in fila[:5] if marca is not None)
+        if ultimo_cambio >= fila[6]:
+            return None
+        return tuple(fila[:6])
+    
+    def obtener_certificado_integridad(self, id_evaluacion: int, usuario: str = 'sistema') -> Dict:
         """
         Genera un certificado de integridad para la evaluación
+        Los certificados válidos se guardan en una caché LRU con clave (punta de
+        la cadena, versión de la evaluación); un acierto cuesta una consulta por
+        índices, no recalcula el hash de los datos y la auditoría va al
+        sumidero asíncrono. Lleva la fecha de certificación actual
         """
-        verificacion = self.verificar_integridad_evaluacion(id_evaluacion)
+        cadena = self.blockchain.cadena
+        punta = cadena.hash_en(len(cadena) - 1) if len(cadena) else None
+        version = self._version_evaluacion(id_evaluacion) if self.tamano_cache_certificados > 0 else None
+        
+        entrada = self.cache_certificados.get(id_evaluacion)
+        if entrada is not None and version is not None and entrada[0] == punta and entrada[1] == version:
+            self.cache_certificados.move_to_end(id_evaluacion)
+            certificado = dict(entrada[2])
+            self.auditar_verificacion(
+                id_evaluacion, 'VALIDACION',
+                certificado['certificado']['hash_bloque'], True,
+                'Verificación exitosa (certificado en caché)', usuario
+            )
+            certificado['certificado'] = dict(
+                certificado['certificado'], fecha_certificacion=datetime.now().isoformat()
+            )
+            return certificado
+        
+        verificacion = self.verificar_integridad_evaluacion(id_evaluacion, usuario)
         
         if not verificacion['valida']:
+            self.cache_certificados.pop(id_evaluacion, None)
             return verificacion
         
         # Obtener datos adicionales
@@ -540,10 +3005,16 @@ class SistemaBlockchainEvaluaciones:
                 'hash_bloque_anterior': bloque_info[2],
                 'fecha_registro_blockchain': datetime.fromtimestamp(bloque_info[3]).isoformat(),
                 'fecha_certificacion': datetime.now().isoformat(),
-                'cadena_bloques_valida': self.blockchain.validar_cadena(),
+                'cadena_bloques_valida': verificacion['cadena_blockchain_valida'],
                 'total_bloques_cadena': len(self.blockchain.cadena)
             },
             'verificacion_url': f'/api/verificar/{id_evaluacion}/{bloque_info[1]}'
         }
         
+        if version is not None:
+            self.cache_certificados[id_evaluacion] = (punta, version, certificado)
+            self.cache_certificados.move_to_end(id_evaluacion)
+            while len(self.cache_certificados) > self.tamano_cache_certificados:
+                self.cache_certificados.popitem(last=False)
+        
         return certificado
\ No newline at end of file
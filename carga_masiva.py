@@ -0,0 +1,572 @@
+"""
+Carga masiva de la población con LOAD DATA LOCAL INFILE
+Las filas generadas se escriben en un TSV por tabla con las claves primarias ya
+asignadas y se cargan en orden de dependencias; en el modo de tuberías (FIFO)
+se cargan mientras se generan, sin que ningún archivo completo llegue a disco
+
+Las evaluaciones cargadas por esta vía NO se registran en blockchain: la
+auditoría masiva de integridad las informa como no registradas. Para poblar con
+registro en la cadena se usa poblar_sincro.py
+"""
+
+import errno
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import Error
+
+from bd_functions import (
+    CLAVES_PRIMARIAS, CLAVES_UNICAS, COLUMNAS_TABLAS, DB_CONFIG, FilaPendiente,
+    cerrar_conexion, insertar_centros_reconocimiento, insertar_contactos_emergencia,
+    insertar_evaluaciones, insertar_profesionales, insertar_usuarios,
+)
+
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+# Tablas escritas a TSV, en orden de dependencias (cada padre antes que sus hijas).
+# Centros y profesionales son catálogos pequeños y se insertan por la vía normal
+TABLAS_CARGA = [
+    'usuarios',
+    'contactos_emergencia',
+    'evaluaciones',
+    'eval_fonoaudiologia',
+    'eval_psicologia',
+    'tepsicon_respuestas',
+    'eval_optometria',
+    'eval_medicina_general',
+    'sistemas_evaluados',
+    'restricciones',
+    'concepto_final',
+]
+
+# Directorio de los TSV pregenerados
+DIRECTORIO_TSV = os.getenv('CARGA_DIRECTORIO_TSV', 'carga_tsv')
+
+# Archivo del directorio con el primer id asignado a cada tabla al generar los TSV
+# y las filas escritas en cada uno (se agregan al terminar la generación)
+MANIFIESTO_TSV = 'manifiesto.json'
+
+# Advertencias de LOAD DATA que se muestran cuando una carga no cuadra
+ADVERTENCIAS_MOSTRADAS = 5
+
+# Buffer de escritura de cada TSV (o tubería)
+TAMANO_BUFFER_TSV = 1 << 20
+
+QUERY_LOAD_DATA = """
+    LOAD DATA LOCAL INFILE %s
+    INTO TABLE {tabla}
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    ({columnas})
+"""
+
+
+def crear_conexion_carga():
+    """Conexión con LOAD DATA LOCAL habilitado (el servidor también necesita local_infile=ON)"""
+    try:
+        connection = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+        if connection.is_connected():
+            return connection
+    except Error as e:
+        print(f"❌ Error al conectar a la base de datos: {e}")
+        return None
+
+
+# =============================================
+# ESCRITURA TSV
+# =============================================
+
+def _escapar_texto(valor):
+    return valor.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+# Formato de cada tipo de valor en el TSV (\N es NULL para LOAD DATA)
+FORMATEADORES_TSV = {
+    type(None): lambda valor: '\\N',
+    bool: lambda valor: '1' if valor else '0',
+    int: str,
+    float: repr,
+    Decimal: str,
+    str: _escapar_texto,
+    datetime: lambda valor: valor.strftime('%Y-%m-%d %H:%M:%S'),
+    date: date.isoformat,
+}
+
+
+def linea_tsv(valores):
+    """Una fila en el formato por defecto de LOAD DATA (tabulador, escape con \\)"""
+    return '\t'.join([FORMATEADORES_TSV[type(valor)](valor) for valor in valores]) + '\n'
+
+
+class EscritorTSV:
+    """
+    Sustituto del InsertadorMasivo que escribe cada tabla en su TSV
+
+    Asigna las claves primarias desde siguientes_ids, así que el id de cada fila se
+    conoce al agregarla y las hijas lo reciben directamente. Las claves únicas
+    repetidas (contra la BD o dentro de la generación) se descartan igual que con
+    INSERT IGNORE: la fila queda con id None y sus hijas no se escriben
+    """
+
+    def __init__(self, archivos, siguientes_ids, claves_existentes=None):
+        self.archivos = archivos
+        self.siguientes_ids = siguientes_ids
+        self.claves_vistas = {tabla: set(claves) for tabla, claves in (claves_existentes or {}).items()}
+        self.filas_escritas = {tabla: 0 for tabla in archivos}
+        self.descartadas = 0
+
+    def agregar(self, tabla, valores):
+        """Escribe una fila en el TSV de la tabla; retorna su FilaPendiente con el id asignado"""
+        fila = FilaPendiente(tabla)
+
+        referencias = [i for i, valor in enumerate(valores) if type(valor) is FilaPendiente]
+        if referencias:
+            valores = list(valores)
+            for i in referencias:
+                valores[i] = valores[i].id
+            if any(valores[i] is None for i in referencias):
+                self.descartadas += 1
+                return fila
+
+        if tabla in self.claves_vistas:
+            clave = valores[COLUMNAS_TABLAS[tabla].index(CLAVES_UNICAS[tabla])]
+            if clave in self.claves_vistas[tabla]:
+                self.descartadas += 1
+                return fila
+            self.claves_vistas[tabla].add(clave)
+
+        fila.id = self.siguientes_ids[tabla]
+        self.siguientes_ids[tabla] += 1
+        self.archivos[tabla].write(linea_tsv((fila.id, *valores)))
+        self.filas_escritas[tabla] += 1
+        return fila
+
+    def vaciar(self):
+        """Vacía los buffers de los archivos (la carga ocurre aparte)"""
+        for archivo in self.archivos.values():
+            archivo.flush()
+
+
+def ruta_tsv(directorio, tabla):
+    """Archivo (o tubería) de una tabla"""
+    return os.path.join(directorio, f"{tabla}.tsv")
+
+
+def _abrir_tsv(ruta):
+    return open(ruta, 'w', encoding='utf-8', newline='\n', buffering=TAMANO_BUFFER_TSV)
+
+
+# =============================================
+# ESTADO INICIAL DE LA BD
+# =============================================
+
+def siguientes_ids_bd(cursor, tablas=TABLAS_CARGA):
+    """Primer id libre de cada tabla; las claves de los TSV se asignan desde aquí"""
+    siguientes = {}
+    for tabla in tablas:
+        cursor.execute(f"SELECT COALESCE(MAX({CLAVES_PRIMARIAS[tabla]}), 0) + 1 FROM {tabla}")
+        siguientes[tabla] = int(cursor.fetchone()[0])
+    return siguientes
+
+
+def claves_unicas_bd(cursor, tablas=TABLAS_CARGA):
+    """Claves únicas ya presentes, para descartar los choques antes de escribir"""
+    claves = {}
+    for tabla in tablas:
+        if tabla in CLAVES_UNICAS:
+            cursor.execute(f"SELECT {CLAVES_UNICAS[tabla]} FROM {tabla}")
+            claves[tabla] = {fila[0] for fila in cursor.fetchall()}
+    return claves
+
+
+def generar_filas(escritor, profesionales_ids, num_usuarios, num_evaluaciones, usuario='admin@sistema.com'):
+    """Genera usuarios, contactos y evaluaciones completas en el escritor; retorna los ids de evaluación"""
+    usuarios_ids = insertar_usuarios(None, num_usuarios, usuario, insertador=escritor)
+    insertar_contactos_emergencia(None, usuarios_ids, usuario, insertador=escritor)
+    evaluaciones_ids = insertar_evaluaciones(None, usuarios_ids, profesionales_ids, num_evaluaciones,
+                                             usuario, insertador=escritor)
+    escritor.vaciar()
+    return evaluaciones_ids
+
+
+# =============================================
+# CARGA DE ARCHIVOS PREGENERADOS
+# =============================================
+
+def cargar_tabla(cursor, tabla, ruta):
+    """LOAD DATA LOCAL de un TSV (o tubería) con la clave primaria incluida; retorna filas cargadas"""
+    columnas = ', '.join((CLAVES_PRIMARIAS[tabla], *COLUMNAS_TABLAS[tabla]))
+    cursor.execute(QUERY_LOAD_DATA.format(tabla=tabla, columnas=columnas), (ruta,))
+    return cursor.rowcount
+
+
+def comprobar_carga(cursor, tabla, cargadas, escritas):
+    """
+    LOAD DATA LOCAL convierte claves duplicadas y fallos de clave foránea en
+    advertencias y sigue: si no se cargaron todas las filas escritas, lanza
+    RuntimeError con las primeras advertencias para revertir la carga
+    """
+    if cargadas == escritas:
+        return
+    cursor.execute(f"SHOW WARNINGS LIMIT {ADVERTENCIAS_MOSTRADAS}")
+    advertencias = "; ".join(str(fila[2]) for fila in cursor.fetchall())
+    raise RuntimeError(f"{tabla}: cargadas {cargadas} de {escritas} filas escritas"
+                       + (f" ({advertencias})" if advertencias else ""))
+
+
+def generar_archivos_tsv(cursor, profesionales_ids, num_usuarios, num_evaluaciones,
+                         directorio=DIRECTORIO_TSV, usuario='admin@sistema.com'):
+    """
+    Genera un TSV por tabla en el directorio
+    Las claves parten del estado actual de la BD: los archivos deben cargarse antes
+    de que otra escritura consuma esos ids. Los ids de partida quedan en el
+    manifiesto del directorio para que cargar_archivos_tsv lo compruebe
+    """
+    os.makedirs(directorio, exist_ok=True)
+    siguientes_ids = siguientes_ids_bd(cursor)
+    ruta_manifiesto = os.path.join(directorio, MANIFIESTO_TSV)
+    with open(ruta_manifiesto, 'w', encoding='utf-8') as archivo:
+        json.dump({'siguientes_ids': siguientes_ids}, archivo, indent=2)
+    escritor = EscritorTSV({}, dict(siguientes_ids), claves_unicas_bd(cursor))
+
+    try:
+        for tabla in TABLAS_CARGA:
+            escritor.archivos[tabla] = _abrir_tsv(ruta_tsv(directorio, tabla))
+            escritor.filas_escritas[tabla] = 0
+        evaluaciones_ids = generar_filas(escritor, profesionales_ids, num_usuarios, num_evaluaciones, usuario)
+    finally:
+        for archivo in escritor.archivos.values():
+            archivo.close()
+
+    # Sin filas_escritas el manifiesto marca una generación incompleta
+    with open(ruta_manifiesto, 'w', encoding='utf-8') as archivo:
+        json.dump({'siguientes_ids': siguientes_ids, 'filas_escritas': escritor.filas_escritas},
+                  archivo, indent=2)
+
+    return escritor, evaluaciones_ids
+
+
+def verificar_manifiesto_tsv(cursor, directorio=DIRECTORIO_TSV):
+    """
+    Comprueba que ningún id asignado en los TSV esté ya ocupado en la BD
+    LOAD DATA LOCAL trata las claves duplicadas como IGNORE: cargar archivos
+    desactualizados descartaría filas en silencio y colgaría las hijas de otros padres
+    Retorna las filas escritas en cada TSV según el manifiesto
+    """
+    ruta = os.path.join(directorio, MANIFIESTO_TSV)
+    if not os.path.exists(ruta):
+        raise RuntimeError(f"Falta {ruta}: los TSV no se pueden cargar sin sus ids de partida")
+
+    with open(ruta, encoding='utf-8') as archivo:
+        manifiesto = json.load(archivo)
+    siguientes_ids = manifiesto['siguientes_ids']
+    if 'filas_escritas' not in manifiesto:
+        raise RuntimeError(f"{ruta} no tiene filas escritas: la generación de los TSV no terminó")
+
+    actuales = siguientes_ids_bd(cursor, list(siguientes_ids))
+    ocupadas = [f"{tabla} (MAX+1 = {actuales[tabla]}, TSV desde {inicio})"
+                for tabla, inicio in siguientes_ids.items() if actuales[tabla] > inicio]
+    if ocupadas:
+        raise RuntimeError("Los TSV están desactualizados, la BD ya usa sus ids: " + ", ".join(ocupadas))
+    return manifiesto['filas_escritas']
+
+
+def cargar_archivos_tsv(connection, directorio=DIRECTORIO_TSV):
+    """
+    Carga los TSV del manifiesto en orden de dependencias en una sola transacción
+    Antes comprueba con el manifiesto que sus ids sigan libres; si una tabla no
+    carga todas las filas escritas (o falta su TSV) se revierte todo
+    """
+    cursor = connection.cursor()
+    cargadas = {}
+
+    try:
+        filas_escritas = verificar_manifiesto_tsv(cursor, directorio)
+        for tabla in TABLAS_CARGA:
+            if tabla not in filas_escritas:
+                continue
+            ruta = ruta_tsv(directorio, tabla)
+            if not os.path.exists(ruta):
+                raise RuntimeError(f"Falta {ruta} ({filas_escritas[tabla]} filas en el manifiesto)")
+
+            inicio = time.time()
+            cargadas[tabla] = cargar_tabla(cursor, tabla, os.path.abspath(ruta))
+            comprobar_carga(cursor, tabla, cargadas[tabla], filas_escritas[tabla])
+            print(f"   {tabla}: {cargadas[tabla]} filas en {time.time() - inicio:.1f}s")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return cargadas
+
+
+# =============================================
+# CARGA EN STREAMING POR TUBERÍAS
+# =============================================
+
+class CargadorTuberia:
+    """
+    Hilo con conexión propia que ejecuta LOAD DATA sobre la tubería de una tabla
+    Las tablas se cargan a la vez, así que el padre de una fila puede estar aún en
+    su tubería: la sesión desactiva foreign_key_checks. Las claves vienen del mismo
+    generador y cada padre se escribe antes que sus hijas, por lo que la carga
+    completa queda consistente
+
+    Ningún cargador confirma hasta que todos terminaron su LOAD DATA (barrera):
+    si uno falla o carga menos filas de las que escribió el generador, la
+    barrera se rompe y todos revierten. Solo un fallo del propio
+    commit tras la barrera deja tablas confirmadas sin las demás; en ese caso las
+    filas a borrar a mano son las de id >= los ids de partida que se informan
+    """
+
+    def __init__(self, tabla, ruta, abortar, barrera, escritor):
+        self.tabla = tabla
+        self.ruta = ruta
+        self.escritor = escritor
+        self.abortar = abortar
+        self.barrera = barrera
+        self.filas = 0
+        self.error = None
+        self.confirmada = False
+        self._hilo = threading.Thread(target=self._cargar, daemon=True)
+
+    def iniciar(self):
+        """Arranca el hilo de carga"""
+        self._hilo.start()
+
+    def esperar(self):
+        """Espera a que LOAD DATA termine (al cerrarse la escritura de la tubería)"""
+        self._hilo.join()
+
+    def activo(self):
+        return self._hilo.is_alive()
+
+    def _cargar(self):
+        connection = crear_conexion_carga()
+        if not connection:
+            self.error = "sin conexión"
+            self.barrera.abort()
+            return
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET foreign_key_checks = 0")
+            self.filas = cargar_tabla(cursor, self.tabla, self.ruta)
+            # LOAD DATA termina con el fin de archivo: el escritor ya no agrega filas
+            comprobar_carga(cursor, self.tabla, self.filas, self.escritor.filas_escritas.get(self.tabla, 0))
+            self.barrera.wait()
+
+            # Si la generación falló, lo que llegó por la tubería está incompleto
+            if self.abortar.is_set():
+                connection.rollback()
+            else:
+                connection.commit()
+                self.confirmada = True
+            cursor.close()
+        except threading.BrokenBarrierError:
+            # Otra tabla falló: esta se revierte sin error propio
+            connection.rollback()
+        except Exception as e:
+            # Al cerrar la lectura, el generador recibe BrokenPipeError y aborta
+            self.error = str(e)
+            self.barrera.abort()
+            connection.rollback()
+        finally:
+            connection.close()
+
+
+def _abrir_tuberia(cargador):
+    """Abre la escritura de la tubería cuando el cargador ya abrió la lectura"""
+    while True:
+        try:
+            fd = os.open(cargador.ruta, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as e:
+            if e.errno != errno.ENXIO:
+                raise
+            # Sin lector todavía: esperar, salvo que la carga ya haya fallado
+            if not cargador.activo():
+                raise RuntimeError(f"La carga de {cargador.tabla} terminó sin leer la tubería: {cargador.error}")
+            time.sleep(0.01)
+
+    os.set_blocking(fd, True)
+    return open(fd, 'w', encoding='utf-8', newline='\n', buffering=TAMANO_BUFFER_TSV)
+
+
+def poblar_por_tuberias(cursor, profesionales_ids, num_usuarios, num_evaluaciones, usuario='admin@sistema.com'):
+    """
+    Genera las filas directamente hacia LOAD DATA a través de una tubería por tabla
+    Ningún TSV completo llega a disco; retorna (escritor, evaluaciones_ids, cargadores)
+    """
+    directorio = tempfile.mkdtemp(prefix='carga_tuberias_')
+    abortar = threading.Event()
+    barrera = threading.Barrier(len(TABLAS_CARGA))
+    siguientes_ids = siguientes_ids_bd(cursor)
+    escritor = EscritorTSV({}, dict(siguientes_ids), claves_unicas_bd(cursor))
+    cargadores = []
+
+    try:
+        for tabla in TABLAS_CARGA:
+            ruta = ruta_tsv(directorio, tabla)
+            os.mkfifo(ruta)
+            cargador = CargadorTuberia(tabla, ruta, abortar, barrera, escritor)
+            cargador.iniciar()
+            cargadores.append(cargador)
+
+        for cargador in cargadores:
+            escritor.archivos[cargador.tabla] = _abrir_tuberia(cargador)
+            escritor.filas_escritas[cargador.tabla] = 0
+
+        evaluaciones_ids = generar_filas(escritor, profesionales_ids, num_usuarios, num_evaluaciones, usuario)
+    except BrokenPipeError:
+        # Un cargador cerró su tubería: su error se informa abajo
+        abortar.set()
+    except BaseException:
+        abortar.set()
+        raise
+    finally:
+        # Cerrar la escritura es el fin de archivo que termina cada LOAD DATA
+        for archivo in escritor.archivos.values():
+            try:
+                archivo.close()
+            except BrokenPipeError:
+                abortar.set()
+        # Tras un fallo, las tuberías aún sin abrir también necesitan su fin de archivo
+        for cargador in cargadores:
+            if cargador.tabla not in escritor.archivos:
+                try:
+                    _abrir_tuberia(cargador).close()
+                except RuntimeError:
+                    pass
+        # Cargadores que no llegaron a arrancar nunca alcanzarían la barrera
+        if abortar.is_set() or len(cargadores) < len(TABLAS_CARGA):
+            barrera.abort()
+        for cargador in cargadores:
+            cargador.esperar()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    errores = [f"{c.tabla}: {c.error}" for c in cargadores if c.error]
+    if abortar.is_set() or errores:
+        confirmadas = [c.tabla for c in cargadores if c.confirmada]
+        if confirmadas:
+            errores.append("quedaron confirmadas " + ", ".join(confirmadas)
+                           + f"; borrar sus filas con id desde {siguientes_ids}")
+        raise RuntimeError("Carga por tuberías abortada (" + "; ".join(errores or ["tubería cerrada"]) + ")")
+
+    return escritor, evaluaciones_ids, cargadores
+
+
+# =============================================
+# FUNCIÓN PRINCIPAL DE CARGA MASIVA
+# =============================================
+
+def poblar_con_load_data(num_usuarios=1000, num_evaluaciones=1000, usar_tuberias=False,
+                         directorio=DIRECTORIO_TSV):
+    """
+    Puebla la BD generando TSV con claves preasignadas y cargándolos con LOAD DATA
+    Las evaluaciones cargadas no quedan registradas en blockchain
+
+    Args:
+        num_usuarios: Número de usuarios a crear
+        num_evaluaciones: Número de evaluaciones a crear
+        usar_tuberias: Cargar en streaming por tuberías en vez de escribir los TSV
+        directorio: Directorio de los TSV pregenerados (se conservan tras la carga)
+    """
+    connection = crear_conexion_carga()
+
+    if not connection:
+        print("❌ No se pudo establecer conexión. Abortando...")
+        return None
+
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        usuario_sistema = 'admin@sistema.com'
+
+        print("=" * 60)
+        print("CARGA MASIVA CON LOAD DATA " + ("(TUBERÍAS)" if usar_tuberias else f"(ARCHIVOS EN {directorio})"))
+        print("=" * 60)
+
+        insertar_centros_reconocimiento(cursor, usuario_sistema)
+        profesionales_ids = insertar_profesionales(cursor, cantidad_por_especialidad=10, usuario=usuario_sistema)
+        connection.commit()
+
+        tiempo_inicio = time.time()
+
+        if usar_tuberias:
+            escritor, evaluaciones_ids, cargadores = poblar_por_tuberias(
+                cursor, profesionales_ids, num_usuarios, num_evaluaciones, usuario_sistema
+            )
+            cargadas = {cargador.tabla: cargador.filas for cargador in cargadores}
+        else:
+            escritor, evaluaciones_ids = generar_archivos_tsv(
+                cursor, profesionales_ids, num_usuarios, num_evaluaciones, directorio, usuario_sistema
+            )
+            print(f"\nTSV generados en {time.time() - tiempo_inicio:.1f}s, cargando...")
+            cargadas = cargar_archivos_tsv(connection, directorio)
+
+        tiempo_total = time.time() - tiempo_inicio
+        total_filas = sum(cargadas.values())
+
+        print("\n" + "=" * 60)
+        print("CARGA MASIVA COMPLETADA")
+        print("=" * 60)
+        for tabla in TABLAS_CARGA:
+            escritas = escritor.filas_escritas.get(tabla, 0)
+            aviso = "" if cargadas.get(tabla, 0) == escritas else f" (escritas {escritas})"
+            print(f"   • {tabla}: {cargadas.get(tabla, 0)}{aviso}")
+        print(f"   • Descartadas por clave repetida: {escritor.descartadas}")
+        print(f"   ⚠️  {len(evaluaciones_ids)} evaluaciones sin registro en blockchain (carga masiva)")
+        print(f"   • {total_filas} filas en {tiempo_total:.1f}s ({total_filas / max(tiempo_total, 1e-9):,.0f} filas/s)")
+        print("=" * 60)
+
+        return evaluaciones_ids
+
+    except (Error, RuntimeError, OSError) as e:
+        print(f"\n❌ Error durante la carga masiva: {e}")
+        connection.rollback()
+        return None
+
+    finally:
+        if cursor:
+            cursor.close()
+        cerrar_conexion(connection)
+
+
+if __name__ == "__main__":
+    print("\n Opciones:")
+    print("  1. Generar TSV y cargarlos (100.000 registros)")
+    print("  2. Cargar en streaming por tuberías (1.000.000 registros)")
+    print("  3. Cargar TSV pregenerados del directorio")
+
+    opcion = input("\n👉 Seleccione una opción (1-3): ")
+
+    if opcion == '1':
+        poblar_con_load_data(num_usuarios=100_000, num_evaluaciones=100_000)
+    elif opcion == '2':
+        poblar_con_load_data(num_usuarios=1_000_000, num_evaluaciones=1_000_000, usar_tuberias=True)
+    elif opcion == '3':
+        conexion = crear_conexion_carga()
+        if conexion:
+            try:
+                cargar_archivos_tsv(conexion, DIRECTORIO_TSV)
+            except (Error, RuntimeError) as e:
+                print(f"❌ {e}")
+            finally:
+                cerrar_conexion(conexion)
+    else:
+        print("❌ Opción inválida")
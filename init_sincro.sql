@@ -123,7 +123,8 @@ CREATE TABLE evaluaciones (
     INDEX idx_fecha (fecha_evaluacion),
     INDEX idx_numero_reconocimiento (numero_reconocimiento),
     INDEX idx_ruta_pdf (ruta_pdf),
-    INDEX idx_activo (activo)
+    INDEX idx_activo (activo),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- TABLA 5: Profesionales de Salud
@@ -201,7 +202,8 @@ CREATE TABLE eval_fonoaudiologia (
     FOREIGN KEY (id_evaluacion) REFERENCES evaluaciones(id_evaluacion) ON DELETE CASCADE,
     FOREIGN KEY (id_profesional) REFERENCES profesionales(id_profesional),
     INDEX idx_evaluacion (id_evaluacion),
-    INDEX idx_activo (activo)
+    INDEX idx_activo (activo),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- TABLA 7: Evaluación Psicológica
@@ -247,7 +249,8 @@ CREATE TABLE eval_psicologia (
     FOREIGN KEY (id_evaluacion) REFERENCES evaluaciones(id_evaluacion) ON DELETE CASCADE,
     FOREIGN KEY (id_profesional) REFERENCES profesionales(id_profesional),
     INDEX idx_evaluacion (id_evaluacion),
-    INDEX idx_activo (activo)
+    INDEX idx_activo (activo),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- TABLA 8: Cuestionario TEPSICON
@@ -325,7 +328,8 @@ CREATE TABLE eval_optometria (
     FOREIGN KEY (id_evaluacion) REFERENCES evaluaciones(id_evaluacion) ON DELETE CASCADE,
     FOREIGN KEY (id_profesional) REFERENCES profesionales(id_profesional),
     INDEX idx_evaluacion (id_evaluacion),
-    INDEX idx_activo (activo)
+    INDEX idx_activo (activo),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- TABLA 10: Oftalmoscopia - Hallazgos
@@ -386,7 +390,8 @@ CREATE TABLE eval_medicina_general (
     FOREIGN KEY (id_evaluacion) REFERENCES evaluaciones(id_evaluacion) ON DELETE CASCADE,
     FOREIGN KEY (id_profesional) REFERENCES profesionales(id_profesional),
     INDEX idx_evaluacion (id_evaluacion),
-    INDEX idx_activo (activo)
+    INDEX idx_activo (activo),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- TABLA 12: Sistemas Evaluados - Medicina General
@@ -487,7 +492,13 @@ CREATE TABLE IF NOT EXISTS blockchain_bloques (
     hash VARCHAR(64) UNIQUE NOT NULL,
     hash_anterior VARCHAR(64) NOT NULL,
     nonce INT NOT NULL,
-    datos_json TEXT NOT NULL,
+    version TINYINT UNSIGNED NOT NULL DEFAULT 1, -- 1 = hash sobre JSON, 2 = binario canónico
+    algoritmo_hash VARCHAR(20) NOT NULL DEFAULT 'sha256',
+    firma VARCHAR(128) NULL, -- Firma HMAC/Ed25519 del hash en modo prueba de autoridad
+    datos_json TEXT NULL,
+    datos_bin MEDIUMBLOB NULL, -- Datos de bloques versión 2 (codificación canónica)
+    datos_comprimidos MEDIUMBLOB NULL, -- Datos comprimidos (reemplaza a datos_json / datos_bin)
+    compresion VARCHAR(10) NULL, -- zlib, zstd o NULL si no están comprimidos
     fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_hash (hash),
     INDEX idx_timestamp (timestamp)
@@ -499,6 +510,8 @@ CREATE TABLE IF NOT EXISTS blockchain_evaluaciones (
     id_bloque INT NOT NULL,
     hash_bloque VARCHAR(64) NOT NULL,
     hash_datos VARCHAR(64) NOT NULL,
+    algoritmo_hash VARCHAR(20) NOT NULL DEFAULT 'sha256', -- Algoritmo de hash_datos (el del bloque)
+    prueba_merkle TEXT NULL, -- Prueba de inclusión cuando el bloque agrupa un lote
     timestamp_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
     es_valido BOOLEAN DEFAULT TRUE,
     FOREIGN KEY (id_evaluacion) REFERENCES evaluaciones(id_evaluacion) ON DELETE CASCADE,
@@ -509,3 +522,51 @@ CREATE TABLE IF NOT EXISTS blockchain_evaluaciones (
     UNIQUE KEY uk_eval_bloque (id_evaluacion, id_bloque)
 );
 
+-- Migración de BD existentes: CREATE TABLE IF NOT EXISTS no agrega columnas a
+-- tablas ya creadas. Los valores por defecto dejan los bloques antiguos como
+-- versión 1, sha256, sin firma y sin comprimir
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS version TINYINT UNSIGNED NOT NULL DEFAULT 1 AFTER nonce;
+
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS algoritmo_hash VARCHAR(20) NOT NULL DEFAULT 'sha256' AFTER version;
+
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS firma VARCHAR(128) NULL AFTER algoritmo_hash;
+
+ALTER TABLE blockchain_bloques MODIFY datos_json TEXT NULL;
+
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS datos_bin MEDIUMBLOB NULL AFTER datos_json;
+
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS datos_comprimidos MEDIUMBLOB NULL AFTER datos_bin;
+
+ALTER TABLE blockchain_bloques ADD COLUMN IF NOT EXISTS compresion VARCHAR(10) NULL AFTER datos_comprimidos;
+
+ALTER TABLE blockchain_evaluaciones ADD COLUMN IF NOT EXISTS algoritmo_hash VARCHAR(20) NOT NULL DEFAULT 'sha256' AFTER hash_datos;
+
+ALTER TABLE blockchain_evaluaciones ADD COLUMN IF NOT EXISTS prueba_merkle TEXT NULL AFTER algoritmo_hash;
+
+CREATE TABLE IF NOT EXISTS blockchain_checkpoint (
+    id_checkpoint INT PRIMARY KEY,
+    indice_validado INT NOT NULL,
+    hash_validado VARCHAR(64) NOT NULL,
+    fecha_validacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS blockchain_barrido (
+    id_barrido INT PRIMARY KEY,
+    marca_agua DATETIME NOT NULL, -- Cambios con updated_at >= marca_agua aún no revisados
+    fecha_barrido DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Borrar una evaluación de especialidad no cambia ningún updated_at: estos
+-- triggers lo marcan en la evaluación para que el barrido incremental la revise
+-- (los borrados en cascada desde evaluaciones no disparan triggers)
+CREATE TRIGGER IF NOT EXISTS trg_borrado_fonoaudiologia AFTER DELETE ON eval_fonoaudiologia
+FOR EACH ROW UPDATE evaluaciones SET updated_at = CURRENT_TIMESTAMP WHERE id_evaluacion = OLD.id_evaluacion;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrado_psicologia AFTER DELETE ON eval_psicologia
+FOR EACH ROW UPDATE evaluaciones SET updated_at = CURRENT_TIMESTAMP WHERE id_evaluacion = OLD.id_evaluacion;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrado_optometria AFTER DELETE ON eval_optometria
+FOR EACH ROW UPDATE evaluaciones SET updated_at = CURRENT_TIMESTAMP WHERE id_evaluacion = OLD.id_evaluacion;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrado_medicina AFTER DELETE ON eval_medicina_general
+FOR EACH ROW UPDATE evaluaciones SET updated_at = CURRENT_TIMESTAMP WHERE id_evaluacion = OLD.id_evaluacion;
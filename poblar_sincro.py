@@ -3,10 +3,15 @@ Integración del Sistema de Blockchain con la Población de Datos
 Script limpio y funcional - Sin duplicaciones
 """
 
+import multiprocessing
+import os
+import queue
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 # Importar sistema blockchain
-from blockchain import SistemaBlockchainEvaluaciones
+from blockchain import CONSENSO_POW, SistemaBlockchainEvaluaciones, auditar_integridad_completa
 
 # Importar funciones de la base de datos
 try:
@@ -21,27 +26,191 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Consenso de los bloques nuevos: 'pow' (minería), 'hmac' o 'ed25519' (firma con la
+# clave de BLOCKCHAIN_CLAVE_HMAC / BLOCKCHAIN_CLAVE_ED25519)
+CONSENSO_BLOCKCHAIN = os.getenv('BLOCKCHAIN_CONSENSO', CONSENSO_POW)
+
+# Compresión opcional de los datos de bloques nuevos ('zlib' o 'zstd'; sin definir se guardan sin comprimir)
+COMPRESION_BLOCKCHAIN = os.getenv('BLOCKCHAIN_COMPRESION') or None
+
+# Snapshot binario de los encabezados: el arranque solo lee de la BD los bloques nuevos
+# Por defecto junto a este script (no depende del directorio de trabajo); se usa
+# solo si hay BLOCKCHAIN_CLAVE_HMAC para autenticarlo (sin clave se lee toda la tabla)
+RUTA_SNAPSHOT_BLOCKCHAIN = (os.getenv('BLOCKCHAIN_SNAPSHOT') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'blockchain_snapshot.bin'
+)) if os.getenv('BLOCKCHAIN_CLAVE_HMAC') else None
+
+# Evaluaciones agrupadas por bloque (árbol de Merkle); 1 = un bloque por evaluación
+TAMANO_LOTE_BLOCKCHAIN = 100
+
+# Evaluaciones confirmadas que pueden esperar registro antes de frenar las inserciones
+TAMANO_COLA_BLOCKCHAIN = 2000
+
+# Segundos entre cada revisión de que el hilo registrador siga vivo al esperar cola libre
+ESPERA_COLA_BLOCKCHAIN = 1
+
+# Evaluaciones insertadas entre cada commit (y entrega a la etapa blockchain); también
+# acota el lote multi-fila de evaluaciones, así que conviene que no sea muy pequeño
+COMMIT_CADA = 500
+
+# Bloques que se acumulan antes de escribirlos juntos en la BD
+TAMANO_BUFFER_ESCRITURA = 20
+
+# Servidor con los PDF de ejemplo de las evaluaciones
+URL_ARCHIVOS_PDF = "https://files-crc.erzoft.com/d/23f1b164e31648259652/files/?p=%2F"
+
+# Procesos que pueblan evaluaciones en paralelo (0 = uno por núcleo, 1 = población secuencial)
+PROCESOS_POBLACION = int(os.getenv('POBLACION_PROCESOS', '0')) or os.cpu_count() or 1
+
+# Particiones de la población paralela: 'anio' o 'centro'
+PARTICION_ANIO = 'anio'
+PARTICION_CENTRO = 'centro'
+PARTICION_POBLACION = os.getenv('POBLACION_PARTICION', PARTICION_ANIO)
+
+# Centros de reconocimiento a los que se asignan las evaluaciones
+CENTROS_POBLACION = range(1, 6)
+
+
+# =============================================
+# REGISTRO BLOCKCHAIN ASÍNCRONO
+# =============================================
+
+class RegistradorBlockchainAsincrono:
+    """
+    Etapa consumidora del pipeline de población
+    Un hilo toma de una cola acotada los ids ya confirmados y los registra en
+    blockchain en orden, mientras el hilo principal sigue generando e insertando
+    Una evaluación cuenta como registrada cuando su vínculo con el bloque se
+    confirma en la BD: un lote que falla al escribir queda en el buffer de
+    persistencia y se reintenta con el siguiente, así que no es una fallida
+    """
+    def __init__(self, sistema_blockchain, tamano_lote=TAMANO_LOTE_BLOCKCHAIN,
+                 tamano_cola=TAMANO_COLA_BLOCKCHAIN):
+        self.sistema_blockchain = sistema_blockchain
+        self.tamano_lote = tamano_lote
+        self.cola = queue.Queue(maxsize=tamano_cola)
+        # Evaluaciones que el hilo ya procesó (con o sin éxito)
+        self.procesadas = 0
+        # Evaluaciones que quedaron en la cola de un hilo muerto
+        self.perdidas = 0
+        self._confirmadas_al_iniciar = sistema_blockchain.persistencia.vinculos_confirmados
+        self._finalizado = False
+        self._hilo = threading.Thread(target=self._procesar, daemon=True)
+
+    @property
+    def registradas(self):
+        """Evaluaciones cuyo registro ya está confirmado en la BD"""
+        return self.sistema_blockchain.persistencia.vinculos_confirmados - self._confirmadas_al_iniciar
+
+    @property
+    def fallidas(self):
+        """
+        Evaluaciones procesadas que no llegaron a la BD
+        Mientras corre no cuenta las que esperan en el buffer de persistencia;
+        al finalizar, lo que no se pudo escribir es fallido
+        """
+        sin_confirmar = self.procesadas + self.perdidas - self.registradas
+        if not self._finalizado:
+            sin_confirmar -= self.sistema_blockchain.persistencia.vinculos_pendientes()
+        return max(sin_confirmar, 0)
+
+    def iniciar(self):
+        """Arranca el hilo de registro"""
+        self._hilo.start()
+
+    def encolar(self, ids_evaluaciones):
+        """Entrega ids ya confirmados; bloquea si la cola está llena"""
+        for id_evaluacion in ids_evaluaciones:
+            if not self._poner(id_evaluacion):
+                raise RuntimeError("El hilo de registro blockchain terminó inesperadamente")
+
+    def pendientes(self):
+        """Cantidad de evaluaciones esperando en la cola"""
+        return self.cola.qsize()
+
+    def finalizar(self):
+        """Registra lo que quede en la cola, espera al hilo y escribe el buffer pendiente"""
+        if self._poner(None):
+            self._hilo.join()
+        else:
+            # Lo que quedó en la cola de un hilo muerto ya no se registrará
+            self.perdidas += self.cola.qsize()
+        try:
+            self.sistema_blockchain.vaciar_escrituras()
+        except Exception as e:
+            print(f"      Error escribiendo el buffer blockchain: {e}")
+        finally:
+            self._finalizado = True
+
+    def _poner(self, elemento):
+        """Encola esperando espacio mientras el hilo siga vivo; False si ya terminó"""
+        while self._hilo.is_alive():
+            try:
+                self.cola.put(elemento, timeout=ESPERA_COLA_BLOCKCHAIN)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _procesar(self):
+        """Bucle del hilo: agrupa los ids en lotes y los registra en orden"""
+        lote = []
+
+        while True:
+            id_evaluacion = self.cola.get()
+            fin = id_evaluacion is None
+
+            if not fin:
+                lote.append(id_evaluacion)
+
+            if lote and (fin or len(lote) >= self.tamano_lote):
+                self._registrar(lote)
+                lote = []
+
+            if fin:
+                break
+
+    def _registrar(self, lote):
+        """
+        Registra un lote (o una evaluación); el resultado se cuenta cuando la
+        persistencia confirma los vínculos, no aquí
+        """
+        try:
+            if self.tamano_lote > 1:
+                try:
+                    self.sistema_blockchain.registrar_lote_evaluaciones(lote, 'sistema_poblacion')
+                except Exception as e:
+                    print(f"      Error blockchain lote {lote[0]}-{lote[-1]}: {e}")
+                return
+
+            for id_evaluacion in lote:
+                try:
+                    self.sistema_blockchain.registrar_evaluacion(id_evaluacion, 'sistema_poblacion')
+                except Exception as e:
+                    print(f"      Error blockchain eval {id_evaluacion}: {e}")
+        finally:
+            self.procesadas += len(lote)
+
+
 # =============================================
 # FUNCIÓN PRINCIPAL: POBLACIÓN CON BLOCKCHAIN
 # =============================================
 
 def poblar_evaluaciones_historicas_con_blockchain(cursor, connection, usuarios_ids, profesionales_ids,
-                                                   total_evaluaciones=10000):
+                                                   total_evaluaciones=10000,
+                                                   tamano_lote=TAMANO_LOTE_BLOCKCHAIN):
     """
     Función que puebla evaluaciones con registro en blockchain
+    Con tamano_lote > 1 cada bloque agrupa varias evaluaciones en un árbol de Merkle
+    Las inserciones y el registro blockchain corren en paralelo: cada commit entrega
+    sus ids a un hilo registrador a través de una cola acotada
     """
     print(f"\nMODO: Población con Blockchain habilitado")
 
-    # Inicializar blockchain
-    sistema_blockchain = SistemaBlockchainEvaluaciones(DB_CONFIG, dificultad=4)
-
-    if not sistema_blockchain.inicializar_sistema():
-        print("Error al inicializar blockchain")
+    sistema_blockchain = iniciar_sistema_blockchain()
+    if not sistema_blockchain:
         return None
 
-    print("Sistema blockchain inicializado")
-    print(f"Nota: Cada evaluación tomará ~0.5 segundos adicionales\n")
-
     # Distribución por año
     dist_anios = distribuir_evaluaciones_por_anio(total_evaluaciones)
 
@@ -49,117 +218,349 @@ def poblar_evaluaciones_historicas_con_blockchain(cursor, connection, usuarios_i
     for anio, cant in sorted(dist_anios.items()):
         print(f"      {anio}: {cant} evaluaciones")
 
+    registrador = RegistradorBlockchainAsincrono(sistema_blockchain, tamano_lote)
+    registrador.iniciar()
+
+    insertador = InsertadorMasivo(cursor)
+
     evaluaciones_ids = []
-    blockchain_registradas = 0
-    blockchain_fallidas = 0
+    pendientes_commit = []
     contador_global = 0
     tiempo_inicio = time.time()
 
-    # Iterar por año
-    for anio, cantidad_anio in sorted(dist_anios.items()):
-        print(f"\nProcesando año {anio}...")
-
-        for i in range(cantidad_anio):
-            # Generar fechas
-            fecha_eval = generar_fecha_historica(anio, anio)
-            fecha_cert = fecha_eval + timedelta(hours=random.randint(1, 24))
-            fecha_impresion = fecha_cert + timedelta(hours=random.randint(1, 2))
-
-            # Datos evaluación
-            numero_reconocimiento = f"{random.randint(1000, 9999)}"
-            id_usuario = random.choice(usuarios_ids)
-            id_centro = random.randint(1, 5)
-            categoria = random.choice(CATEGORIAS)
-            concepto = random.choice(CONCEPTOS)
-            fecha_vencimiento = fecha_cert + timedelta(days=365 * random.choice([1, 2, 3, 5]))
-            # Generar datos del PDF
-            nombre_pdf = random.choice(FILES_NAME)
-            ruta_pdf = f"https://files-crc.erzoft.com/d/23f1b164e31648259652/files/?p=%2F{nombre_pdf}"
-            hash_pdf = generar_hash_archivo(f"{numero_reconocimiento}{id_usuario}")
-
-            # Insertar evaluación
-            query_eval = """
-                INSERT IGNORE INTO evaluaciones 
-                (numero_reconocimiento, id_usuario, id_centro, fecha_evaluacion, 
-                 fecha_certificacion, fecha_impresion, numero_factura, tramite, 
-                 categoria, grupo_categoria, concepto_final, numero_certificado_runt, 
-                 numero_resultado, fecha_vencimiento, vigencia_meses,
-                 ruta_pdf, nombre_archivo_pdf, hash_archivo, tamanio_archivo_kb, 
-                 fecha_carga_pdf, created_by)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-
-            values_eval = (
-                numero_reconocimiento, id_usuario, id_centro, fecha_eval,
-                fecha_cert, fecha_impresion, str(random.randint(1000, 9999)),
-                random.choice(TRAMITES), categoria, 'Grupo 1', concepto,
-                f"A-{random.randint(1000, 9999)}-{random.randint(100000, 999999)}",
-                str(random.randint(10000000, 99999999)),
-                fecha_vencimiento, random.choice([12, 24, 36, 60]),
-                ruta_pdf, nombre_pdf, hash_pdf, random.randint(150, 500),
-                fecha_impresion, 'usuario@sistema.com'
-            )
+    # Aunque falle una inserción, lo ya confirmado se registra y el sistema se desconecta
+    try:
+        # Iterar por año
+        for anio, cantidad_anio in sorted(dist_anios.items()):
+            print(f"\nProcesando año {anio}...")
 
-            cursor.execute(query_eval, values_eval)
-            id_evaluacion = cursor.lastrowid
-            evaluaciones_ids.append(id_evaluacion)
+            for fila_eval in agregar_evaluaciones_historicas(insertador, anio, cantidad_anio,
+                                                             usuarios_ids, profesionales_ids):
+                pendientes_commit.append(fila_eval)
+                contador_global += 1
 
-            # Insertar evaluaciones especializadas (funciones importadas)
-            insertar_eval_fonoaudiologia(cursor, id_evaluacion, profesionales_ids['Fonoaudiología'], 'usuario@sistema.com')
-            insertar_eval_psicologia(cursor, id_evaluacion, profesionales_ids['Psicología'], 'usuario@sistema.com')
-            insertar_eval_optometria(cursor, id_evaluacion, profesionales_ids['Optometría'], 'usuario@sistema.com')
-            insertar_eval_medicina(cursor, id_evaluacion, profesionales_ids['Medicina General'], 'usuario@sistema.com')
+                # Confirmar y entregar a la etapa blockchain
+                if contador_global % COMMIT_CADA == 0:
+                    confirmar_lote(insertador, connection, pendientes_commit, evaluaciones_ids, registrador)
+                    pendientes_commit = []
 
-            if concepto == 'APTO CON RESTRICCION':
-                insertar_restricciones(cursor, id_evaluacion, 'usuario@sistema.com')
+                # Progreso
+                if contador_global % 100 == 0:
+                    imprimir_progreso(contador_global, total_evaluaciones, registrador, tiempo_inicio)
 
-            insertar_concepto_final(cursor, id_evaluacion, profesionales_ids['Medicina General'], fecha_cert, fecha_vencimiento)
+        confirmar_lote(insertador, connection, pendientes_commit, evaluaciones_ids, registrador)
 
-            # Registro en blockchain
-            try:
-                connection.commit()  # CAMBIADO
-                exito = sistema_blockchain.registrar_evaluacion(id_evaluacion, 'sistema_poblacion')
+        print(f"\n{total_evaluaciones} evaluaciones insertadas")
+    finally:
+        finalizar_registro_blockchain(sistema_blockchain, registrador, total_evaluaciones)
+    return evaluaciones_ids
 
-                if exito:
-                    blockchain_registradas += 1
-                else:
-                    blockchain_fallidas += 1
-            except Exception as e:
-                blockchain_fallidas += 1
-                print(f"      Error blockchain eval {id_evaluacion}: {e}")
+def iniciar_sistema_blockchain():
+    """Crea e inicializa el sistema blockchain de la población; None si falla"""
+    sistema_blockchain = SistemaBlockchainEvaluaciones(
+        DB_CONFIG, dificultad=4, tamano_buffer_escritura=TAMANO_BUFFER_ESCRITURA,
+        consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN,
+        compresion=COMPRESION_BLOCKCHAIN
+    )
 
-            contador_global += 1
+    if not sistema_blockchain.inicializar_sistema():
+        print("Error al inicializar blockchain")
+        return None
 
-            # Progreso
-            if contador_global % 100 == 0:
-                tiempo_transcurrido = time.time() - tiempo_inicio
-                tiempo_promedio = tiempo_transcurrido / contador_global
-                tiempo_restante = tiempo_promedio * (total_evaluaciones - contador_global)
+    print("Sistema blockchain inicializado")
+    print(f"Minería paralela con {sistema_blockchain.minador.procesos} procesos\n")
+    return sistema_blockchain
+
+def imprimir_progreso(insertadas, total_evaluaciones, registrador, tiempo_inicio):
+    """Progreso de las dos etapas y tiempo restante estimado"""
+    tiempo_transcurrido = time.time() - tiempo_inicio
+    procesadas = registrador.registradas + registrador.fallidas
+    # La etapa más lenta determina el tiempo restante
+    restante_insercion = tiempo_transcurrido / insertadas * (total_evaluaciones - insertadas)
+    restante_blockchain = (tiempo_transcurrido / procesadas * (total_evaluaciones - procesadas)
+                           if procesadas else 0)
+    tiempo_restante = max(restante_insercion, restante_blockchain)
+
+    print(f"      {insertadas}/{total_evaluaciones} insertadas")
+    print(f"         Blockchain: {registrador.registradas} OK, {registrador.fallidas} fail"
+          f" | En cola: {registrador.pendientes()}")
+    print(f"         Resta: {tiempo_restante/60:.1f} min")
+
+def finalizar_registro_blockchain(sistema_blockchain, registrador, total_evaluaciones):
+    """
+    Espera la cola del registrador, imprime sus estadísticas y valida la cadena
+    Siempre desconecta el sistema blockchain
+    """
+    try:
+        print(f"\nEsperando registro blockchain de {registrador.pendientes()} evaluaciones en cola...")
+        registrador.finalizar()
+        blockchain_registradas = registrador.registradas
+        blockchain_fallidas = registrador.fallidas
+
+        # Estadísticas blockchain
+        print(f"\nESTADÍSTICAS BLOCKCHAIN:")
+        print(f"   Registradas: {blockchain_registradas}")
+        print(f"   Fallidas: {blockchain_fallidas}")
+        print(f"   Éxito: {(blockchain_registradas/max(total_evaluaciones, 1))*100:.2f}%")
+
+        if sistema_blockchain.validar_cadena():
+            print(f"   Cadena VÁLIDA ({len(sistema_blockchain.blockchain.cadena)} bloques)")
+        else:
+            print(f"   Cadena CORRUPTA")
+    finally:
+        sistema_blockchain.desconectar()
 
-                print(f"      {contador_global}/{total_evaluaciones}")
-                print(f"         Blockchain: {blockchain_registradas} OK, {blockchain_fallidas} fail")
-                print(f"         Resta: {tiempo_restante/60:.1f} min")
+def confirmar_lote(insertador, connection, filas_evaluaciones, evaluaciones_ids, registrador):
+    """Vacía el insertador, confirma y entrega a blockchain las evaluaciones que sí se insertaron"""
+    insertador.vaciar()
+    connection.commit()
 
-            if contador_global % 50 == 0:
-                connection.commit()  # CAMBIADO
+    # Las evaluaciones descartadas por INSERT IGNORE no tienen id ni se registran
+    ids_lote = [fila.id for fila in filas_evaluaciones if fila.id is not None]
+    evaluaciones_ids.extend(ids_lote)
+    registrador.encolar(ids_lote)
 
-    connection.commit()  # CAMBIADO
+def agregar_evaluaciones_historicas(insertador, anio, cantidad, usuarios_ids, profesionales_ids, id_centro=None):
+    """
+    Agrega al insertador `cantidad` evaluaciones del año con sus filas hijas y
+    produce la FilaPendiente de cada una a medida que se agrega
+    """
+    for inicio in range(0, cantidad, TAMANO_LOTE_VECTORIZADO):
+        n = min(TAMANO_LOTE_VECTORIZADO, cantidad - inicio)
+
+        # Las evaluaciones del tramo se generan columna a columna
+        lote = generar_lote_evaluaciones(
+            n, usuarios_ids, profesionales_ids, fechas_historicas_np(n, anio, anio),
+            'usuario@sistema.com', ruta_pdf=ruta_pdf_archivos, id_centro=id_centro
+        )
+        for i in range(n):
+            yield agregar_evaluacion_de_lote(insertador, lote, i)
+
+
+def ruta_pdf_archivos(numero_reconocimiento, id_usuario, fecha_eval):
+    """(ruta, nombre) de uno de los PDF de ejemplo publicados en el servidor de archivos"""
+    nombre_pdf = random.choice(FILES_NAME)
+    return URL_ARCHIVOS_PDF + nombre_pdf, nombre_pdf
+
+
+# =============================================
+# POBLACIÓN PARALELA POR PARTICIONES
+# =============================================
 
-    # Estadísticas blockchain
-    print(f"\n{total_evaluaciones} evaluaciones insertadas")
-    print(f"\nESTADÍSTICAS BLOCKCHAIN:")
-    print(f"   Registradas: {blockchain_registradas}")
-    print(f"   Fallidas: {blockchain_fallidas}")
-    print(f"   Éxito: {(blockchain_registradas/total_evaluaciones)*100:.2f}%")
+_contexto_worker = None
 
-    if sistema_blockchain.blockchain.validar_cadena():
-        print(f"   Cadena VÁLIDA ({len(sistema_blockchain.blockchain.cadena)} bloques)")
+def _inicializar_worker_poblacion(usuarios_ids, profesionales_ids, cola_progreso):
+    """
+    Abre la conexión a BD del worker y guarda los datos comunes a todas sus particiones
+    Un error de conexión no se propaga (rompería el pool sin decir por qué): queda
+    en el contexto y cada partición del worker lo informa como su error
+    """
+    global _contexto_worker
+    try:
+        connection, error = mysql.connector.connect(**DB_CONFIG), None
+    except Exception as e:
+        connection, error = None, f"Sin conexión en el worker: {e}"
+    _contexto_worker = (connection, usuarios_ids, profesionales_ids, cola_progreso, error)
+
+def _poblar_particion(tarea):
+    """
+    Puebla una partición en el worker con su propia semilla y su propio tramo de
+    números de reconocimiento, confirmando cada COMMIT_CADA evaluaciones
+    Los ids de cada commit viajan por la cola de progreso como (indice, ids);
+    al terminar envía (indice, None). Retorna las estadísticas de la partición
+    """
+    indice, total_particiones, descripcion, cantidad, anio, id_centro, semilla = tarea
+    connection, usuarios_ids, profesionales_ids, cola_progreso, error = _contexto_worker
+
+    evaluaciones = 0
+    filas = 0
+    tiempo_inicio = time.time()
+    if connection is None:
+        cola_progreso.put((indice, None))
+        return _estadisticas_particion(descripcion, cantidad, evaluaciones, filas, tiempo_inicio, error)
+
+    sembrar_proceso(None if semilla is None else semilla + indice)
+    # Tramos disjuntos: una clave duplicada nunca viene de otra partición, así que
+    # el insertador resuelve sus ids sin ver filas de inserciones concurrentes
+    asignar_tramo_reconocimiento(indice, total_particiones)
+
+    cursor = connection.cursor()
+    insertador = InsertadorMasivo(cursor)
+    dist_anios = {anio: cantidad} if anio else distribuir_evaluaciones_por_anio(cantidad)
+
+    try:
+        pendientes_commit = []
+        for anio_particion, cantidad_anio in sorted(dist_anios.items()):
+            for fila_eval in agregar_evaluaciones_historicas(insertador, anio_particion, cantidad_anio,
+                                                             usuarios_ids, profesionales_ids, id_centro):
+                pendientes_commit.append(fila_eval)
+                if len(pendientes_commit) >= COMMIT_CADA:
+                    evaluaciones += _confirmar_particion(insertador, connection, pendientes_commit,
+                                                         indice, cola_progreso)
+                    pendientes_commit = []
+
+        evaluaciones += _confirmar_particion(insertador, connection, pendientes_commit, indice, cola_progreso)
+    except Exception as e:
+        connection.rollback()
+        error = str(e)
+    finally:
+        cursor.close()
+        cola_progreso.put((indice, None))
+
+    filas = insertador.insertadas
+    return _estadisticas_particion(descripcion, cantidad, evaluaciones, filas, tiempo_inicio, error)
+
+def _estadisticas_particion(descripcion, cantidad, evaluaciones, filas, tiempo_inicio, error):
+    """Resultado de una partición para imprimir_resumen_particiones"""
+    return {
+        'particion': descripcion,
+        'evaluaciones': evaluaciones,
+        'descartadas': cantidad - evaluaciones,
+        'filas': filas,
+        'segundos': time.time() - tiempo_inicio,
+        'error': error
+    }
+
+def _confirmar_particion(insertador, connection, filas_evaluaciones, indice, cola_progreso):
+    """Vacía y confirma el lote del worker; envía sus ids al proceso principal"""
+    insertador.vaciar()
+    connection.commit()
+
+    ids_lote = [fila.id for fila in filas_evaluaciones if fila.id is not None]
+    if ids_lote:
+        cola_progreso.put((indice, ids_lote))
+    return len(ids_lote)
+
+def _repartir(cantidad, partes):
+    """Divide cantidad en `partes` enteros que difieren a lo sumo en uno"""
+    return [cantidad // partes + (1 if i < cantidad % partes else 0) for i in range(partes)]
+
+def particionar_evaluaciones(total_evaluaciones, particion=PARTICION_POBLACION, procesos=1):
+    """
+    Reparte la población en particiones independientes (descripcion, cantidad, anio, id_centro)
+
+    'anio': una por año según distribuir_evaluaciones_por_anio
+    'centro': una por centro con partes iguales; cada una se reparte por año al poblarla
+    Las particiones mayores que total/procesos se dividen (el último año concentra
+    un tercio de las evaluaciones) y quedan de mayor a menor para repartir mejor la carga
+    """
+    if particion == PARTICION_ANIO:
+        base = [(f"año {anio}", cantidad, anio, None)
+                for anio, cantidad in sorted(distribuir_evaluaciones_por_anio(total_evaluaciones).items())]
+    elif particion == PARTICION_CENTRO:
+        base = [(f"centro {id_centro}", cantidad, None, id_centro)
+                for id_centro, cantidad in zip(CENTROS_POBLACION,
+                                               _repartir(total_evaluaciones, len(CENTROS_POBLACION)))]
     else:
-        print(f"   Cadena CORRUPTA")
+        raise ValueError(f"Partición desconocida: {particion}")
+
+    tamano_maximo = max(1, -(-total_evaluaciones // procesos))
+    particiones = []
+    for descripcion, cantidad, anio, id_centro in base:
+        partes = _repartir(cantidad, max(1, -(-cantidad // tamano_maximo)))
+        for numero, parte in enumerate(partes, 1):
+            if parte:
+                nombre = descripcion if len(partes) == 1 else f"{descripcion} ({numero}/{len(partes)})"
+                particiones.append((nombre, parte, anio, id_centro))
+
+    particiones.sort(key=lambda p: p[1], reverse=True)
+    return particiones
+
+def poblar_evaluaciones_paralelo_con_blockchain(usuarios_ids, profesionales_ids, total_evaluaciones=10000,
+                                                procesos=PROCESOS_POBLACION, particion=PARTICION_POBLACION,
+                                                semilla=None, tamano_lote=TAMANO_LOTE_BLOCKCHAIN):
+    """
+    Variante multiproceso de poblar_evaluaciones_historicas_con_blockchain
+    Un pool de procesos puebla las particiones (por año o por centro), cada worker
+    con su conexión; el proceso principal fusiona su progreso y entrega los ids al
+    registrador blockchain, que sigue siendo uno solo y registra por lotes
+    Si un worker muere (p. ej. por falta de memoria) el pool queda roto y la
+    espera termina con BrokenProcessPool en lugar de quedarse colgada
+
+    Args:
+        semilla: base para reproducir la población (la partición i usa semilla + i)
+    """
+    print(f"\nMODO: Población paralela con Blockchain habilitado ({procesos} procesos por {particion})")
+
+    particiones = particionar_evaluaciones(total_evaluaciones, particion, procesos)
+
+    print(f"\nParticiones:")
+    for descripcion, cantidad, _, _ in particiones:
+        print(f"      {descripcion}: {cantidad} evaluaciones")
+
+    tareas = [(indice, len(particiones), descripcion, cantidad, anio, id_centro, semilla)
+              for indice, (descripcion, cantidad, anio, id_centro) in enumerate(particiones)]
+    cola_progreso = multiprocessing.Queue()
+
+    # Los workers se crean antes que el sistema blockchain para que no hereden
+    # su conexión ni sus hilos (sumidero de auditoría, registrador). Con fork el
+    # executor los lanza todos en el primer submit: se fuerza con una tarea vacía
+    with ProcessPoolExecutor(procesos, initializer=_inicializar_worker_poblacion,
+                             initargs=(usuarios_ids, profesionales_ids, cola_progreso)) as executor:
+        executor.submit(os.getpid).result()
+        sistema_blockchain = iniciar_sistema_blockchain()
+        if not sistema_blockchain:
+            return None
+
+        registrador = RegistradorBlockchainAsincrono(sistema_blockchain, tamano_lote)
+        registrador.iniciar()
+
+        evaluaciones_ids = []
+        terminadas = 0
+        tiempo_inicio = time.time()
+
+        # Aunque falle un worker, lo ya confirmado se registra y el sistema se desconecta
+        futuros = []
+        try:
+            futuros = [executor.submit(_poblar_particion, tarea) for tarea in tareas]
+
+            # Cada partición termina con (indice, None); hasta entonces llegan sus commits
+            while terminadas < len(tareas):
+                try:
+                    _, ids_lote = cola_progreso.get(timeout=1)
+                except queue.Empty:
+                    # Un worker caído no envía su fin: el futuro lleva el error del pool
+                    for futuro in futuros:
+                        if futuro.done() and futuro.exception() is not None:
+                            raise futuro.exception()
+                    continue
+
+                if ids_lote is None:
+                    terminadas += 1
+                    continue
+
+                evaluaciones_ids.extend(ids_lote)
+                registrador.encolar(ids_lote)
+                imprimir_progreso(len(evaluaciones_ids), total_evaluaciones, registrador, tiempo_inicio)
+                print(f"         Particiones terminadas: {terminadas}/{len(tareas)}")
+
+            estadisticas = [futuro.result() for futuro in futuros]
+
+            tiempo_insercion = time.time() - tiempo_inicio
+            imprimir_resumen_particiones(estadisticas, len(evaluaciones_ids), tiempo_insercion, procesos)
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+            finalizar_registro_blockchain(sistema_blockchain, registrador, len(evaluaciones_ids))
 
-    sistema_blockchain.desconectar()
     return evaluaciones_ids
 
+def imprimir_resumen_particiones(estadisticas, total_insertadas, tiempo_insercion, procesos):
+    """Reporte fusionado de las particiones: por partición y total"""
+    filas = sum(e['filas'] for e in estadisticas)
+
+    print(f"\nRESUMEN POR PARTICIÓN:")
+    for e in estadisticas:
+        print(f"   {e['particion']}: {e['evaluaciones']} evaluaciones, {e['filas']} filas"
+              f" en {e['segundos']:.1f}s ({e['evaluaciones']/max(e['segundos'], 1e-9):.0f} eval/s)")
+        if e['descartadas']:
+            print(f"      Descartadas: {e['descartadas']}")
+        if e['error']:
+            print(f"      Error: {e['error']}")
+
+    print(f"\n{total_insertadas} evaluaciones insertadas ({filas} filas) en {tiempo_insercion:.1f}s"
+          f" | {total_insertadas/max(tiempo_insercion, 1e-9):.0f} eval/s con {procesos} procesos")
+
 # =============================================
 # MENÚ PRINCIPAL
 # =============================================
@@ -178,10 +579,16 @@ def menu_principal():
     print("  3. Grande CON blockchain     (10,000 usuarios | 25,000 evaluaciones)")
     print("  4. Personalizada")
     print("  5. Verificar evaluación existente")
-    print("  6. Salir")
+    print("  6. Auditoría completa de la cadena")
+    print("  7. Auditoría masiva de integridad de evaluaciones")
+    print("  8. Barrido de modificaciones recientes")
+    print("  9. Comprimir datos de bloques existentes")
+    print("  10. Salir")
+    print(f"\n  Las opciones 1-4 pueblan con {PROCESOS_POBLACION} procesos en paralelo"
+          " (POBLACION_PROCESOS=1 para un solo proceso)")
     print("="*70)
 
-    #opcion = input("\nSeleccione (1-6): ")
+    #opcion = input("\nSeleccione (1-10): ")
     opcion = '1'
 
     if opcion == '1':
@@ -201,6 +608,14 @@ def menu_principal():
     elif opcion == '5':
         verificar_evaluacion()
     elif opcion == '6':
+        auditar_cadena_completa()
+    elif opcion == '7':
+        auditar_evaluaciones()
+    elif opcion == '8':
+        barrer_modificaciones()
+    elif opcion == '9':
+        comprimir_bloques_existentes()
+    elif opcion == '10':
         print("\n¡Hasta luego!")
         return
     else:
@@ -210,8 +625,19 @@ def menu_principal():
     #    menu_principal()
 
 
-def ejecutar_poblacion(num_usuarios, num_evaluaciones):
-    """Ejecuta el proceso completo de población"""
+def autoincremento_intercalado(cursor):
+    """
+    True si el servidor usa innodb_autoinc_lock_mode=2 (por defecto en MySQL 8)
+    En ese modo los INSERT multi-fila concurrentes pueden intercalar sus ids: el
+    InsertadorMasivo ya no puede deducirlos de lastrowid, y las tablas hijas sin
+    clave única (eval_psicologia, eval_medicina_general) no permiten resolverlos
+    """
+    cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+    return int(cursor.fetchone()[0]) == 2
+
+
+def ejecutar_poblacion(num_usuarios, num_evaluaciones, procesos=PROCESOS_POBLACION):
+    """Ejecuta el proceso completo de población (en paralelo si procesos > 1)"""
     connection = crear_conexion()
 
     if not connection:
@@ -222,12 +648,18 @@ def ejecutar_poblacion(num_usuarios, num_evaluaciones):
         cursor = connection.cursor()
         usuario_sistema = 'admin@sistemacom'
 
+        if procesos > 1 and autoincremento_intercalado(cursor):
+            print("\ninnodb_autoinc_lock_mode=2: los ids de inserciones concurrentes pueden"
+                  " intercalarse, la población se hace en un solo proceso")
+            procesos = 1
+
         print("\n" + "="*70)
         print("🚀 INICIANDO POBLACIÓN CON BLOCKCHAIN")
         print("="*70)
         print(f"\nParámetros:")
         print(f"   • Usuarios: {num_usuarios}")
         print(f"   • Evaluaciones: {num_evaluaciones}")
+        print(f"   • Procesos: {procesos}")
 
         # Poblar catálogos
         insertar_centros_reconocimiento(cursor, usuario_sistema)
@@ -250,13 +682,21 @@ def ejecutar_poblacion(num_usuarios, num_evaluaciones):
         print("EVALUACIONES + BLOCKCHAIN")
         print("="*70)
 
-        evaluaciones_ids = poblar_evaluaciones_historicas_con_blockchain(
-            cursor,
-            connection,
-            usuarios_ids,
-            profesionales_ids,
-            num_evaluaciones
-        )
+        if procesos > 1:
+            evaluaciones_ids = poblar_evaluaciones_paralelo_con_blockchain(
+                usuarios_ids,
+                profesionales_ids,
+                num_evaluaciones,
+                procesos
+            )
+        else:
+            evaluaciones_ids = poblar_evaluaciones_historicas_con_blockchain(
+                cursor,
+                connection,
+                usuarios_ids,
+                profesionales_ids,
+                num_evaluaciones
+            )
 
         print("\n" + "="*70)
         print("COMPLETADO")
@@ -268,7 +708,9 @@ def ejecutar_poblacion(num_usuarios, num_evaluaciones):
             print("🔍 VERIFICACIÓN DE PRUEBA")
             print("="*70)
 
-            sistema = SistemaBlockchainEvaluaciones(DB_CONFIG)
+            sistema = SistemaBlockchainEvaluaciones(
+                DB_CONFIG, consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN
+            )
             if sistema.inicializar_sistema():
                 id_eval = random.choice(evaluaciones_ids)
                 print(f"\nVerificando evaluación {id_eval}...")
@@ -302,7 +744,9 @@ def verificar_evaluacion():
     """Verifica una evaluación existente"""
     try:
         id_eval = int(input("ID evaluación: "))
-        sistema = SistemaBlockchainEvaluaciones(DB_CONFIG)
+        sistema = SistemaBlockchainEvaluaciones(
+            DB_CONFIG, consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN
+        )
         if sistema.inicializar_sistema():
             resultado = sistema.verificar_integridad_evaluacion(id_eval)
             print("\n" + "="*70)
@@ -315,6 +759,72 @@ def verificar_evaluacion():
         print("ID inválido")
 
 
+def auditar_cadena_completa():
+    """Revalida toda la cadena desde el génesis, sin usar el checkpoint"""
+    sistema = SistemaBlockchainEvaluaciones(
+        DB_CONFIG, consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN
+    )
+    if sistema.inicializar_sistema():
+        print("\n" + "="*70)
+        print("AUDITORÍA COMPLETA DE LA CADENA")
+        print("="*70)
+        tiempo_inicio = time.time()
+        valida = sistema.revalidar_cadena_completa()
+        print(f"   Resultado: {'VÁLIDA' if valida else 'CORRUPTA'}")
+        print(f"   Bloques: {len(sistema.blockchain.cadena)}")
+        print(f"   Tiempo: {time.time() - tiempo_inicio:.2f} s")
+    sistema.desconectar()
+
+
+def auditar_evaluaciones():
+    """Recalcula en paralelo el hash de todas las evaluaciones registradas"""
+    resultado = auditar_integridad_completa(DB_CONFIG)
+    print("\n" + "="*70)
+    print("RESULTADO AUDITORÍA DE INTEGRIDAD")
+    print("="*70)
+    print(f"   Válidas: {resultado['validas']}")
+    print(f"   Modificadas: {resultado['modificadas']}")
+    print(f"   Eliminadas: {resultado['eliminadas']}")
+    print(f"   No registradas: {resultado['no_registradas']}")
+    print(f"   Diferencias en: {resultado['archivo_diferencias']}")
+    print(f"   Tiempo: {resultado['tiempo_segundos']} s")
+
+
+def barrer_modificaciones():
+    """Revisa solo las evaluaciones con cambios desde el último barrido"""
+    sistema = SistemaBlockchainEvaluaciones(
+        DB_CONFIG, consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN
+    )
+    if sistema.inicializar_sistema():
+        resultado = sistema.barrer_modificaciones()
+        print("\n" + "="*70)
+        print("BARRIDO DE MODIFICACIONES")
+        print("="*70)
+        print(f"   Revisadas: {resultado['revisadas']}")
+        print(f"   Modificadas: {len(resultado['modificadas'])}")
+        for id_evaluacion in resultado['modificadas'][:20]:
+            print(f"      • Evaluación {id_evaluacion}")
+        print(f"   Próxima marca de agua: {resultado['marca_agua']}")
+        print(f"   Tiempo: {resultado['tiempo_segundos']} s")
+    sistema.desconectar()
+
+
+def comprimir_bloques_existentes():
+    """Comprime los datos de los bloques guardados antes de activar la compresión"""
+    compresion = COMPRESION_BLOCKCHAIN or 'zlib'
+    sistema = SistemaBlockchainEvaluaciones(
+        DB_CONFIG, consenso=CONSENSO_BLOCKCHAIN, ruta_snapshot=RUTA_SNAPSHOT_BLOCKCHAIN,
+        compresion=compresion
+    )
+    if sistema.inicializar_sistema():
+        print(f"\nComprimiendo datos de bloques con {compresion}...")
+        tiempo_inicio = time.time()
+        migrados = sistema.migrar_compresion_bloques(compresion)
+        print(f"   Bloques comprimidos: {migrados}")
+        print(f"   Tiempo: {time.time() - tiempo_inicio:.2f} s")
+    sistema.desconectar()
+
+
 # =============================================
 # EJECUCIÓN PRINCIPAL
 # =============================================
@@ -332,7 +842,7 @@ if __name__ == "__main__":
 ║   • poblar_sispro.py (este archivo)                                ║
 ║                                                                      ║
 ║   DEPENDENCIAS:                                                   ║
-║   pip install faker mysql-connector-python                          ║
+║   pip install faker mysql-connector-python numpy                    ║
 ║                                                                      ║
 ║   ⚡ RENDIMIENTO:                                                    ║
 ║   • Con blockchain: ~1-2 horas (10k evaluaciones)                   ║
@@ -340,6 +850,10 @@ if __name__ == "__main__":
 ╚══════════════════════════════════════════════════════════════════════╝
     """)
 
+    if RUTA_SNAPSHOT_BLOCKCHAIN is None:
+        print("⚠️  Sin BLOCKCHAIN_CLAVE_HMAC: snapshot de la cadena desactivado, "
+              "cada arranque lee todos los encabezados de la BD\n")
+
     try:
         menu_principal()
     except KeyboardInterrupt:
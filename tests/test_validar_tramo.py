@@ -0,0 +1,109 @@
+"""
+Validación paralela por tramos (_validar_tramo) con un cursor sin buffer
+"""
+import json
+import sys
+import types
+
+try:
+    import mysql.connector as mysql_connector
+except ImportError:
+    # _validar_tramo solo usa cursores falsos: sin el conector basta un módulo
+    # con lo que blockchain importa (Error, errors, connect)
+    class Error(Exception):
+        pass
+
+    class InternalError(Error):
+        pass
+
+    def connect(**config):
+        raise Error("mysql.connector no está instalado")
+
+    mysql_connector = types.ModuleType("mysql.connector")
+    mysql_connector.Error = Error
+    mysql_connector.connect = connect
+    mysql_connector.errors = types.ModuleType("mysql.connector.errors")
+    mysql_connector.errors.Error = Error
+    mysql_connector.errors.InternalError = InternalError
+    mysql = types.ModuleType("mysql")
+    mysql.connector = mysql_connector
+    sys.modules.update({
+        "mysql": mysql,
+        "mysql.connector": mysql_connector,
+        "mysql.connector.errors": mysql_connector.errors,
+    })
+
+import blockchain
+
+
+class CursorSinBuffer:
+    """Imita el cursor no buffered de mysql.connector: no se cierra con filas sin leer"""
+    def __init__(self, filas):
+        self.filas = filas
+        self.pendientes = []
+    
+    def execute(self, consulta, parametros):
+        desde, hasta = parametros
+        self.pendientes = [fila for fila in self.filas if desde <= fila[0] <= hasta]
+    
+    def fetchmany(self, cantidad):
+        pagina, self.pendientes = self.pendientes[:cantidad], self.pendientes[cantidad:]
+        return pagina
+    
+    def close(self):
+        if self.pendientes:
+            raise mysql_connector.errors.InternalError("Unread result found")
+
+
+class ConexionFalsa:
+    def __init__(self, filas):
+        self.filas = filas
+    
+    def cursor(self):
+        return CursorSinBuffer(self.filas)
+    
+    def commit(self):
+        pass
+
+
+def _filas_cadena(cantidad):
+    cadena = blockchain.BlockchainEvaluaciones(
+        dificultad=1, version_bloque=blockchain.VERSION_BLOQUE_JSON
+    )
+    for numero in range(cantidad - 1):
+        cadena.agregar_bloque({'numero': numero})
+    
+    return [
+        [bloque.indice, bloque.timestamp, bloque.hash, bloque.hash_anterior, bloque.nonce,
+         bloque.algoritmo, bloque.firma, bloque.version, json.dumps(bloque.datos), None, None, None]
+        for bloque in cadena.cadena
+    ]
+
+
+def test_bloque_alterado_a_mitad_de_pagina(monkeypatch):
+    filas = _filas_cadena(10)
+    # Bloque 3 alterado: el error aparece con páginas de 2 filas aún sin leer
+    filas[3][8] = json.dumps({'numero': 'alterado'})
+    monkeypatch.setattr(blockchain, 'TAMANO_PAGINA_BLOQUES', 2)
+    monkeypatch.setattr(blockchain, '_conexion_worker', ConexionFalsa(filas))
+    
+    bloques, primer_indice, _, ultimo_hash, error = blockchain._validar_tramo(
+        (0, 9, 1, None, True, None)
+    )
+    
+    assert error == (3, "Hash inválido")
+    assert bloques == 3
+    assert primer_indice == 0
+    assert ultimo_hash == filas[2][2]
+
+
+def test_tramo_valido(monkeypatch):
+    filas = _filas_cadena(10)
+    monkeypatch.setattr(blockchain, 'TAMANO_PAGINA_BLOQUES', 2)
+    monkeypatch.setattr(blockchain, '_conexion_worker', ConexionFalsa(filas))
+    
+    bloques, _, _, ultimo_hash, error = blockchain._validar_tramo((0, 9, 1, None, True, None))
+    
+    assert error is None
+    assert bloques == 10
+    assert ultimo_hash == filas[-1][2]